@@ -11,3 +11,21 @@ try:
     __version__ = importlib.metadata.version(__name__)
 except importlib.metadata.PackageNotFoundError:
     __version__ = "0.0.0+dev"  # Fallback for development mode
+
+from commonplace._repo import Commonplace
+from commonplace._types import Note, RepoPath
+
+__all__ = ["Commonplace", "Note", "RepoPath", "SearchHit", "SearchMethod", "aindex", "index", "__version__"]
+
+
+def __getattr__(name: str):
+    # Search needs numpy, so only import it when asked for
+    if name in ("SearchHit", "SearchMethod"):
+        from commonplace._search import _types
+
+        return getattr(_types, name)
+    if name in ("aindex", "index"):
+        from commonplace._search import _commands
+
+        return getattr(_commands, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,8 +2,10 @@ import datetime as dt
 import logging
 import os
 import subprocess
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Annotated, Optional, TypeAlias
+from typing import Annotated, Iterator, Optional, TypeAlias
 
 from cyclopts import App, Parameter
 from platformdirs import user_data_dir
@@ -51,6 +53,14 @@ def _launch(
         Path,
         Parameter(name=["--root"], help="Path to the commonplace root directory.", env_var=f"{ENV_PREFIX}_ROOT"),
     ] = Path(os.getenv("COMMONPLACE_ROOT", DEFAULT_ROOT)),
+    memprofile: Annotated[
+        bool,
+        Parameter(
+            name=["--memprofile"],
+            help="Report peak memory use by pipeline stage, and the top allocation sites.",
+            negative=[],
+        ),
+    ] = False,
 ) -> None:
     """Set up common parameters for all commands."""
 
@@ -62,13 +72,53 @@ def _launch(
         command, bound, ignored = app.parse_args(tokens)
         if "repo" in ignored:  # Inject repo if command needs it
             extras["repo"] = _open_repo(root)
-        return command(*bound.args, **bound.kwargs, **extras)
+        with _metrics(command.__name__.strip("_"), extras.get("repo")), _profile_memory(memprofile):
+            return command(*bound.args, **bound.kwargs, **extras)
 
     except Exception as e:
         logger.exception(f"Error executing command: {e}")
         raise SystemExit(1) from e
 
 
+@contextmanager
+def _metrics(command: str, repo: Commonplace | None) -> Iterator[None]:
+    """Write metrics once the command has run, if enabled for the repo."""
+    if repo is None or not repo.config.metrics:
+        yield
+        return
+
+    from commonplace import _metrics
+
+    _metrics.reset()
+    started = time.perf_counter()
+    success = False
+    try:
+        yield
+        success = True
+    finally:
+        try:
+            _metrics.write_metrics(repo, command, success, time.perf_counter() - started)
+        except Exception as e:
+            logger.warning(f"Failed to write metrics: {e}")
+
+
+@contextmanager
+def _profile_memory(enabled: bool) -> Iterator[None]:
+    """Profile memory use while the command runs, if enabled, then print a report."""
+    if not enabled:
+        yield
+        return
+
+    from commonplace._memprofile import profile
+
+    # Report even if the command failed, since that may be why it did
+    try:
+        with profile() as memory:
+            yield
+    finally:
+        memory.print()
+
+
 def _open_repo(root: Path) -> Commonplace:
     """Try to open a commonplace repository at the given root path. Exit on
     failure with a helpful message.
@@ -96,14 +146,38 @@ def import_(
         Optional[bool],
         Parameter(help="Index notes after commit (default: from config)"),
     ] = None,
+    workers: Annotated[
+        int,
+        Parameter(name=["--workers", "-j"], help="Parallel workers for parsing large exports or directories"),
+    ] = 1,
+    watch: Annotated[
+        bool,
+        Parameter(help="Keep watching a directory and import Claude Code sessions as they change", negative=""),
+    ] = False,
     *,
     repo: Repo,
 ) -> None:
-    """Import AI conversation exports (Claude ZIP, Gemini Takeout) into your commonplace."""
+    """Import AI conversation exports (Claude ZIP, Gemini Takeout) into your commonplace.
+
+    Importing a directory makes a single commit (and index pass) covering all
+    the files in it. Files that fail to import are reported and skipped."""
+
+    if watch:
+        from commonplace._import._watch import watch as watch_
+
+        if not path.is_dir():
+            logger.error(f"Can only watch a directory, not '{path}'")
+            raise SystemExit(1)
+        watch_(path, repo, user=repo.config.user, prefix="chats", auto_index=index)
+        return
 
     from commonplace._import._commands import import_
 
-    import_(path, repo, user=repo.config.user, prefix="chats", auto_index=index)
+    result = import_(path, repo, user=repo.config.user, prefix="chats", auto_index=index, workers=workers)
+    if result and result.failed:
+        logger.warning(f"{len(result.failed)} files failed to import:")
+        for failed_path, error in result.failed.items():
+            logger.warning(f"  {failed_path}: {error}")
 
 
 @app.command(alias="j", group=CREATING_SECTION)
@@ -176,10 +250,28 @@ def search(
     *query: str,
     limit: Annotated[int, Parameter(name=["--limit", "-n"], help="Maximum number of results")] = 10,
     method: Annotated[SearchMethod, Parameter(help="Search method")] = SearchMethod.HYBRID,
+    also: Annotated[
+        list[Path],
+        Parameter(
+            name=["--also"],
+            help="Also search the commonplace at this root (can be specified multiple times)",
+            negative="",
+            show_default=False,
+        ),
+    ] = [],
     repo: Repo,
 ) -> None:
     """Search for semantically similar content in your commonplace."""
 
+    from commonplace._search._queue import IndexQueue
+
+    if pending := IndexQueue(repo).pending():
+        logger.warning(f"{len(pending)} changed notes are still being indexed, so results may be incomplete")
+
+    if also:
+        _federated_search(" ".join(query), [repo, *map(_open_repo, also)], limit, method)
+        return
+
     results = repo.index.search(" ".join(query), limit=limit, method=method)
 
     if not results:
@@ -194,6 +286,56 @@ def search(
         print(f"   {hit.chunk.text[:200]}{'...' if len(hit.chunk.text) > 200 else ''}")
 
 
+def _federated_search(query: str, repos: list[Commonplace], limit: int, method: SearchMethod) -> None:
+    """Search several commonplaces, and display the merged results with the root of each hit."""
+    from commonplace._search._federated import federated_search
+
+    try:
+        results = federated_search(repos, query, limit=limit, method=method)
+    finally:
+        for other in repos[1:]:
+            other.close()
+
+    if not results:
+        logger.info("No results found")
+        return
+
+    for i, result in enumerate(results, 1):
+        hit = result.hit
+        print(f"\n{i}. {hit.chunk.repo_path.path}:{hit.chunk.offset}")
+        print(f"   Root: {', '.join(str(root) for root in result.roots)}")
+        print(f"   Section: {hit.chunk.section}")
+        print(f"   Score: {result.score:.3f}")
+        print(f"   {hit.chunk.text[:200]}{'...' if len(hit.chunk.text) > 200 else ''}")
+
+
+@app.command(group=ANALYZING_SECTION)
+def serve(
+    host: Annotated[str, Parameter(help="Address to listen on")] = "127.0.0.1",
+    port: Annotated[int, Parameter(help="Port to listen on")] = 8765,
+    socket: Annotated[
+        Optional[Path], Parameter(help="Listen on this unix socket instead of a TCP port", show_default=False)
+    ] = None,
+    workers: Annotated[int, Parameter(help="Number of requests to handle at once")] = 8,
+    *,
+    repo: Repo,
+) -> None:
+    """Serve search, notes and stats over a local HTTP JSON API, keeping the index loaded."""
+
+    from commonplace._serve import serve
+
+    serve(repo, host=host, port=port, socket_path=socket, workers=workers)
+
+
+@app.command(group=ANALYZING_SECTION)
+def mcp(*, repo: Repo) -> None:
+    """Serve search and notes as tools for AI agents, over MCP on stdin and stdout."""
+
+    from commonplace._mcp import serve
+
+    serve(repo)
+
+
 ################################################################################
 # System commands
 ################################################################################
@@ -232,19 +374,65 @@ def init(root: Path) -> None:
     logger.info("  /plugin marketplace add joehalliwell/commonplace")
 
 
-@app.command(group=SYSTEM_SECTION)
+index_app = App(name="index", help="Build and share the search index.", group=SYSTEM_SECTION)
+app.command(index_app)
+
+
+@index_app.default
 def index(
     rebuild: Annotated[bool, Parameter(help="Rebuild the index from scratch")] = False,
+    queued: Annotated[
+        bool, Parameter(help="Only index notes queued by background auto-indexing, at low priority", negative="")
+    ] = False,
     *,
     repo: Repo,
 ) -> None:
     """Build or rebuild the search index for semantic search."""
 
+    if queued:
+        from commonplace._search._queue import IndexQueue
+
+        if hasattr(os, "nice"):
+            os.nice(10)
+        IndexQueue(repo).drain()
+        return
+
     from commonplace._search._commands import index
 
     index(repo, rebuild=rebuild)
 
 
+@index_app.command(name="export")
+def index_export(
+    path: Annotated[Path, Parameter(help="Where to write the snapshot")],
+    *,
+    repo: Repo,
+) -> None:
+    """Export a snapshot of the index, for machines that sync the same repository."""
+
+    from commonplace._search._commands import export_index
+
+    export_index(repo, path)
+
+
+@index_app.command(name="import")
+def index_import(
+    path: Annotated[Path, Parameter(help="The snapshot to import")],
+    reindex: Annotated[bool, Parameter(help="Index notes the snapshot doesn't cover")] = True,
+    *,
+    repo: Repo,
+) -> None:
+    """Import a snapshot of the index exported by another machine."""
+
+    from commonplace._search._commands import import_index
+
+    try:
+        import_index(repo, path, reindex=reindex)
+    except ValueError as e:
+        logger.error(f"Import failed: {e}")
+        raise SystemExit(1) from e
+
+
 @app.command(group=SYSTEM_SECTION)
 def sync(
     remote: Annotated[str, Parameter(help="Remote name")] = "origin",
@@ -298,7 +486,7 @@ def stats(
 ) -> None:
     """Show statistics about your commonplace and search index."""
 
-    from commonplace._stats import generate_stats
+    from commonplace._stats import count_by_source, generate_stats
 
     try:
         heatmap_output, table_output = generate_stats(
@@ -315,8 +503,7 @@ def stats(
     except ValueError as e:
         logger.error(str(e))
         # Show available sources
-        all_note_paths = list(repo.note_paths())
-        available_sources = sorted(set(repo.source(path) for path in all_note_paths))
+        available_sources = sorted(count_by_source(repo).notes)
         logger.info(f"Available sources: {', '.join(available_sources)}")
         return
 
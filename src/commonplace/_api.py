@@ -0,0 +1,161 @@
+"""
+Search, notes and stats for long-running servers (`commonplace serve` and the
+MCP server), taking requests as JSON values and returning JSON-able results.
+"""
+
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any
+
+from commonplace._repo import Commonplace
+from commonplace._search._types import SearchHit, SearchMethod
+from commonplace._types import RepoPath
+
+# Most queries accepted in a batch search
+MAX_BATCH = 256
+
+
+class RequestError(Exception):
+    """A request that can't be served, with the HTTP status to report."""
+
+    status = HTTPStatus.BAD_REQUEST
+
+
+class NotFoundError(RequestError):
+    """A request for something that doesn't exist."""
+
+    status = HTTPStatus.NOT_FOUND
+
+
+class SearchAPI:
+    """
+    Operations on a repository, keeping its embedding model and embeddings
+    loaded between requests. Safe to call from several threads. Arguments
+    are taken as decoded from a request, and validated here.
+    """
+
+    def __init__(self, repo: Commonplace):
+        self.repo = repo
+
+    def warm(self) -> None:
+        """Load the embedding model and embeddings now, rather than on the first search."""
+        self.repo.index.warm()
+
+    def search(self, query: Any, limit: Any = 10, method: Any = SearchMethod.HYBRID) -> dict[str, Any]:
+        """
+        Search for a query.
+
+        Returns:
+            {"hits": [...]}, ordered by relevance
+        """
+        query = _require("query", query, str)
+        limit, search_method = _search_options(limit, method)
+        hits = self.repo.index.search(query, limit=limit, method=search_method)
+        return {"hits": [_hit_json(hit) for hit in hits]}
+
+    def search_batch(self, queries: Any, limit: Any = 10, method: Any = SearchMethod.HYBRID) -> dict[str, Any]:
+        """
+        Search for several queries, embedding them together.
+
+        Returns:
+            {"results": [[...], ...]}, with the hits for each query in order
+        """
+        queries = _require("queries", queries, list)
+        if not all(isinstance(query, str) for query in queries):
+            raise RequestError("'queries' must be a list of strings")
+        if len(queries) > MAX_BATCH:
+            raise RequestError(f"At most {MAX_BATCH} queries can be searched at once")
+        limit, search_method = _search_options(limit, method)
+
+        index = self.repo.index
+        embeddings: list = [None] * len(queries)
+        if queries and search_method != SearchMethod.KEYWORD:
+            embeddings = list(index.embedder.embed_queries(queries))
+        results = [
+            index.search(query, limit=limit, method=search_method, query_embedding=embedding)
+            for query, embedding in zip(queries, embeddings)
+        ]
+        return {"results": [[_hit_json(hit) for hit in hits] for hits in results]}
+
+    def note(self, path: Any, ref: Any = None) -> dict[str, Any]:
+        """
+        Get a note's content at a commit.
+
+        Args:
+            path: The note's repo-relative (posix) path
+            ref: A commit, e.g. from a search hit (default: as the note was last changed)
+
+        Returns:
+            {"path": ..., "ref": ..., "content": ...}, with the ref resolved to a commit id
+        """
+        path = _require("path", path, str)
+        note_path = self._note_path(path)
+        if ref:
+            ref = _require("ref", ref, str)
+            try:
+                repo_path = RepoPath(path=note_path, ref=self.repo.resolve_ref(ref, note_path))
+            except (KeyError, ValueError):
+                raise NotFoundError(f"No such note at {ref}: '{path}'") from None
+        else:
+            if not (self.repo.root / note_path).is_file():
+                raise NotFoundError(f"No such note: '{path}'")
+            repo_path = self.repo.make_repo_path(note_path)
+        try:
+            note = self.repo.get_note(repo_path)
+        except FileNotFoundError:
+            raise NotFoundError(f"No such note at {repo_path.ref}: '{path}'") from None
+        return {"path": note_path.as_posix(), "ref": repo_path.ref, "content": note.content}
+
+    def _note_path(self, path: str) -> Path:
+        """
+        Resolve a requested path to a note's repo-relative path, so that only
+        notes can be read: not files outside the repository (e.g. through
+        '..' or a symlink), nor those of git or commonplace itself.
+        """
+        root = self.repo.root.resolve()
+        resolved = (root / path).resolve()
+        if not resolved.is_relative_to(root):
+            raise NotFoundError(f"No such note: '{path}'")
+        note_path = resolved.relative_to(root)
+        if note_path.suffix != ".md" or {".git", ".commonplace"} & set(note_path.parts):
+            raise NotFoundError(f"No such note: '{path}'")
+        return note_path
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Count notes and indexed chunks by source.
+
+        Returns:
+            {"notes": {source: count}, "chunks": {source: count}}
+        """
+        from commonplace._stats import count_by_source
+
+        counts = count_by_source(self.repo)
+        return {"notes": counts.notes, "chunks": counts.chunks}
+
+
+def _require(name: str, value: Any, kind: type) -> Any:
+    if not isinstance(value, kind):
+        raise RequestError(f"'{name}' must be a {kind.__name__}")
+    return value
+
+
+def _search_options(limit: Any, method: Any) -> tuple[int, SearchMethod]:
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        raise RequestError("'limit' must be a positive integer")
+    try:
+        return limit, SearchMethod(method)
+    except ValueError:
+        raise RequestError(f"'method' must be one of: {', '.join(m.value for m in SearchMethod)}") from None
+
+
+def _hit_json(hit: SearchHit) -> dict[str, Any]:
+    chunk = hit.chunk
+    return {
+        "path": chunk.repo_path.path.as_posix(),
+        "ref": chunk.repo_path.ref,
+        "section": chunk.section,
+        "offset": chunk.offset,
+        "text": chunk.text,
+        "score": hit.score,
+    }
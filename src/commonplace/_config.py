@@ -37,3 +37,15 @@ class Config(BaseSettings):
     wrap: int = Field(default=80, description="Target characters per line for text wrapping")
     editor: str = Field(default=DEFAULT_EDITOR, description="Default editor for opening notes")
     auto_index: bool = Field(default=True, description="Automatically index notes when they are added")
+    index_in_background: bool = Field(
+        default=False,
+        description="Auto-index in a background process, so that commands return without waiting",
+    )
+    blob_threshold: int = Field(
+        default=0,
+        description="Store tool outputs and non-text parts larger than this many bytes as blobs (0, the default, to disable)",
+    )
+    metrics: bool = Field(
+        default=False,
+        description="Write metrics to .commonplace/cache (as JSON and a Prometheus textfile) after each command",
+    )
@@ -5,8 +5,9 @@ from pathlib import Path
 from typing import Any, Optional
 from zipfile import ZipFile
 
-from commonplace._import._types import EventLog, Message, Role
+from commonplace._import._types import EventLog, Message, Probe, Role
 from commonplace._logging import logger
+from commonplace._utils import fenced
 
 DEFAULT_TIME = datetime.fromtimestamp(0, tz=timezone.utc)  # Default time if not provided
 
@@ -19,13 +20,9 @@ class ChatGptImporter:
     def required_paths(self) -> list[str]:
         return ["conversations.json", "user.json"]
 
-    def can_import(self, path: Path) -> bool:
-        """Check if the importer can handle the given file path."""
-        with closing(ZipFile(path, "r")) as zf:
-            files = zf.namelist()
-            assert "conversations.json" in files
-            assert "user.json" in files
-            return True
+    def can_import(self, probe: Probe) -> bool:
+        """Check if the importer can handle the given file."""
+        return "conversations.json" in probe.names and "user.json" in probe.names
 
     def import_(self, path: Path) -> list[EventLog]:
         """Import activity logs from the ChatGPT file."""
@@ -94,8 +91,8 @@ class ChatGptImporter:
             logger.info(f"Skipping {content_type} message {id_}")
             return None
 
-        parts = content["parts"]
-        content = "\n".join(self._part(part) for part in parts)
+        parts = [self._part(part) for part in content["parts"]]
+        content = "\n".join(text for text, _ in parts)
         if not content:
             logger.info(f"Skipping empty message {id_}")
             return None
@@ -103,16 +100,17 @@ class ChatGptImporter:
         return Message(
             sender=Role.USER if role == "user" else Role.ASSISTANT,
             content=content,
+            payloads=[text for text, is_payload in parts if is_payload],
             created=created,
             # metadata={"id": id_},
         )
 
-    def _part(self, part: Any) -> str:
+    def _part(self, part: Any) -> tuple[str, bool]:
+        """Render a message part as Markdown, and say whether it's a non-text payload."""
         if isinstance(part, str):
-            return part
+            return part, False
 
-        json_ = json.dumps(part, indent=2)
-        return f"```json\n{json_}\n```"
+        return fenced(json.dumps(part, indent=2), "json"), True
 
     def _timestamp(self, ts: Optional[float]) -> datetime:
         if ts is None:
@@ -6,7 +6,7 @@ from zipfile import ZipFile
 
 from rich.progress import track
 
-from commonplace._import._types import EventLog, Message, Role
+from commonplace._import._types import EventLog, Message, Probe, Role
 from commonplace._logging import logger
 from commonplace._utils import truncate
 
@@ -21,15 +21,12 @@ class ClaudeImporter:
     def required_paths(self) -> list[str]:
         return ["conversations.json", "users.json"]
 
-    def can_import(self, path: Path) -> bool:
-        """Check if the importer can handle the given file path.
+    def can_import(self, probe: Probe) -> bool:
+        """Check if the importer can handle the given file.
 
-        For Claude, we can check if the file has a specific extension or contains
-        certain metadata that indicates it's a Claude log.
+        For Claude, we check that the archive contains the expected files.
         """
-        with closing(ZipFile(path, "r")) as zip_file:
-            files = zip_file.namelist()
-            return "conversations.json" in files and "users.json" in files
+        return "conversations.json" in probe.names and "users.json" in probe.names
 
     def import_(self, path: Path) -> list[EventLog]:
         """
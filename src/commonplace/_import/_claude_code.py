@@ -1,12 +1,81 @@
+import hashlib
 import json
+from collections import Counter
 from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
-from commonplace._import._types import Event, EventLog, Message, Role, ToolCall
+from pydantic import BaseModel, Field
+
+from commonplace._import._types import Event, EventLog, Message, Probe, Role, ToolCall
 from commonplace._logging import logger
 from commonplace._utils import truncate
 
+_REQUIRED_METADATA = (
+    "sessionId",
+    "timestamp",
+    "cwd",
+    "summary",
+    "model",
+)
+_MESSAGE_TYPES = {"user", "assistant"}
+_HEAD_DIGEST_BYTES = 4096
+# Leading records to look at when recognising a session
+_PROBE_LINES = 5
+
+
+class SessionCheckpoint(BaseModel):
+    """
+    How far we got through an append-only Claude Code session log, with enough
+    parser state to carry on from there without re-reading earlier lines. Its
+    size doesn't grow with the session: events that have been imported are
+    kept only in the note.
+    """
+
+    offset: int = Field(default=0, description="Byte offset just past the last line parsed")
+    lines: int = Field(default=0, description="Number of lines parsed")
+    head_digest: str = Field(default="", description="SHA-256 of the leading bytes, to detect rewritten files")
+    metadata: dict[str, Any] = Field(default_factory=dict, description="Session metadata gathered so far")
+    tool_calls: dict[str, ToolCall] = Field(default_factory=dict, description="Tool calls by id awaiting a result")
+    source_exports: list[str] = Field(
+        default_factory=list, description="Blob paths of the stored segments, in file order"
+    )
+    exported_offset: int = Field(default=0, description="Byte offset up to which segments have been stored")
+    notes: dict[str, str] = Field(
+        default_factory=dict, description="Git blob ids of the notes last written, by repo-relative path"
+    )
+    pending_chars: int = Field(
+        default=0, description="Length of the Markdown at the end of the note for tool calls awaiting a result"
+    )
+
+    @staticmethod
+    def load(path: Path) -> Optional["SessionCheckpoint"]:
+        """Load a checkpoint, or return None if it is missing or unreadable."""
+        try:
+            return SessionCheckpoint.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning(f"Ignoring unreadable checkpoint '{path}'", exc_info=True)
+            return None
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(self.model_dump_json())
+        tmp_path.replace(path)
+
+    def matches(self, path: Path) -> bool:
+        """Check that the file still starts with the content we checkpointed."""
+        if path.stat().st_size < self.offset:
+            return False
+        return _head_digest(path, min(self.offset, _HEAD_DIGEST_BYTES)) == self.head_digest
+
+
+def _head_digest(path: Path, size: int) -> str:
+    with open(path, "rb") as fp:
+        return hashlib.sha256(fp.read(size)).hexdigest()
+
 
 class ClaudeCodeImporter:
     """
@@ -21,17 +90,24 @@ class ClaudeCodeImporter:
     def required_paths(self) -> list[str]:
         return []  # Not an archive
 
-    def can_import(self, path: Path) -> bool:
+    def can_import(self, probe: Probe) -> bool:
         """Check if this is a Claude Code JSONL file."""
-        if path.suffix != ".jsonl":
+        if probe.path.suffix != ".jsonl" or not probe.head.startswith(b"{"):
             return False
 
-        messages_by_type: dict[str, dict] = {}
+        lines = probe.head.splitlines()
+        if not probe.complete:
+            lines = lines[:-1]  # The last line may have been cut short
+            if len(lines) < _PROBE_LINES:
+                # Records can be larger than the head (e.g. a long pasted
+                # prompt), so read on until we have enough whole ones
+                with open(probe.path, "rb") as fp:
+                    lines = list(islice(fp, _PROBE_LINES))
 
-        with open(path, "r") as fp:
-            for line in islice(fp, 5):
-                data = json.loads(line)
-                messages_by_type[data["type"]] = data
+        messages_by_type: dict[str, dict] = {}
+        for line in islice(lines, _PROBE_LINES):
+            data = json.loads(line)
+            messages_by_type[data["type"]] = data
 
         # Not always present...
         # assert "file-history-snapshot" in messages_by_type
@@ -42,83 +118,141 @@ class ClaudeCodeImporter:
 
     def import_(self, path: Path) -> list[EventLog]:
         """Import a single Claude Code conversation from JSONL file."""
+        events, state = self._parse(path, None)
+        # Nothing will pick this up later, so include tool calls still awaiting a result
+        return self._to_logs(path, state, [*events, *state.tool_calls.values()])
+
+    def import_tail(
+        self, path: Path, checkpoint: SessionCheckpoint | None = None
+    ) -> tuple[list[EventLog], SessionCheckpoint]:
+        """
+        Import a Claude Code conversation, parsing only lines appended since a
+        previous checkpoint.
+
+        Sessions are append-only, so a checkpoint from an earlier import lets us
+        pick up where we left off. If the file no longer matches the checkpoint
+        (e.g. it was truncated or rewritten) it is parsed from the start. A
+        trailing line that is still being written is left for next time, as are
+        tool calls still awaiting a result, which are kept in the checkpoint.
+
+        Args:
+            path: The session JSONL file
+            checkpoint: State from a previous import of the same file, if any
+
+        Returns:
+            A log of the events since the checkpoint (or of the whole
+            conversation, if it was parsed from the start) and a checkpoint for
+            the next import
+        """
+        if checkpoint is not None and not checkpoint.matches(path):
+            logger.info(f"'{path}' has been rewritten since it was last imported; reading it from the start")
+            checkpoint = None
+        events, state = self._parse(path, checkpoint)
+        return self._to_logs(path, state, events, resumed=checkpoint is not None), state
+
+    def _parse(self, path: Path, checkpoint: SessionCheckpoint | None) -> tuple[list[Event], SessionCheckpoint]:
+        """Parse the lines after a checkpoint, returning the events they complete and the new state."""
+        state = checkpoint.model_copy(deep=True) if checkpoint else SessionCheckpoint()
+        if state.offset:
+            logger.debug(f"Resuming '{path}' from line {state.lines} (byte {state.offset})")
+
+        metadata = state.metadata
         events: list[Event] = []
-        required_metadata = (
-            "sessionId",
-            "timestamp",
-            "cwd",
-            "summary",
-            "model",
-        )
-        metadata = dict()
-        tool_calls: dict[str, ToolCall] = {}
+        skipped: Counter[str] = Counter()
+        with open(path, "rb") as fp:
+            fp.seek(state.offset)
+            for line in fp:
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    if not line.endswith(b"\n"):
+                        break  # Still being written
+                    raise
+
+                state.offset += len(line)
+                state.lines += 1
+
+                # Extract session metadata opportunistically from envelope or message
+                for required in _REQUIRED_METADATA:
+                    if required in metadata:
+                        continue
+                    if val := data.get(required, data.get("message", {}).get(required)):
+                        metadata[required] = val
+
+                # Sessions are full of bookkeeping records (summaries, file history
+                # snapshots...). Tally them rather than logging each one, which
+                # would dominate the cost of importing a long session.
+                if data["type"] not in _MESSAGE_TYPES:
+                    skipped[data["type"]] += 1
+                    continue
 
-        for line in open(path, "r"):
-            data = json.loads(line)
+                events.extend(self._process_event(data, state.tool_calls))
 
-            # Extract session metadata opportunistically from envelope or message
-            for required in required_metadata:
-                if required in metadata:
-                    continue
-                if val := data.get(required, data.get("message", {}).get(required)):
-                    metadata[required] = val
+        if skipped:
+            counts = ", ".join(f"{count} {type_}" for type_, count in skipped.most_common())
+            logger.debug(f"Skipped non-message records in '{path}': {counts}")
 
-            if message := self._process_event(data, tool_calls):
-                events.append(message)
+        if checkpoint is None or checkpoint.offset < _HEAD_DIGEST_BYTES:
+            state.head_digest = _head_digest(path, min(state.offset, _HEAD_DIGEST_BYTES))
 
-        # Add in the tool calls and sort
-        events.extend(tool_calls.values())
-        events.sort(key=lambda evt: evt.created)
+        return events, state
 
+    def _to_logs(self, path: Path, state: SessionCheckpoint, events: list[Event], resumed=False) -> list[EventLog]:
         if not events:
-            logger.warning(f"No messages found in {path}")
+            if resumed:
+                logger.debug(f"No new messages in {path}")
+            else:
+                logger.warning(f"No messages found in {path}")
             return []
 
+        # Tool calls go where they were made, after any message at the same time
+        events.sort(key=lambda evt: (evt.created, isinstance(evt, ToolCall)))
+
         # Ensure metadata is correctly ordered for the frontmatter
-        metadata = {k: metadata[k] for k in required_metadata if k in metadata}
+        metadata = {k: state.metadata[k] for k in _REQUIRED_METADATA if k in state.metadata}
 
         # Extract title and created time
         created = metadata.pop("timestamp")
         title = metadata.pop("summary", metadata["sessionId"])
 
+        # Copy events so that callers can't mutate the checkpoint state
         return [
             EventLog(
                 source=self.source,
                 created=created,
-                events=events,
+                events=[event.model_copy() for event in events],
                 title=title,
                 metadata=metadata,
             )
         ]
 
-    def _process_event(self, data: dict[str, Any], tool_calls: dict[str, ToolCall]) -> Message | None:
-        """Parse a user or assistant message from Messages API format."""
-        msg_type = data["type"]
-
-        if msg_type not in {"user", "assistant"}:
-            logger.warning(f"Skipping unhandled message type {msg_type}")
-            return None
-
+    def _process_event(self, data: dict[str, Any], tool_calls: dict[str, ToolCall]) -> list[Event]:
+        """
+        Parse a user or assistant message from Messages API format, returning it
+        along with any tool calls it completes. New tool calls are added to
+        tool_calls until their result arrives.
+        """
         # Determine role from message type
-        role = Role.USER if msg_type == "user" else Role.ASSISTANT
+        role = Role.USER if data["type"] == "user" else Role.ASSISTANT
 
         # Extract content from message structure
         content = data["message"]["content"]
 
         if not content:
             logger.warning(f"Skipping message without content: {truncate(str(data))}")
-            return None
+            return []
 
         # Handle basic (single-part) content as string
         if isinstance(content, str):
             timestamp = data["timestamp"]
-            return Message(sender=role, content=content, created=timestamp)
+            return [Message(sender=role, content=content, created=timestamp)]
 
         # Handle multi-part content
         assert isinstance(content, list)
 
         # Parse content blocks (array format)
         blocks = []
+        completed: list[Event] = []
         for block in content:
             block_type = block["type"]
 
@@ -144,8 +278,9 @@ class ClaudeCodeImporter:
                 content = block["content"]
                 tool_use_id = block["tool_use_id"]
                 output = block["content"]
-                call = tool_calls[tool_use_id]
+                call = tool_calls.pop(tool_use_id)
                 call.output = output
+                completed.append(call)
 
             else:
                 logger.debug(f"Skipping {block_type} content block")
@@ -153,13 +288,14 @@ class ClaudeCodeImporter:
 
         # If there's no direct output i.e. we're just dealing with tool results
         if not blocks:
-            return None
+            return completed
 
         content = "\n\n".join(blocks)
         timestamp = data["timestamp"]
 
-        return Message(
+        message = Message(
             sender=role,
             content=content,
             created=timestamp,
         )
+        return [message, *completed]
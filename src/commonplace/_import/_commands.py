@@ -1,23 +1,33 @@
 """Chat importers"""
 
-import tempfile
-from collections import Counter
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import repeat
 from pathlib import Path
-from typing import Optional
-from zipfile import ZipFile
+from typing import Any, Iterable, Iterator, Optional, Sequence
+from zipfile import BadZipFile, ZipFile
 
 from commonplace._import._chatgpt import ChatGptImporter
 from commonplace._import._claude import ClaudeImporter
-from commonplace._import._claude_code import ClaudeCodeImporter
+from commonplace._import._claude_code import ClaudeCodeImporter, SessionCheckpoint
 from commonplace._import._gemini import GeminiImporter
 from commonplace._import._serializer import MarkdownSerializer
-from commonplace._import._types import Importer
+from commonplace._import._types import ZIP_MAGIC, Event, EventLog, Importer, Message, Probe, ToolCall
 from commonplace._logging import logger
+from commonplace._memprofile import stage
+from commonplace._metrics import record
 from commonplace._progress import track
 from commonplace._repo import Commonplace
-from commonplace._types import Note, RepoPath
-from commonplace._utils import merge_frontmatter, slugify
+from commonplace._types import RepoPath
+from commonplace._utils import fenced, merge_frontmatter, parse_frontmatter, slugify
 
 IMPORTERS: list[Importer] = [
     GeminiImporter(),
@@ -26,25 +36,200 @@ IMPORTERS: list[Importer] = [
     ChatGptImporter(),
 ]
 
+# Archives are recognised by their magic bytes, other exports by extension
+TEXT_SUFFIXES = {".jsonl"}
+PROBE_HEAD_SIZE = 64 * 1024
+_PREVIEW_CHARS = 500
+_FENCED_BLOCK_RE = re.compile(r"(`{3,})(\w*)\n(.*)\n\1", re.DOTALL)
 
-def import_(path: Path, repo: Commonplace, user: str, prefix="chats", auto_index: bool | None = None):
+
+@dataclass
+class ParsedExport:
+    """An export file that has been parsed but not yet stored in the repo."""
+
+    path: Path
+    importer: Importer
+    logs: list[EventLog]
+    checkpoint: SessionCheckpoint | None = None
+    """Parser state for append-only session logs that can be resumed"""
+
+
+@dataclass
+class BatchResult:
+    """Outcome of importing a directory of exports."""
+
+    imported: list[Path] = field(default_factory=list)
+    skipped: list[Path] = field(default_factory=list)
+    failed: dict[Path, str] = field(default_factory=dict)
+
+
+def import_(
+    path: Path,
+    repo: Commonplace,
+    user: str,
+    prefix="chats",
+    auto_index: bool | None = None,
+    workers: int = 1,
+) -> Optional[BatchResult]:
     """Import an exported/local log or a directory of the same"""
     assert path.exists()
     if path.is_file():
-        import_one(path, repo, user, prefix=prefix, auto_index=auto_index)
-    else:
-        logger.debug("Scanning '{path}' for export files")
-        assert path.is_dir()
-        paths_to_import = sorted(p for p in path.rglob("*") if p.is_file())
-        for filepath in track(paths_to_import, "Importing files"):
-            import_one(filepath, repo, user, prefix=prefix, auto_index=auto_index)
+        import_one(path, repo, user, prefix=prefix, auto_index=auto_index, workers=workers)
+        return None
+
+    assert path.is_dir()
+    return import_batch(path, repo, user, prefix=prefix, auto_index=auto_index, workers=workers)
+
+
+def import_batch(
+    path: Path,
+    repo: Commonplace,
+    user: str,
+    prefix="chats",
+    auto_index: bool | None = None,
+    workers: int = 1,
+) -> BatchResult:
+    """
+    Import every supported export under a directory as a single batch.
+
+    Files are parsed (optionally in parallel across processes) and their notes
+    staged one file at a time. A single commit is made at the end, so indexing
+    runs at most once. A file that fails to import is logged and recorded in
+    the result rather than aborting the batch.
+
+    Args:
+        path: Directory to scan recursively for export files
+        repo: The commonplace repository
+        user: Name to use for the human interlocutor
+        prefix: Directory prefix for imported notes
+        auto_index: Whether to index after committing (default: from config)
+        workers: Number of processes used to parse files (default: 1, in-process)
+
+    Returns:
+        Which files were imported, skipped or failed
+    """
+    logger.debug(f"Scanning '{path}' for export files")
+    paths_to_import = sorted(p for p in path.rglob("*") if p.is_file())
+    result = BatchResult()
+
+    parsed_files = _parse_all(paths_to_import, repo.cache, workers)
+    for filepath, parsed in zip(track(paths_to_import, "Importing files"), parsed_files):
+        if isinstance(parsed, Exception):
+            logger.warning(f"Failed to import '{filepath}': {parsed}")
+            result.failed[filepath] = str(parsed)
+            continue
+        if parsed is None:
+            logger.debug(f"Skipping {filepath}")
+            result.skipped.append(filepath)
+            continue
+
+        try:
+            stored = store_export(parsed, repo, user, prefix=prefix)
+        except Exception as e:
+            logger.warning(f"Failed to import '{filepath}': {e}", exc_info=True)
+            result.failed[filepath] = str(e)
+            continue
+        (result.imported if stored else result.skipped).append(filepath)
+
+    logger.info(
+        f"Imported {len(result.imported)} files from '{path}' "
+        f"({len(result.skipped)} skipped, {len(result.failed)} failed)"
+    )
+    if result.imported:
+        repo.commit(f"Import {len(result.imported)} files from '{path}'", auto_index=auto_index)
+        save_checkpoints(result.imported, repo)
+    return result
+
+
+def _parse_all(paths: list[Path], cache: Path, workers: int) -> Iterator[ParsedExport | None | Exception]:
+    """Lazily parse each file, in order, optionally fanning out across processes."""
+    if workers <= 1:
+        yield from map(_parse_safely, paths, repeat(cache))
+        return
+
+    # Keep a bounded number of files in flight, so parsed exports don't pile up
+    # while earlier ones are stored. Spawn rather than fork: the progress
+    # display runs a background thread
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for path in paths:
+            pending.append(pool.submit(_parse_safely, path, cache))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _parse_safely(path: Path, cache: Path) -> ParsedExport | None | Exception:
+    """Parse an export, returning any failure instead of raising."""
+    try:
+        return parse_export(path, cache)
+    except Exception as e:
+        logger.debug(f"Failed to parse '{path}'", exc_info=True)
+        return e
+
+
+def parse_export(path: Path, cache: Path, workers: int = 1) -> ParsedExport | None:
+    """
+    Detect the right importer for a file and parse it. Claude Code sessions
+    resume from their last checkpoint, so only newly appended lines are read.
+
+    Args:
+        path: The export file
+        cache: The repository cache directory, where checkpoints are kept
+        workers: Number of processes an importer may use to parse a large export
+
+    Returns:
+        The parsed export, or None if no importer recognised the file
+    """
+    importer = autodetect_importer(path)
+    if not importer:
+        return None
+
+    with stage("parse"):
+        if isinstance(importer, ClaudeCodeImporter):
+            # A pending checkpoint is newer, but its notes haven't been committed yet
+            previous = SessionCheckpoint.load(_checkpoint_path(cache, path, pending=True)) or SessionCheckpoint.load(
+                _checkpoint_path(cache, path)
+            )
+            logs, checkpoint = importer.import_tail(path, previous)
+            return ParsedExport(path, importer, logs, checkpoint=checkpoint)
+
+        if workers > 1 and isinstance(importer, GeminiImporter):
+            importer = GeminiImporter(workers=workers)
+        return ParsedExport(path, importer, importer.import_(path))
+
+
+def _checkpoint_path(cache: Path, path: Path, pending: bool = False) -> Path:
+    key = hashlib.sha256(path.resolve().as_posix().encode()).hexdigest()
+    return cache / "checkpoints" / f"{key}{'.pending' if pending else ''}.json"
+
+
+def save_checkpoints(paths: Iterable[Path], repo: Commonplace) -> None:
+    """
+    Keep the checkpoints of session logs whose notes have now been committed,
+    so that the next import carries on from them.
+
+    Args:
+        paths: Export files that were stored since the last commit
+        repo: The commonplace repository
+    """
+    for path in paths:
+        pending = _checkpoint_path(repo.cache, path, pending=True)
+        if pending.exists():
+            pending.replace(_checkpoint_path(repo.cache, path))
 
 
 def autodetect_importer(path: Path) -> Optional[Importer]:
     assert path.is_file()
+    probe = probe_file(path)
+    if probe is None:
+        logger.debug(f"'{path}' is not a candidate export")
+        return None
+
     for importer in IMPORTERS:
         try:
-            if importer.can_import(path):
+            if importer.can_import(probe):
                 logger.info(f"Using {importer.source} importer for {path}")
                 return importer
         except:  # noqa
@@ -53,18 +238,59 @@ def autodetect_importer(path: Path) -> Optional[Importer]:
     return None
 
 
+def probe_file(path: Path, head_size: int = PROBE_HEAD_SIZE) -> Optional[Probe]:
+    """
+    Open a file once and gather everything importers need to recognise it.
+
+    Zip archives have their member names read from the central directory.
+    Files that are neither archives nor have a known text extension are
+    rejected without reading further.
+
+    Args:
+        path: The candidate export file
+        head_size: Maximum number of leading bytes to sample from text files
+
+    Returns:
+        A probe for the file, or None if it is obviously not an export
+    """
+    with open(path, "rb") as fp:
+        magic = fp.read(len(ZIP_MAGIC))
+        if magic == ZIP_MAGIC:
+            fp.seek(0)
+            try:
+                with ZipFile(fp) as zf:
+                    names = frozenset(zf.namelist())
+            except BadZipFile:
+                logger.debug(f"'{path}' looks like a zip but can't be read", exc_info=True)
+                return None
+            return Probe(path=path, head=magic, names=names)
+
+        if path.suffix not in TEXT_SUFFIXES:
+            return None
+
+        head = magic + fp.read(head_size - len(magic))
+        complete = not fp.read(1)
+        return Probe(path=path, head=head, complete=complete)
+
+
 def extract_and_store(archive: Path, paths: list[str], repo: Commonplace) -> list[RepoPath]:
-    """Extract specific files from archive and store each as a blob."""
+    """Stream specific files from archive straight into the blob store."""
     result = []
-    with tempfile.TemporaryDirectory() as tmp:
-        with ZipFile(archive) as zf:
-            for p in paths:
-                zf.extract(p, tmp)
-                result.append(repo.store_blob(Path(tmp) / p))
+    with ZipFile(archive) as zf:
+        for p in paths:
+            with zf.open(p) as member:
+                result.append(repo.store_blob(member, name=Path(p).name))
     return result
 
 
-def import_one(path: Path, repo: Commonplace, user: str, prefix="chats", auto_index: bool | None = None):
+def import_one(
+    path: Path,
+    repo: Commonplace,
+    user: str,
+    prefix="chats",
+    auto_index: bool | None = None,
+    workers: int = 1,
+):
     """
     Import chats from a supported provider into the repository.
 
@@ -72,29 +298,105 @@ def import_one(path: Path, repo: Commonplace, user: str, prefix="chats", auto_in
     - Fields provided by the importer will be updated with new values
     - User-added fields (not in importer metadata) will be preserved
     """
-    importer = autodetect_importer(path)
-    if not importer:
+    parsed = parse_export(path, repo.cache, workers=workers)
+    if not parsed:
         logger.debug(f"Skipping {path}")
         return
-    serializer = MarkdownSerializer(human=user, assistant=importer.source.title())
 
-    # Store only the required files from archives, or the whole file for non-archives
+    if store_export(parsed, repo, user, prefix=prefix):
+        repo.commit(f"Import from '{path}' using '{parsed.importer.source}' importer", auto_index=auto_index)
+        save_checkpoints([path], repo)
+
+
+def store_export(parsed: ParsedExport, repo: Commonplace, user: str, prefix="chats") -> bool:
+    """
+    Store the source export as blobs, then serialize and stage each log. Does
+    not commit.
+
+    For resumable session logs only the newly appended segment is stored. The
+    checkpoint is saved as pending once the notes are staged; call
+    save_checkpoints() after committing them.
+
+    Returns:
+        False if there was nothing new to store
+    """
+    path, importer, logs, checkpoint = parsed.path, parsed.importer, parsed.logs, parsed.checkpoint
+
+    # Store only the required files from archives, the new segment of a session
+    # log, or the whole file for other non-archives
     required = importer.required_paths()
-    if required:
-        blob_paths = extract_and_store(path, required, repo)
+    if checkpoint is not None:
+        if checkpoint.exported_offset and not _notes_unchanged(checkpoint, repo):
+            # Earlier events are kept only in the notes, so the session must be read again
+            logger.info(f"Notes from '{path}' have changed since it was imported; importing it again")
+            assert isinstance(importer, ClaudeCodeImporter)
+            logs, checkpoint = importer.import_tail(path)
+        if checkpoint.offset == checkpoint.exported_offset:
+            logger.info(f"No new activity in '{path}'")
+            return False
+        segment = _store_segment(path, checkpoint.exported_offset, checkpoint.offset, repo)
+        checkpoint.source_exports.append(segment.path.as_posix())
+        checkpoint.exported_offset = checkpoint.offset
+        source_exports = list(checkpoint.source_exports)
+    elif required:
+        source_exports = [p.path.as_posix() for p in extract_and_store(path, required, repo)]
+    else:
+        source_exports = [repo.store_blob(path).path.as_posix()]
+
+    assistant = importer.source.title()
+    if checkpoint is not None:
+        notes = _store_session(logs, checkpoint, source_exports, repo, user, assistant=assistant, prefix=prefix)
     else:
-        blob_paths = [repo.store_blob(path)]
+        notes = _store_logs(logs, source_exports, repo, user, assistant=assistant, prefix=prefix)
+
+    if checkpoint is not None:
+        checkpoint.notes = {note.as_posix(): str(repo.git.index[note.as_posix()].id) for note in notes}
+        checkpoint.save(_checkpoint_path(repo.cache, path, pending=True))
+    return True
+
+
+def _notes_unchanged(checkpoint: SessionCheckpoint, repo: Commonplace) -> bool:
+    """Check that a session's notes are still staged as they were written (e.g. not deleted or reset)."""
+    index = repo.git.index
+    for note, blob_id in checkpoint.notes.items():
+        if note not in index or str(index[note].id) != blob_id or not (repo.root / note).is_file():
+            return False
+    return True
 
-    source_exports = [p.path.as_posix() for p in blob_paths]
 
+def _store_segment(path: Path, start: int, end: int, repo: Commonplace) -> RepoPath:
+    """Store a byte range of an append-only file as a blob."""
+    with open(path, "rb") as fp:
+        fp.seek(start)
+        segment = io.BytesIO(fp.read(end - start))
+    name = path.name if start == 0 else f"{path.stem}.{start}-{end}{path.suffix}"
+    return repo.store_blob(segment, name=name)
+
+
+def _store_logs(
+    logs: list[EventLog],
+    source_exports: list[str],
+    repo: Commonplace,
+    user: str,
+    assistant: str,
+    prefix="chats",
+) -> list[Path]:
+    """
+    Serialize and stage each log, merging with any existing note's metadata.
+
+    Returns:
+        The repo-relative paths of the notes written
+    """
+    serializer = MarkdownSerializer(human=user, assistant=assistant, incremental=True)
     used_paths: Counter[Path] = Counter()
+    written = []
 
-    for log in importer.import_(path):
-        rel_path = make_chat_path(source=log.source, date=log.created, title=log.title)
+    for log in logs:
+        rel_path = make_chat_path(source=log.source, date=log.created, title=log.title, prefix=prefix)
         used_paths.update([rel_path])
         count = used_paths[rel_path]
         if count > 1:
-            rel_path = make_chat_path(source=log.source, date=log.created, title=f"{log.title}-{count}")
+            rel_path = make_chat_path(source=log.source, date=log.created, title=f"{log.title}-{count}", prefix=prefix)
 
         log.metadata["source"] = log.source
         log.metadata["source_exports"] = source_exports
@@ -107,17 +409,126 @@ def import_one(path: Path, repo: Commonplace, user: str, prefix="chats", auto_in
             log.metadata = merged_metadata
             logger.debug(f"Merged metadata for existing file '{rel_path}'")
 
+        if repo.config.blob_threshold:
+            _offload_payloads(log, rel_path, repo, repo.config.blob_threshold)
+
         # Create RepoPath for the new note (will get proper ref after commit)
         repo_path = repo.make_repo_path(rel_path)
 
-        note = Note(
-            repo_path=repo_path,
-            content=serializer.serialize(log),
-        )
-        repo.save(note)
+        with stage("serialize"), repo.open_note(repo_path) as fd:
+            serializer.write(log, fd)
+        record("notes_imported")
         logger.info(f"Stored log '{log.title}' at '{rel_path}'")
+        written.append(rel_path)
+    return written
+
+
+def _store_session(
+    logs: list[EventLog],
+    checkpoint: SessionCheckpoint,
+    source_exports: list[str],
+    repo: Commonplace,
+    user: str,
+    assistant: str,
+    prefix="chats",
+) -> list[Path]:
+    """
+    Serialize and stage the note for a session log. If a note was written by an
+    earlier import, the new events are appended to it and its frontmatter is
+    merged, rather than serializing the whole session again (the checkpoint
+    doesn't keep earlier events). Tool calls still awaiting a result go last,
+    and are replaced on the next import.
+
+    Returns:
+        The repo-relative paths of the notes written
+    """
+    serializer = MarkdownSerializer(human=user, assistant=assistant, incremental=True)
+    buffer = io.StringIO()
+
+    with stage("serialize"):
+        if checkpoint.notes:
+            (note,) = checkpoint.notes
+            rel_path = Path(note)
+            metadata: dict[str, Any] = {}
+            events: Sequence[Event] = []
+            for log in logs:
+                if repo.config.blob_threshold:
+                    _offload_payloads(log, rel_path, repo, repo.config.blob_threshold)
+                metadata |= log.metadata
+                metadata["source"] = log.source
+                events = log.events
+            metadata["source_exports"] = source_exports
+
+            existing = (repo.root / rel_path).read_text()
+            _, body = parse_frontmatter(existing)
+            serializer.write_frontmatter(merge_frontmatter(existing, metadata), buffer)
+            buffer.write(body[: len(body) - checkpoint.pending_chars])
+            serializer.write_events(events, buffer)
+        elif logs:
+            (log,) = logs
+            rel_path = make_chat_path(source=log.source, date=log.created, title=log.title, prefix=prefix)
+            log.metadata["source"] = log.source
+            log.metadata["source_exports"] = source_exports
+            if (abs_path := repo.root / rel_path).exists():
+                log.metadata = merge_frontmatter(abs_path.read_text(), log.metadata)
+            if repo.config.blob_threshold:
+                _offload_payloads(log, rel_path, repo, repo.config.blob_threshold)
+            serializer.write(log, buffer)
+        else:
+            return []
+
+        start = buffer.tell()
+        serializer.write_events(sorted(checkpoint.tool_calls.values(), key=lambda call: call.created), buffer)
+        checkpoint.pending_chars = buffer.tell() - start
+
+    with repo.open_note(repo.make_repo_path(rel_path)) as fd:
+        fd.write(buffer.getvalue())
+    record("notes_imported")
+    logger.info(f"Stored session '{rel_path}'")
+    return [rel_path]
+
+
+def _offload_payloads(log: EventLog, note_path: Path, repo: Commonplace, threshold: int) -> None:
+    """
+    Move tool outputs and the non-text parts of messages (e.g. JSON or base64
+    payloads, as marked by the importer) larger than the threshold out of the
+    log and into the blob store, leaving a link and a short preview in their
+    place. This keeps notes, and so the git history and search index, small.
+
+    Args:
+        log: The log to rewrite in place
+        note_path: Repo-relative path of the note the log will be saved to
+        repo: The commonplace repository
+        threshold: Size in bytes above which payloads are offloaded
+    """
+
+    def offload(text: str, name: str) -> tuple[str, str]:
+        blob = repo.store_blob(io.BytesIO(text.encode()), name=name)
+        link = Path(os.path.relpath(blob.path, note_path.parent)).as_posix()
+        return f"{len(text.encode()):,} bytes stored in [{name}]({link})", text[:_PREVIEW_CHARS]
+
+    # Comparing character counts first avoids encoding every payload, as UTF-8
+    # takes at most four bytes per character
+    for event in log.events:
+        if isinstance(event, ToolCall):
+            output = event.output if isinstance(event.output, str) else json.dumps(event.output, indent=2)
+            if len(output) > threshold // 4 and len(output.encode()) > threshold:
+                suffix = "txt" if isinstance(event.output, str) else "json"
+                pointer, preview = offload(output, f"{slugify(event.tool) or 'tool'}-output.{suffix}")
+                event.output = f"[{pointer}]\n\n{preview}..."
 
-    repo.commit(f"Import from '{path}' using '{importer.source}' importer", auto_index=auto_index)
+        elif isinstance(event, Message):
+            for block in event.payloads:
+                if len(block) <= threshold // 4 or not (match := _FENCED_BLOCK_RE.fullmatch(block)):
+                    continue
+                _, lang, body = match.groups()
+                if len(body.encode()) <= threshold:
+                    continue
+                pointer, preview = offload(body, f"part.{slugify(lang) or 'txt'}")
+                replacement = (
+                    f"{fenced(preview + '...', lang)}\n\n> [!NOTE]\n> Truncated {lang or 'text'} part: {pointer}"
+                )
+                event.content = event.content.replace(block, replacement, 1)
 
 
 def make_chat_path(source: str, date: datetime, title: Optional[str], prefix="chats") -> Path:
@@ -1,9 +1,11 @@
+import calendar
+import multiprocessing
 import re
-from collections import defaultdict
-from contextlib import closing
-from datetime import datetime, timezone
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Iterable
+from typing import IO, Iterable, Iterator
 from zipfile import ZipFile
 
 from bs4 import BeautifulSoup
@@ -11,14 +13,52 @@ from bs4.element import NavigableString, PageElement, Tag
 from dateutil import parser
 from dateutil.tz import gettz
 from html_to_markdown import convert_to_markdown
-from rich.progress import track
+from lxml import etree  # type: ignore[import-untyped]
 
-from commonplace._import._types import EventLog, Message, Role
+from commonplace._import._types import EventLog, Message, Probe, Role
 from commonplace._logging import logger
+from commonplace._progress import checkpoint
 
 _PROMPT_PREFIX = "Prompted"
 _HTML_PATH = "Takeout/My Activity/Gemini Apps/My Activity.html"
 
+# Takeout timestamps look like "18 Sept 2024, 00:12:50 BST"
+_TIMESTAMP_RE = re.compile(r"(\d{1,2}) ([A-Za-z]+)\.? (\d{4}), (\d{1,2}):(\d{2}):(\d{2}) ([A-Za-z]+)")
+
+# Month names as abbreviated by various locales: "Sep", "Sept", "September", ...
+_MONTHS = {
+    variant: number
+    for number, name in enumerate(calendar.month_name)
+    if name
+    for variant in (name.lower(), name[:3].lower(), name[:4].lower())
+}
+
+# Timezone abbreviations seen in Takeout exports, as fixed UTC offsets: each
+# abbreviation already says whether daylight saving applies. Ambiguous ones
+# (e.g. CST, which may be China, Cuba or US Central) are left to dateutil
+_TIMEZONES = {
+    name: timezone(timedelta(hours=hours), name)
+    for name, hours in {
+        "UTC": 0,
+        "GMT": 0,
+        "BST": 1,
+        "CET": 1,
+        "CEST": 2,
+        "EET": 2,
+        "EEST": 3,
+        "EST": -5,
+        "EDT": -4,
+        "CDT": -5,
+        "MST": -7,
+        "MDT": -6,
+        "PST": -8,
+        "PDT": -7,
+        "JST": 9,
+        "AEST": 10,
+        "AEDT": 11,
+    }.items()
+}
+
 
 class GeminiImporter:
     """
@@ -34,37 +74,37 @@ class GeminiImporter:
 
     source: str = "gemini"
 
+    def __init__(self, workers: int = 1):
+        """
+        Args:
+            workers: Number of processes used to convert cells to Markdown
+        """
+        self.workers = workers
+
     def required_paths(self) -> list[str]:
         return [_HTML_PATH]
 
-    def can_import(self, path: Path) -> bool:
-        """Check if the importer can potentially handle the given file path. It
-        zip file with the expected path structure."""
-        with closing(ZipFile(path, "r")) as zip_file:
-            # Check if the expected path exists in the zip file
-            return _HTML_PATH in zip_file.namelist()
+    def can_import(self, probe: Probe) -> bool:
+        """Check if the importer can potentially handle the given file. It must
+        be a zip file with the expected path structure."""
+        return _HTML_PATH in probe.names
 
     def import_(self, path: Path) -> list[EventLog]:
         """Import activity logs from the Gemini file."""
         with ZipFile(path, "r") as zip_file:
-            # Read the HTML file from the zip
+            # Stream the HTML file straight out of the zip
             with zip_file.open(_HTML_PATH) as file:
-                content = file.read().decode("utf-8")
-                return self._parse_gemini_html(content)
-
-    def _parse_gemini_html(self, html_content: str) -> list[EventLog]:
-        soup = BeautifulSoup(html_content, "lxml")
-
-        TURN_CONTAINER_SELECTOR = "div.content-cell:not(.mdl-typography--caption)"
-        all_content_cells = soup.select(TURN_CONTAINER_SELECTOR)
-
-        logger.info(f"Found {len(all_content_cells)} candidate content cells in the HTML")
+                return self._parse_gemini_html(file)
 
+    def _parse_gemini_html(self, source: IO[bytes]) -> list[EventLog]:
         # Get all messages
         messages: list[Message] = []
-        for cell in track(all_content_cells):
-            messages.extend(self._parse_cell(cell))
-        logger.info(f"Parsed {len(messages)} messages")
+        num_cells = 0
+        with checkpoint("Parsing cells") as steps:
+            for parsed, _ in zip(self._parse_cells(_iter_content_cells(source)), steps):
+                messages.extend(parsed)
+                num_cells += 1
+        logger.info(f"Parsed {len(messages)} messages from {num_cells} candidate content cells")
 
         # Sort and group messages into day logs
         logs_by_date = defaultdict(list)
@@ -86,6 +126,28 @@ class GeminiImporter:
         logger.info(f"Created {len(results)} day logs")
         return results
 
+    def _parse_cells(self, cells: Iterable[str]) -> Iterator[Iterable[Message]]:
+        """Convert cell HTML to messages, in order, optionally across worker processes."""
+        if self.workers <= 1:
+            yield from map(self._parse_cell_html, cells)
+            return
+
+        # Keep a bounded number of cells in flight so memory stays proportional
+        # to the number of workers rather than the size of the document
+        pending: deque[Future] = deque()
+        with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for cell in cells:
+                pending.append(pool.submit(_parse_cell_html, cell))
+                if len(pending) >= self.workers * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _parse_cell_html(self, cell_html: str) -> Iterable[Message]:
+        cell = BeautifulSoup(cell_html, "lxml").div
+        assert cell is not None
+        return self._parse_cell(cell)
+
     def _to_markdown(self, elements: Iterable[PageElement]) -> str:
         """
         Convert a list of BeautifulSoup elements to a Markdown string.
@@ -98,10 +160,13 @@ class GeminiImporter:
     def _parse_timestamp(self, timestamp: str) -> datetime:
         """
         18 Sept 2024, 00:12:50 BST
+
+        Known Takeout formats are parsed directly; anything else falls back to
+        (much slower) fuzzy parsing with dateutil.
         """
-        # NB the below fails for timezone specifiers like "BST"
-        # timestamp = timestamp.lower().replace("sept", "sep")
-        # dt = datetime.strptime(timestamp, "%d %b %Y, %H:%M:%S %Z")
+        if (dt := _parse_takeout_timestamp(timestamp)) is not None:
+            return dt
+        logger.debug(f"Falling back to fuzzy parsing for timestamp '{timestamp}'")
         dt = parser.parse(timestamp, fuzzy=True, tzinfos={"BST": gettz("Europe/London")})
         return dt.astimezone(timezone.utc)
 
@@ -159,3 +224,44 @@ class GeminiImporter:
             created=timestamp,
         )
         return user_message, ai_message
+
+
+def _parse_takeout_timestamp(timestamp: str) -> datetime | None:
+    """Parse a Takeout timestamp to UTC, or return None if it isn't in a known format."""
+    match = _TIMESTAMP_RE.fullmatch(timestamp.strip())
+    if match is None:
+        return None
+
+    day, month_name, year, hour, minute, second, tz_name = match.groups()
+    month = _MONTHS.get(month_name.lower())
+    tz = _TIMEZONES.get(tz_name.upper())
+    if month is None or tz is None:
+        return None
+
+    try:
+        dt = datetime(int(year), month, int(day), int(hour), int(minute), int(second), tzinfo=tz)
+    except ValueError:
+        return None
+    return dt.astimezone(timezone.utc)
+
+
+def _iter_content_cells(source: IO[bytes]) -> Iterator[str]:
+    """
+    Incrementally parse a Takeout activity page, yielding the HTML of each
+    content cell. Processed elements are discarded as we go, so peak memory is
+    bounded by a single activity entry rather than the whole document.
+    """
+    for _, elem in etree.iterparse(source, events=("end",), tag="div", html=True, encoding="utf-8", huge_tree=True):
+        classes = (elem.get("class") or "").split()
+        if "content-cell" in classes and "mdl-typography--caption" not in classes:
+            yield etree.tostring(elem, method="html", encoding="unicode", with_tail=False)
+
+        if "content-cell" in classes or "outer-cell" in classes:
+            elem.clear(keep_tail=True)
+            while (previous := elem.getprevious()) is not None:
+                previous.getparent().remove(previous)
+
+
+def _parse_cell_html(cell_html: str) -> Iterable[Message]:
+    """Picklable entry point for parsing cells in worker processes."""
+    return list(GeminiImporter()._parse_cell_html(cell_html))
@@ -1,10 +1,19 @@
-from typing import Any
+import io
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Sequence, TextIO
 
 import mdformat
 import yaml
 from pydantic import BaseModel, Field
 
-from commonplace._import._types import EventLog, Message, Role, ToolCall
+from commonplace._import._types import Event, EventLog, Message, Role, ToolCall
+
+_FENCE_OPEN_RE = re.compile(r" {0,3}(`{3,}|~{3,})(.*)")
+_FENCE_CLOSE_RE = re.compile(r" {0,3}(`{3,}|~{3,})[ \t]*")
+_HTML_COMMENT_RE = re.compile(r" {0,3}<!--")
+_HTML_RAW_RE = re.compile(r" {0,3}<(script|pre|style|textarea|\?|![A-Za-z]|!\[CDATA\[)", re.IGNORECASE)
+_LINK_DEFINITION_RE = re.compile(r" {0,3}\[[^\]]+\]:")
 
 
 class MarkdownSerializer(BaseModel):
@@ -14,6 +23,12 @@ class MarkdownSerializer(BaseModel):
     Converts ActivityLog objects into formatted markdown files with
     frontmatter metadata, headers for each speaker, and proper
     timestamp annotations.
+
+    In incremental mode, each event is formatted on its own and the result
+    cached by content, so re-serializing a log that has grown (e.g. a Claude
+    Code session) only formats the new events. The output is identical to
+    formatting the whole document, which is done instead if any event's
+    Markdown could affect its neighbours (e.g. an unclosed code fence).
     """
 
     human: str = Field(default="Human", description="Name to use for the human interlocutor")
@@ -21,12 +36,53 @@ class MarkdownSerializer(BaseModel):
     timespec: str = Field(default="seconds", description="Timespec for isoformat used in titles")
     wrap: int = Field(default=80, description="Target characters per line for text wrapping")
     inline_tool_output: bool = Field(default=True, description="If true, tool output will be included in full")
+    incremental: bool = Field(default=False, description="If true, format and cache each event separately")
+    validate_output: bool = Field(
+        default=True, description="If true, check that formatting hasn't changed the rendered Markdown"
+    )
 
     def serialize(self, log: EventLog, include_frontmatter=True) -> str:
         """
         Serializes an ActivityLog object to a Markdown string.
         """
+        buffer = io.StringIO()
+        self.write(log, buffer, include_frontmatter=include_frontmatter)
+        return buffer.getvalue()
+
+    def write(self, log: EventLog, fp: TextIO, include_frontmatter=True) -> None:
+        """
+        Serializes an ActivityLog object, writing the Markdown to a text file.
+        """
+        self._write_segments([self._title(log, include_frontmatter), *self._segments(log.events)], fp)
 
+    def write_frontmatter(self, metadata: dict[str, Any], fp: TextIO) -> None:
+        """
+        Writes just the frontmatter, e.g. to replace that of an existing note.
+        """
+        lines: list[str] = []
+        self._add_metadata(lines, metadata)
+        fp.write(_format("\n".join(lines), self.wrap, self.validate_output))
+
+    def write_events(self, events: Sequence[Event], fp: TextIO) -> None:
+        """
+        Serializes events that follow on from a log already written to the
+        text file, so that a growing log needn't be serialized again.
+        """
+        if events:
+            fp.write("\n")
+            self._write_segments(list(self._segments(events)), fp)
+
+    def _write_segments(self, segments: list[str], fp: TextIO) -> None:
+        if self.incremental and all(map(_is_self_contained, segments)):
+            for i, segment in enumerate(segments):
+                if i:
+                    fp.write("\n")
+                fp.write(_format_cached(segment, self.wrap, self.validate_output))
+        else:
+            fp.write(_format("\n".join(segments), self.wrap, self.validate_output))
+
+    def _title(self, log: EventLog, include_frontmatter: bool) -> str:
+        """Return the unformatted Markdown for the frontmatter and title."""
         lines: list[str] = []
         if include_frontmatter:
             self._add_metadata(lines, log.metadata)
@@ -37,8 +93,12 @@ class MarkdownSerializer(BaseModel):
             title,
             created=log.created.isoformat(timespec=self.timespec),
         )
+        return "\n".join(lines)
 
-        for event in log.events:
+    def _segments(self, events: Iterable[Event]) -> Iterator[str]:
+        """Yield the unformatted Markdown for each event."""
+        for event in events:
+            lines: list[str] = []
             if isinstance(event, Message):
                 sender = self.human if event.sender == Role.USER else self.assistant
 
@@ -68,19 +128,21 @@ class MarkdownSerializer(BaseModel):
                 }
                 if self.inline_tool_output:
                     details["output"] = event.output
-                yaml_str = yaml.dump(details, sort_keys=False)
+                yaml_str = self._dump_yaml(details) if self.incremental else yaml.dump(details, sort_keys=False)
                 lines.append(f"```yaml\n{yaml_str}\n```")
 
-        markdown = "\n".join(lines)
-        formatted = mdformat.text(
-            markdown,
-            extensions=[
-                "frontmatter",
-                "gfm",
-            ],
-            options={"wrap": self.wrap, "number": True, "validate": True},
-        )
-        return formatted
+            else:
+                continue
+            yield "\n".join(lines)
+
+    def _dump_yaml(self, data: dict[str, Any]) -> str:
+        """Dump data as YAML, cached by its repr (which, unlike equality, distinguishes e.g. 1 and True)."""
+        key = repr(data)
+        if (dumped := _yaml_cache.get(key)) is None:
+            if len(_yaml_cache) >= _CACHE_SIZE:
+                _yaml_cache.clear()
+            dumped = _yaml_cache[key] = yaml.dump(data, sort_keys=False)
+        return dumped
 
     def _add_metadata(self, lines: list[str], metadata: dict[str, Any], frontmatter: bool = True) -> None:
         if not metadata:
@@ -100,3 +162,45 @@ class MarkdownSerializer(BaseModel):
         ]
         lines.append(" ".join(bits))
         lines.append("")
+
+
+def _format(markdown: str, wrap: int, validate: bool) -> str:
+    return mdformat.text(
+        markdown,
+        extensions=[
+            "frontmatter",
+            "gfm",
+        ],
+        options={"wrap": wrap, "number": True, "validate": validate},
+    )
+
+
+_CACHE_SIZE = 4096
+_format_cached = lru_cache(maxsize=_CACHE_SIZE)(_format)
+_yaml_cache: dict[str, str] = {}
+
+
+def _is_self_contained(markdown: str) -> bool:
+    """
+    Conservatively check that a chunk of Markdown formats the same on its own
+    as it does within a larger document: it must not leave a fenced code or
+    raw HTML block open, and must not define link references (which apply to
+    the whole document).
+    """
+    fence = None
+    in_comment = False
+    for line in markdown.splitlines():
+        if fence:
+            if (match := _FENCE_CLOSE_RE.fullmatch(line)) and match[1].startswith(fence):
+                fence = None
+        elif in_comment:
+            in_comment = "-->" not in line
+        elif match := _FENCE_OPEN_RE.match(line):
+            marker, info = match.groups()
+            if not (marker[0] == "`" and "`" in info):
+                fence = marker
+        elif match := _HTML_COMMENT_RE.match(line):
+            in_comment = "-->" not in line[match.end() :]
+        elif _HTML_RAW_RE.match(line) or _LINK_DEFINITION_RE.match(line):
+            return False
+    return fence is None and not in_comment
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum, auto
 from pathlib import Path
@@ -31,6 +32,11 @@ class Message(Event):
 
     sender: Role = Field(description="The name or role of the sender")
     content: str = Field(description="The content of the message in Markdown")
+    payloads: list[str] = Field(
+        default_factory=list,
+        exclude=True,
+        description="Fenced blocks in the content holding non-text parts (e.g. JSON), which may be offloaded to blobs",
+    )
 
 
 class ToolCall(Event):
@@ -55,6 +61,31 @@ class EventLog(BaseModel):
     )
 
 
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+@dataclass(frozen=True)
+class Probe:
+    """
+    A single cheap look at a candidate export file, shared by all importers so
+    that autodetection opens each file only once.
+    """
+
+    path: Path
+    head: bytes = b""
+    """Leading bytes of the file"""
+
+    complete: bool = False
+    """True if head holds the whole file"""
+
+    names: frozenset[str] = frozenset()
+    """Member names if the file is a zip archive, otherwise empty"""
+
+    @property
+    def is_zip(self) -> bool:
+        return self.head.startswith(ZIP_MAGIC)
+
+
 @runtime_checkable
 class Importer(Protocol):
     """
@@ -68,7 +99,9 @@ class Importer(Protocol):
 
     source: str
 
-    def can_import(self, path: Path) -> bool: ...
+    def can_import(self, probe: Probe) -> bool:
+        """Check if the importer can handle a file, judging only from its probe."""
+        ...
 
     def import_(self, path: Path) -> list[EventLog]: ...
 
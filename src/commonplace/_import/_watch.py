@@ -0,0 +1,236 @@
+"""Continuously import Claude Code sessions as they are written."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Protocol
+
+from commonplace._import._claude_code import ClaudeCodeImporter
+from commonplace._import._commands import TEXT_SUFFIXES, parse_export, save_checkpoints, store_export
+from commonplace._logging import logger
+from commonplace._repo import Commonplace
+
+# See inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_IN_EVENT = struct.Struct("iIII")
+
+
+class Watcher(Protocol):
+    """Reports files under a directory that have changed."""
+
+    def changes(self, timeout: float) -> set[Path]:
+        """
+        Wait up to timeout seconds for changes.
+
+        Returns:
+            Paths of files that were created or modified since the last call
+        """
+        ...
+
+    def close(self) -> None: ...
+
+
+class InotifyWatcher:
+    """Watcher using Linux inotify, watching every directory under the root."""
+
+    def __init__(self, root: Path):
+        self._root = root
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self._dirs: dict[int, Path] = {}
+        self._watch_tree(root)
+
+    def _watch_tree(self, root: Path) -> list[Path]:
+        """Watch root and its subdirectories, returning the files already in them."""
+        files: list[Path] = []
+        for dirpath, _, filenames in os.walk(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), _IN_WATCH_MASK)
+            if wd < 0:
+                logger.warning(f"Could not watch '{dirpath}': {os.strerror(ctypes.get_errno())}")
+                continue
+            self._dirs[wd] = Path(dirpath)
+            files.extend(Path(dirpath) / name for name in filenames)
+        return files
+
+    def changes(self, timeout: float) -> set[Path]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed: set[Path] = set()
+        data = os.read(self._fd, 64 * 1024)
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _IN_EVENT.unpack_from(data, pos)
+            name = os.fsdecode(data[pos + _IN_EVENT.size : pos + _IN_EVENT.size + length].rstrip(b"\0"))
+            pos += _IN_EVENT.size + length
+
+            if mask & _IN_Q_OVERFLOW:
+                logger.warning("Missed filesystem events; rescanning")
+                changed.update(p for p in self._root.rglob("*") if p.is_file())
+                continue
+            if mask & _IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if wd not in self._dirs:
+                continue
+
+            path = self._dirs[wd] / name
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    changed.update(self._watch_tree(path))
+            else:
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Watcher that compares file modification times and sizes on an interval."""
+
+    def __init__(self, root: Path, interval: float = 2.0):
+        self._root = root
+        self._interval = interval
+        self._next_scan = time.monotonic() + interval
+        self._seen = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        seen = {}
+        for dirpath, _, filenames in os.walk(self._root):
+            for name in filenames:
+                path = Path(dirpath) / name
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                seen[path] = (st.st_mtime_ns, st.st_size)
+        return seen
+
+    def changes(self, timeout: float) -> set[Path]:
+        wait = self._next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(wait, 0))
+        self._next_scan = time.monotonic() + self._interval
+
+        previous, self._seen = self._seen, self._scan()
+        return {path for path, stat in self._seen.items() if previous.get(path) != stat}
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(root: Path, poll_interval: float = 2.0) -> Watcher:
+    """Use inotify where available, falling back to polling."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify unavailable ({e}); polling for changes instead")
+    return PollingWatcher(root, poll_interval)
+
+
+def watch(
+    path: Path,
+    repo: Commonplace,
+    user: str,
+    prefix="chats",
+    auto_index: bool | None = None,
+    debounce: float = 2.0,
+    batch_interval: float = 60.0,
+    stop: threading.Event | None = None,
+    watcher: Watcher | None = None,
+) -> None:
+    """
+    Watch a directory (e.g. ~/.claude/projects) and import Claude Code sessions
+    as they change, until interrupted.
+
+    A session is imported once it has been quiet for `debounce` seconds, and
+    thanks to session checkpoints only its new lines are parsed and appended
+    to its note. Imports are committed (and so indexed) together at most every
+    `batch_interval` seconds, and once more on exit.
+
+    Args:
+        path: Directory to watch recursively
+        repo: The commonplace repository
+        user: Name to use for the human interlocutor
+        prefix: Directory prefix for imported notes
+        auto_index: Whether to index after committing (default: from config)
+        debounce: Seconds a session must be unchanged before it is imported
+        batch_interval: Minimum seconds between commits
+        stop: Event to signal the watch should end (default: run until interrupted)
+        watcher: Source of change notifications (default: inotify or polling)
+    """
+    assert path.is_dir()
+    stop = stop or threading.Event()
+    watcher = watcher or make_watcher(path)
+    tick = min(debounce, batch_interval) / 2
+
+    # Catch up on anything written while we weren't watching
+    now = time.monotonic()
+    pending: dict[Path, float] = {p: now - debounce for p in path.rglob("*") if p.suffix in TEXT_SUFFIXES}
+    imported: set[Path] = set()
+    last_commit = now
+
+    def commit() -> None:
+        nonlocal last_commit
+        last_commit = time.monotonic()
+        if imported:
+            repo.commit(f"Import {len(imported)} sessions from '{path}'", auto_index=auto_index)
+            save_checkpoints(imported, repo)
+            imported.clear()
+
+    logger.info(f"Watching '{path}' for Claude Code sessions (Ctrl-C to stop)")
+    try:
+        while not stop.is_set():
+            for changed in watcher.changes(timeout=tick):
+                if changed.suffix in TEXT_SUFFIXES:
+                    pending[changed] = time.monotonic()
+
+            now = time.monotonic()
+
+            for session in [p for p, changed_at in pending.items() if now - changed_at >= debounce]:
+                del pending[session]
+                if _import_session(session, repo, user, prefix):
+                    imported.add(session)
+
+            if imported and now - last_commit >= batch_interval:
+                commit()
+    except KeyboardInterrupt:
+        logger.info("Stopping watch")
+    finally:
+        commit()
+        watcher.close()
+
+
+def _import_session(path: Path, repo: Commonplace, user: str, prefix: str) -> bool:
+    """Import any new activity in a session, returning True if anything was staged."""
+    try:
+        if not path.is_file():
+            return False
+        parsed = parse_export(path, repo.cache)
+        if parsed is None or not isinstance(parsed.importer, ClaudeCodeImporter):
+            return False
+        return store_export(parsed, repo, user, prefix=prefix)
+    except Exception as e:
+        logger.warning(f"Failed to import '{path}': {e}", exc_info=True)
+        return False
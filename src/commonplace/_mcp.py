@@ -0,0 +1,257 @@
+"""
+A Model Context Protocol (MCP) server over stdio, so that agents can search and
+read a commonplace through tools, loading the index once per session rather
+than once per command.
+
+Only the parts of the protocol needed to serve tools are implemented: JSON-RPC
+messages, one per line, are read from stdin and written to stdout. Anything
+else that would be printed (e.g. logging) goes to stderr.
+"""
+
+import contextlib
+import functools
+import inspect
+import io
+import json
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TextIO
+
+from commonplace import __version__
+from commonplace._api import RequestError, SearchAPI
+from commonplace._logging import logger
+from commonplace._repo import Commonplace
+from commonplace._search._types import SearchMethod
+
+# Newest first
+PROTOCOL_VERSIONS = ("2025-06-18", "2025-03-26", "2024-11-05")
+
+# JSON-RPC error codes
+_PARSE_ERROR = -32700
+_INVALID_REQUEST = -32600
+_METHOD_NOT_FOUND = -32601
+_INVALID_PARAMS = -32602
+_INTERNAL_ERROR = -32603
+
+_SEARCH_OPTIONS = {
+    "limit": {"type": "integer", "minimum": 1, "default": 10, "description": "Maximum number of results"},
+    "method": {
+        "type": "string",
+        "enum": [method.value for method in SearchMethod],
+        "default": SearchMethod.HYBRID.value,
+        "description": "Semantic, keyword (full-text), or hybrid (both)",
+    },
+}
+
+TOOLS = [
+    {
+        "name": "search",
+        "description": (
+            "Search the commonplace for passages about a query. Each hit has the note's path and the ref "
+            "(commit) it was indexed at, the section and text of the passage, and a relevance score."
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {"query": {"type": "string", "description": "What to search for"}, **_SEARCH_OPTIONS},
+            "required": ["query"],
+        },
+    },
+    {
+        "name": "search_batch",
+        "description": "Run several searches at once, which is faster than one at a time. Returns hits for each query.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "queries": {"type": "array", "items": {"type": "string"}, "description": "What to search for"},
+                **_SEARCH_OPTIONS,
+            },
+            "required": ["queries"],
+        },
+    },
+    {
+        "name": "read_note",
+        "description": "Read a note in full, as it was at a ref (e.g. from a search hit) or as last changed.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "path": {"type": "string", "description": "The note's path within the commonplace"},
+                "ref": {"type": "string", "description": "Commit to read the note at (default: latest)"},
+            },
+            "required": ["path"],
+        },
+    },
+    {
+        "name": "stats",
+        "description": "Count the notes and indexed passages in the commonplace, by source.",
+        "inputSchema": {"type": "object", "properties": {}},
+    },
+]
+
+
+class MCPServer:
+    """Serves the commonplace tools to one client, handling several calls at once."""
+
+    def __init__(self, repo: Commonplace, input: TextIO, output: TextIO, workers: int = 4):
+        """
+        Args:
+            repo: The commonplace repository
+            input: Where to read messages from
+            output: Where to write messages to
+            workers: Number of tool calls to handle at once
+        """
+        self.api = SearchAPI(repo)
+        self._input = input
+        self._output = output
+        self._output_lock = threading.Lock()
+        self._workers = workers
+        # Calls that haven't finished yet, by request id, so they can be cancelled
+        self._calls: dict[Any, Future] = {}
+        self._tools: dict[str, Callable[..., Any]] = {
+            "search": lambda query=None, limit=10, method=SearchMethod.HYBRID: self.api.search(query, limit, method),
+            "search_batch": lambda queries=None, limit=10, method=SearchMethod.HYBRID: self.api.search_batch(
+                queries, limit, method
+            ),
+            "read_note": lambda path=None, ref=None: self.api.note(path, ref),
+            "stats": lambda: self.api.stats(),
+        }
+
+    def serve_forever(self) -> None:
+        """Handle messages until the input is closed."""
+        # Load the index while the client starts up, so the first search is quick
+        warm = threading.Thread(target=self._warm)
+        warm.start()
+        with ThreadPoolExecutor(self._workers, thread_name_prefix="commonplace-mcp") as pool:
+            for line in self._input:
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                except ValueError as e:
+                    self._send({"jsonrpc": "2.0", "id": None, "error": {"code": _PARSE_ERROR, "message": str(e)}})
+                    continue
+                if isinstance(message, dict) and message.get("method") == "tools/call" and _is_id(message.get("id")):
+                    id = message["id"]
+                    call = self._calls[id] = pool.submit(self._reply, message)
+                    call.add_done_callback(functools.partial(self._forget_call, id))
+                else:
+                    self._reply(message)
+        warm.join()
+        logger.info("MCP client disconnected")
+
+    def _warm(self) -> None:
+        try:
+            self.api.warm()
+        except Exception as e:
+            logger.warning(f"Failed to load the search index: {e}")
+
+    def _forget_call(self, id: Any, call: Future) -> None:
+        self._calls.pop(id, None)
+
+    def _reply(self, message: Any) -> None:
+        try:
+            response = self.handle(message)
+        except Exception as e:
+            # Every request gets a response, even if handling it went wrong
+            logger.exception(f"Error handling message: {e}")
+            if not isinstance(message, dict) or "id" not in message:
+                return
+            response = _error(message["id"], _INTERNAL_ERROR, f"Internal error: {e}")
+        if response is not None:
+            self._send(response)
+
+    def _send(self, message: dict[str, Any]) -> None:
+        line = json.dumps(message) + "\n"
+        with self._output_lock:
+            self._output.write(line)
+            self._output.flush()
+
+    def handle(self, message: Any) -> dict[str, Any] | None:
+        """
+        Handle a message from the client.
+
+        Returns:
+            The response, or None if the message was a notification
+        """
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or "method" not in message:
+            return _error(message.get("id") if isinstance(message, dict) else None, _INVALID_REQUEST, "Invalid request")
+
+        method, params = message["method"], message.get("params") or {}
+        if not isinstance(params, dict):
+            return _error(message["id"], _INVALID_PARAMS, "Params must be an object") if "id" in message else None
+        if "id" not in message:
+            if method == "notifications/cancelled" and (call := self._calls.get(params.get("requestId"))):
+                # Calls that have started can't be interrupted, but those waiting for a worker are dropped
+                call.cancel()
+            return None
+
+        id = message["id"]
+        if method == "initialize":
+            requested = params.get("protocolVersion")
+            return _result(
+                id,
+                {
+                    "protocolVersion": requested if requested in PROTOCOL_VERSIONS else PROTOCOL_VERSIONS[0],
+                    "capabilities": {"tools": {}},
+                    "serverInfo": {"name": "commonplace", "version": __version__},
+                },
+            )
+        elif method == "ping":
+            return _result(id, {})
+        elif method == "tools/list":
+            return _result(id, {"tools": TOOLS})
+        elif method == "tools/call":
+            name, arguments = params.get("name"), params.get("arguments") or {}
+            if not isinstance(name, str) or name not in self._tools:
+                return _error(id, _INVALID_PARAMS, f"Unknown tool: {name}")
+            if not isinstance(arguments, dict):
+                return _error(id, _INVALID_PARAMS, "Tool arguments must be an object")
+            return _result(id, self._call_tool(name, arguments))
+        return _error(id, _METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+    def _call_tool(self, name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+        # Mistakes in the arguments are reported to the model, so that it can correct them
+        tool = self._tools[name]
+        try:
+            inspect.signature(tool).bind(**arguments)
+        except TypeError as e:
+            return _tool_error(f"Invalid arguments for {name}: {e}")
+        try:
+            result = tool(**arguments)
+        except RequestError as e:
+            return _tool_error(str(e))
+        except Exception as e:
+            logger.exception(f"Error calling {name}: {e}")
+            return _tool_error(f"Error calling {name}: {e}")
+        return {"content": [{"type": "text", "text": json.dumps(result)}], "isError": False}
+
+
+def _is_id(id: Any) -> bool:
+    """Check for a request id as JSON-RPC allows, which can be used as a key."""
+    return isinstance(id, (str, int, float)) or id is None
+
+
+def _result(id: Any, result: dict[str, Any]) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": id, "result": result}
+
+
+def _error(id: Any, code: int, message: str) -> dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": id, "error": {"code": code, "message": message}}
+
+
+def _tool_error(message: str) -> dict[str, Any]:
+    return {"content": [{"type": "text", "text": message}], "isError": True}
+
+
+def serve(repo: Commonplace) -> None:
+    """Serve the commonplace tools over stdin and stdout until stdin is closed."""
+    output = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", newline="\n", write_through=True)
+    input = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    # Keep anything else that would be printed out of the protocol stream
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            MCPServer(repo, input, output).serve_forever()
+    finally:
+        # So that closing the wrappers doesn't close stdin and stdout
+        input.detach()
+        output.detach()
@@ -0,0 +1,202 @@
+"""
+Memory profiling by pipeline stage, to find out what is responsible when a
+large import or index build runs out of memory.
+
+Code marks its stages with `stage`, which costs nothing unless profiling is
+on. With `profile`, each stage's Python allocation peak (from tracemalloc)
+and the process's RSS high-water mark are recorded. Stages only read
+counters, so they are cheap enough to mark in loops. The top allocation
+sites come from a snapshot when profiling ends, and from one taken when a
+stage sets a new peak, though only each time the peak doubles as snapshots
+are slow. Only the current process is profiled, so work done by worker
+processes (e.g. `import --workers`) isn't included, and peaks are
+process-wide, so stages running at once in different threads share them.
+"""
+
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from rich.console import Console
+from rich.table import Table
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+# ru_maxrss is in kilobytes on Linux, but bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+# Take a snapshot for a new peak only once it is this many times the last one
+_PEAK_SNAPSHOT_STRIDE = 2
+
+
+@dataclass
+class StageMemory:
+    """Memory used by a pipeline stage, over all the times it ran."""
+
+    calls: int = 0
+    seconds: float = 0.0
+    peak_bytes: int = 0
+    """Highest Python allocation (as traced) while the stage was running"""
+    rss_high_water_bytes: int = 0
+    """The process's peak resident set size by the time the stage finished"""
+    rss_growth_bytes: int = 0
+    """How much the stage raised the process's peak resident set size"""
+
+
+@dataclass
+class MemoryProfile:
+    """Memory used by each pipeline stage."""
+
+    stages: dict[str, StageMemory] = field(default_factory=dict)
+    peak_bytes: int = 0
+    """Highest Python allocation (as traced) overall"""
+    peak_stage: str | None = None
+    """The stage running at the highest peak"""
+    top_sites: list[tuple[str, int, int]] = field(default_factory=list)
+    """(site, bytes, blocks) of the largest allocations still held when profiling ended"""
+    peak_sites: list[tuple[str, int, int]] = field(default_factory=list)
+    """(site, bytes, blocks) of the largest allocations held when a stage last set a peak (at a coarse stride)"""
+    peak_sites_bytes: int = 0
+    """The peak at which peak_sites were captured"""
+
+    def print(self, console: Console | None = None) -> None:
+        """Print the stages, and the top allocation sites."""
+        console = console or Console(stderr=True)
+
+        table = Table("Stage", "Calls", "Seconds", "Peak traced", "RSS high water", "RSS growth", title="Memory")
+        for name, memory in self.stages.items():
+            table.add_row(
+                name,
+                f"{memory.calls:,}",
+                f"{memory.seconds:.2f}",
+                _format_bytes(memory.peak_bytes),
+                _format_bytes(memory.rss_high_water_bytes),
+                _format_bytes(memory.rss_growth_bytes),
+            )
+        console.print(table)
+
+        for title, top_sites in [
+            (f"Top allocation sites at a peak of {_format_bytes(self.peak_sites_bytes)}", self.peak_sites),
+            ("Top allocation sites at the end", self.top_sites),
+        ]:
+            if top_sites:
+                sites = Table("Site", "Size", "Blocks", title=title)
+                for site, size, blocks in top_sites:
+                    sites.add_row(site, _format_bytes(size), f"{blocks:,}")
+                console.print(sites)
+
+
+class _Stages(threading.local):
+    def __init__(self) -> None:
+        # Stages currently running in this thread, innermost last, with their peaks so far
+        self.running: list[tuple[str, list[int]]] = []
+
+
+_profile: MemoryProfile | None = None
+_profile_lock = threading.Lock()
+_top = 10
+_stages = _Stages()
+
+
+@contextmanager
+def profile(top: int = 10, frames: int = 1) -> Iterator[MemoryProfile]:
+    """
+    Profile memory use by stage until the block exits.
+
+    Args:
+        top: Number of allocation sites to report
+        frames: Number of frames of traceback to keep for each allocation
+
+    Returns:
+        The profile, which is complete once the block has exited
+    """
+    global _profile, _top
+    if _profile is not None:
+        raise RuntimeError("Already profiling memory")
+
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(frames)
+    _profile, _top = MemoryProfile(), top
+    try:
+        with stage("total"):
+            yield _profile
+        _profile.top_sites = _top_sites(top)
+    finally:
+        _profile = None
+        if not already_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mark a pipeline stage, whose memory use is recorded if profiling."""
+    if _profile is None:
+        yield
+        return
+
+    running = _stages.running
+
+    # Peaks are per process, so credit the peak so far to the enclosing stages before resetting it
+    _, peak = tracemalloc.get_traced_memory()
+    for _, peaks in running:
+        peaks[0] = max(peaks[0], peak)
+    tracemalloc.reset_peak()
+    rss_before = _rss_high_water()
+    started = time.perf_counter()
+
+    peaks = [0]
+    running.append((name, peaks))
+    try:
+        yield
+    finally:
+        running.pop()
+        _, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, peaks[0])
+        for _, outer in running:
+            outer[0] = max(outer[0], peak)
+
+        rss_after = _rss_high_water()
+        with _profile_lock:
+            memory = _profile.stages.setdefault(name, StageMemory())
+            memory.calls += 1
+            memory.seconds += time.perf_counter() - started
+            memory.peak_bytes = max(memory.peak_bytes, peak)
+            memory.rss_high_water_bytes = max(memory.rss_high_water_bytes, rss_after)
+            memory.rss_growth_bytes += rss_after - rss_before
+
+            if name == "total":
+                _profile.peak_bytes = max(_profile.peak_bytes, peak)
+            elif peak > _profile.peak_bytes:
+                _profile.peak_bytes, _profile.peak_stage = peak, name
+                if peak >= _profile.peak_sites_bytes * _PEAK_SNAPSHOT_STRIDE:
+                    # What the stage still holds is the best clue as to what made the peak
+                    _profile.peak_sites, _profile.peak_sites_bytes = _top_sites(_top), peak
+                    # Don't credit the snapshot itself to the enclosing stages
+                    tracemalloc.reset_peak()
+
+
+def _top_sites(top: int) -> list[tuple[str, int, int]]:
+    """The largest allocation sites, by size. Snapshots are slow (and allocate) in proportion to what is traced."""
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    return [(str(stat.traceback), stat.size, stat.count) for stat in statistics[:top]]
+
+
+def _rss_high_water() -> int:
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:,.0f} {unit}" if unit == "B" else f"{size:,.1f} {unit}"
+        size /= 1024  # type: ignore[assignment]
+    return f"{size:,.1f} GiB"
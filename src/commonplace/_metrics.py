@@ -0,0 +1,177 @@
+"""
+Operational metrics for monitoring commonplace when it runs unattended
+(e.g. imports and indexing from cron).
+
+Instrumented code records what it did with `record` and `timed`. After each
+command, if enabled, `write_metrics` writes the values alongside index health
+to `.commonplace/cache` as JSON and as a Prometheus textfile (for the node
+exporter's textfile collector).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from commonplace._logging import logger
+from commonplace._repo import Commonplace
+
+# Values recorded by the command running in this process, from any thread
+_values: defaultdict[str, float] = defaultdict(int)
+_values_lock = threading.Lock()
+# The commit the index was last brought up to date with in this process, and when
+_index_commit: dict[str, Any] | None = None
+
+# Metrics recorded by commands, with their help text
+COMMAND_METRICS = {
+    "notes_imported": "Notes written by the last run",
+    "chunks_embedded": "Chunks embedded and added to the index by the last run",
+    "embed_seconds": "Seconds spent embedding chunks in the last run",
+    "sqlite_write_seconds": "Seconds spent writing chunks to the index in the last run",
+    "searches": "Searches run by the last run",
+    "search_seconds": "Seconds spent searching in the last run",
+}
+
+JSON_NAME = "metrics.json"
+PROMETHEUS_NAME = "metrics.prom"
+
+
+def record(name: str, value: float = 1) -> None:
+    """Add to a metric for the current command."""
+    with _values_lock:
+        _values[name] += value
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the seconds taken by the block to a metric for the current command."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def record_index_commit(commit: str) -> None:
+    """Record that the index has been brought up to date with a commit."""
+    global _index_commit
+    _index_commit = {"commit": commit, "timestamp": time.time()}
+
+
+def reset() -> None:
+    """Forget the values recorded so far."""
+    global _index_commit
+    with _values_lock:
+        _values.clear()
+    _index_commit = None
+
+
+def write_metrics(repo: Commonplace, command: str, success: bool, duration: float) -> dict[str, Any]:
+    """
+    Write the metrics for a command that has just run, keeping those of
+    earlier runs of other commands, so that e.g. an import and an index run
+    from cron are both reported.
+
+    Args:
+        repo: The commonplace repository
+        command: Name of the command
+        success: Whether the command succeeded
+        duration: Seconds the command took
+
+    Returns:
+        The metrics written
+    """
+    json_path = repo.cache / JSON_NAME
+    try:
+        metrics = json.loads(json_path.read_bytes())
+        commands = metrics["commands"]
+        last_index = metrics["index"].get("last_commit")
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable metrics '{json_path}': {e}")
+        commands, last_index = {}, None
+
+    with _values_lock:
+        values = {name: _values.get(name, 0) for name in COMMAND_METRICS}
+    now = time.time()
+    previous = commands.get(command, {})
+    commands[command] = {
+        **values,
+        "duration_seconds": duration,
+        "success": success,
+        "last_run_timestamp": now,
+        "last_success_timestamp": now if success else previous.get("last_success_timestamp"),
+    }
+    if _index_commit is not None:
+        last_index = _index_commit
+
+    db_path = repo.cache / "index.db"
+    total, stale = repo.index.count_chunks(repo.note_paths())
+    metrics = {
+        "commands": commands,
+        "index": {
+            "size_bytes": db_path.stat().st_size if db_path.exists() else 0,
+            "chunks": total,
+            "stale_chunks": stale,
+            "last_commit": last_index,
+        },
+    }
+
+    _write_atomic(json_path, json.dumps(metrics, indent=2))
+    _write_atomic(repo.cache / PROMETHEUS_NAME, _to_prometheus(metrics))
+    return metrics
+
+
+def _to_prometheus(metrics: dict[str, Any]) -> str:
+    lines: list[str] = []
+
+    def add(name: str, kind: str, help: str, samples: list[tuple[str, float]]) -> None:
+        lines.append(f"# HELP commonplace_{name} {help}")
+        lines.append(f"# TYPE commonplace_{name} {kind}")
+        lines.extend(f"commonplace_{name}{labels} {float(value)}" for labels, value in samples)
+
+    commands = sorted(metrics["commands"].items())
+    per_command = {
+        **COMMAND_METRICS,
+        "duration_seconds": "Seconds taken by the last run",
+        "success": "Whether the last run succeeded",
+        "last_run_timestamp": "When the command last ran, in seconds since the epoch",
+        "last_success_timestamp": "When the command last succeeded, in seconds since the epoch",
+    }
+    for name, help in per_command.items():
+        samples = [
+            (f'{{command="{command}"}}', float(values[name]))
+            for command, values in commands
+            if values.get(name) is not None
+        ]
+        if samples:
+            add(f"command_{name}", "gauge", help, samples)
+
+    index = metrics["index"]
+    add("index_size_bytes", "gauge", "Size of the index database in bytes", [("", index["size_bytes"])])
+    add("index_chunks", "gauge", "Chunks in the index", [("", index["chunks"])])
+    add(
+        "index_stale_chunks",
+        "gauge",
+        "Chunks in the index for notes that have since changed or been deleted",
+        [("", index["stale_chunks"])],
+    )
+    if last := index["last_commit"]:
+        add(
+            "index_last_commit_timestamp",
+            "gauge",
+            "When the index was last brought up to date with a commit, in seconds since the epoch",
+            [(f'{{commit="{last["commit"]}"}}', last["timestamp"])],
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
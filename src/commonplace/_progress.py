@@ -1,9 +1,10 @@
 import itertools as it
+import operator
 import time
 from contextlib import contextmanager
-from typing import Optional
+from typing import Any, Callable, Iterable, Iterator, Optional, Protocol, TypeVar
 
-from rich.console import Group, RenderableType
+from rich.console import Console, Group, RenderableType
 from rich.live import Live
 from rich.progress import (
     BarColumn,
@@ -17,6 +18,10 @@ from rich.progress import (
 )
 from rich.text import Text
 
+from commonplace._logging import logger
+
+T = TypeVar("T")
+
 _live: Optional[Live] = None
 _live_renderables: list[RenderableType] = []
 
@@ -65,58 +70,138 @@ def checkpoint(name="", every=0.5, fields=lambda: {}, quiet=False):
         yield it.count()
         return
 
-    progress = Progress(
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        MofNCompleteColumn(),
-        TaskProgressColumn(show_speed=True),
-        TimeRemainingColumn(),  # SpinnerColumn(),
-        TimeElapsedColumn(),
-        *(TaskFieldColumn(k) for k in fields()),
-    )
-    start_live(progress)
-    # progress.console.height = 1
-    # progress.console.options.overflow = "ellipsis"
-    task = progress.add_task(name, total=None, **fields())
-
-    def generator():
-        checkpoint_at = 0
-        for step in it.count():
-            progress.update(task, advance=1)
-            if checkpoint_at < time.time():
-                checkpoint_at = time.time() + every
-                progress.update(task, **fields())
-            yield step
-
-    yield generator()
-    progress.update(task, **fields())
-    stop_live(progress)
-
-
-def track(iterable, name="", fields=lambda: {}, every=0.5):
-    progress = Progress(
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        MofNCompleteColumn(),
-        TaskProgressColumn(show_speed=True),
-        TimeRemainingColumn(),  # SpinnerColumn(),
-        TimeElapsedColumn(),
-        TaskFieldColumn("item"),
-        *(TaskFieldColumn(k) for k in fields()),
-    )
-    iterable = list(iterable)
-    task = progress.add_task(name, total=len(iterable))
-    checkpoint_at = 0
-    start_live(progress)
-    for item in iterable:
-        progress.update(task, advance=1, item=item)
-        if time.time() > checkpoint_at:
-            progress.update(task, **fields())
-            checkpoint_at = time.time() + every
-        yield item
-
-    progress.update(task, **fields())
-    stop_live(progress)
+    steps = track(it.count(), name, fields=fields, every=every, show_item=False)
+    try:
+        yield steps
+    finally:
+        steps.close()
+
+
+def track(
+    iterable: Iterable[T],
+    name: str = "",
+    fields: Callable[[], dict] = lambda: {},
+    every: float = 0.5,
+    total: int | None = None,
+    show_item: bool = True,
+    log_every: float = 10.0,
+) -> Iterator[T]:
+    """
+    Iterate, reporting progress.
+
+    Items are streamed, not collected up front, so the total comes from
+    `total`, or failing that the iterable's length (or length hint); if none
+    is known, progress is shown without one. Progress is reported at most
+    every `every` seconds, and the clock is only consulted often enough for
+    that, so a tight loop pays little more than a comparison per item. When
+    not writing to a terminal, progress is logged every `log_every` seconds
+    instead.
+
+    Args:
+        iterable: The items to iterate over
+        name: Description of the task
+        fields: Callable returning extra fields to report
+        every: Minimum seconds between updates of the progress bar
+        total: Expected number of items, if known
+        show_item: Whether to show the latest item
+        log_every: Minimum seconds between log lines, when not on a terminal
+    """
+    if total is None:
+        hint = operator.length_hint(iterable, -1)
+        total = hint if hint >= 0 else None
+
+    started = report_at = time.monotonic()
+    reporter: _Reporter
+    if _is_terminal():
+        reporter = _LiveReporter(name, total, fields, show_item)
+    else:
+        # Short tasks aren't logged at all
+        reporter, every = _LogReporter(name, total, fields, started), log_every
+        report_at += every
+
+    count = 0
+    stride = 1
+    check_at = 1
+    try:
+        for count, item in enumerate(iterable, 1):
+            if count >= check_at:
+                now = time.monotonic()
+                if now >= report_at:
+                    reporter.update(count, item)
+                    report_at = now + every
+                # Look at the clock about ten times per report, adapting to the rate
+                per_report = count * every / (10 * max(now - started, 1e-6))
+                stride = max(1, min(stride * 2, int(per_report)))
+                check_at = count + stride
+            yield item
+    finally:
+        reporter.close(count)
+
+
+class _Reporter(Protocol):
+    def update(self, count: int, item: Any) -> None: ...
+
+    def close(self, count: int) -> None: ...
+
+
+class _LiveReporter:
+    """Show progress as a live progress bar."""
+
+    def __init__(self, name: str, total: int | None, fields: Callable[[], dict], show_item: bool):
+        self._fields = fields
+        self._progress = Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TaskProgressColumn(show_speed=True),
+            TimeRemainingColumn(),  # SpinnerColumn(),
+            TimeElapsedColumn(),
+            *([TaskFieldColumn("item")] if show_item else []),
+            *(TaskFieldColumn(k) for k in fields()),
+        )
+        self._task = self._progress.add_task(name, total=total)
+        start_live(self._progress)
+
+    def update(self, count: int, item: Any) -> None:
+        self._progress.update(self._task, completed=count, item=item, **self._fields())
+
+    def close(self, count: int) -> None:
+        self._progress.update(self._task, completed=count, **self._fields())
+        stop_live(self._progress)
+
+
+class _LogReporter:
+    """Log progress as plain lines, for when there's no terminal to draw on."""
+
+    def __init__(self, name: str, total: int | None, fields: Callable[[], dict], started: float):
+        self._name = name or "Progress"
+        self._total = total
+        self._fields = fields
+        self._started = started
+        self._logged = False
+
+    def update(self, count: int, item: Any) -> None:
+        self._log(count)
+
+    def close(self, count: int) -> None:
+        if self._logged:
+            self._log(count, done=True)
+
+    def _log(self, count: int, done: bool = False) -> None:
+        self._logged = True
+        elapsed = time.monotonic() - self._started
+        message = f"{self._name}: {count:,}"
+        if self._total:
+            message += f"/{self._total:,} ({count / self._total:.0%})"
+        message += f" in {elapsed:.0f}s" if done else f", {count / max(elapsed, 1e-6):,.1f}/s"
+        for k, v in self._fields().items():
+            message += f", {k}: {v}"
+        logger.info(message)
+
+
+def _is_terminal() -> bool:
+    """Whether progress can be drawn on the console, rather than logged."""
+    return Console().is_terminal
 
 
 def demo(delay=0.04):
@@ -1,19 +1,38 @@
 import hashlib
+import json
 import os
-import shutil
-from dataclasses import dataclass
-from functools import cached_property, lru_cache
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache, wraps
 from pathlib import Path
-from typing import Iterator
-
-from pygit2 import Commit, Diff, Signature, init_repository
-from pygit2.enums import FileStatus, ObjectType
+from typing import IO, TYPE_CHECKING, Callable, Iterable, Iterator, TextIO, TypeVar, cast
+
+from pygit2 import (
+    Blob,
+    Commit,
+    Diff,
+    GitError,
+    Index,
+    KeypairFromAgent,
+    Oid,
+    Passthrough,
+    RemoteCallbacks,
+    Signature,
+    Tree,
+    init_repository,
+)
+from pygit2.enums import CheckoutStrategy, CredentialType, DeltaStatus, FileStatus, ObjectType, SortMode
 from pygit2.repository import Repository
 
 from commonplace._config import DEFAULT_EDITOR, DEFAULT_NAME
 from commonplace._logging import logger
 from commonplace._types import Note, Pathlike, RepoPath
 
+if TYPE_CHECKING:
+    from commonplace._search._sqlite import SQLiteSearchIndex
+
 _INIT_GIT_IGNORE = """
 # Commonplace
 
@@ -51,6 +70,10 @@ _INIT_CLAUDE_SETTINGS = """\
 _BOT_USERNAME = "Commonplace Bot"
 _BOT_EMAIL = "commonplace@joehalliwell.com"
 
+# Held while a path to commit map is built and persisted, so that threads
+# don't walk the history twice or write the cache file at the same time
+_PATH_COMMIT_MAP_LOCK = threading.Lock()
+
 
 def _hash_file(path: Path, buf_size: int = 65536) -> str:
     """SHA-256 hash a file, streaming in chunks."""
@@ -61,14 +84,172 @@ def _hash_file(path: Path, buf_size: int = 65536) -> str:
     return h.hexdigest()
 
 
+def _load_path_commit_map(path: Path) -> tuple[str, dict[str, str]] | None:
+    """Load a persisted path to commit map and the HEAD it reflects, if any."""
+    try:
+        data = json.loads(path.read_bytes())
+        return data["head"], data["paths"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable path to commit map '{path}': {e}")
+        return None
+
+
+def _save_path_commit_map(path: Path, head_ref: str, path_to_commit: dict[str, str]) -> None:
+    """Atomically persist a path to commit map."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temporary file, as other processes may be saving the map too
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=f"{path.stem}-", delete=False) as tmp:
+        try:
+            json.dump({"head": head_ref, "paths": path_to_commit}, tmp)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+    os.replace(tmp.name, path)
+
+
+def _full_path_commit_map(git: Repository, head_ref: str) -> dict[str, str]:
+    """Walk the whole history from head_ref to find the last commit to modify each file."""
+    path_to_commit: dict[str, str] = {}
+
+    def walk_tree(tree, prefix=""):
+        """Recursively walk tree and yield all file paths."""
+        for entry in tree:
+            path = f"{prefix}{entry.name}" if prefix else entry.name
+            if entry.type_str == "tree":
+                # Recurse into subdirectory
+                yield from walk_tree(git[entry.id], f"{path}/")
+            else:
+                yield path
+
+    # Get all files at HEAD - this is what we need to find commits for
+    last_commit = git[head_ref]
+    assert isinstance(last_commit, Commit)
+    remaining_files = set(walk_tree(last_commit.tree))
+
+    for commit in git.walk(last_commit.id):
+        if not remaining_files:
+            # Found commits for all files, can stop early
+            break
+
+        if not commit.parents:
+            # Initial commit - record all remaining files
+            for path in remaining_files:
+                path_to_commit[path] = str(commit.id)
+            break
+
+        # Get diff to find what files changed in this commit
+        parent = commit.parents[0]
+        diff = git.diff(parent, commit)
+        assert isinstance(diff, Diff)
+
+        # Record each changed file and remove from remaining set
+        for delta in diff.deltas:
+            path = delta.new_file.path
+            if path in remaining_files:
+                path_to_commit[path] = str(commit.id)
+                remaining_files.remove(path)
+
+    return path_to_commit
+
+
+def _update_path_commit_map(
+    git: Repository, old_head: str, path_to_commit: dict[str, str], head_ref: str
+) -> dict[str, str] | None:
+    """
+    Bring a path to commit map up to date by diffing only the commits since
+    old_head. Returns None if that isn't possible because history has been
+    rewritten since.
+    """
+    old_commit = git.get(old_head)
+    if old_commit is None or not git.descendant_of(head_ref, old_head):
+        logger.info("History has been rewritten; rebuilding path to commit map")
+        return None
+
+    walker = git.walk(head_ref)
+    walker.hide(old_commit.id)
+
+    updated = dict(path_to_commit)
+    seen: set[str] = set()
+    # Walking newest first, the first commit to touch a path is the last to modify it
+    for commit in walker:
+        if not commit.parents:
+            return None  # An unrelated history has been merged in
+        diff = git.diff(commit.parents[0], commit)
+        assert isinstance(diff, Diff)
+        for delta in diff.deltas:
+            path = delta.new_file.path
+            if path in seen:
+                continue
+            seen.add(path)
+            if delta.status == DeltaStatus.DELETED:
+                updated.pop(path, None)
+            else:
+                updated[path] = str(commit.id)
+    return updated
+
+
+class _RemoteCallbacks(RemoteCallbacks):
+    """Authenticate SSH remotes with the SSH agent, as the git command would."""
+
+    def credentials(self, url, username_from_url, allowed_types):
+        if allowed_types & CredentialType.SSH_KEY:
+            return KeypairFromAgent(username_from_url or "git")
+        raise Passthrough
+
+
+def _is_local_url(url: str) -> bool:
+    """Whether a remote URL refers to the local filesystem (so never needs credentials)."""
+    return url.startswith("file://") or "://" not in url and ":" not in url.split("/")[0]
+
+
+F = TypeVar("F", bound=Callable)
+
+
+# Status flags for changes that add or remove a path
+_ADDED_OR_REMOVED = (
+    FileStatus.INDEX_NEW
+    | FileStatus.INDEX_DELETED
+    | FileStatus.INDEX_RENAMED
+    | FileStatus.WT_NEW
+    | FileStatus.WT_DELETED
+    | FileStatus.WT_RENAMED
+)
+
+
+def _synchronized(method: F) -> F:
+    """Run a Commonplace method holding the repository's lock."""
+
+    @wraps(method)
+    def wrapper(self: "Commonplace", *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _conflicted_paths(index: Index) -> set[str]:
+    assert index.conflicts is not None
+    return {entry.path for conflict in index.conflicts for entry in conflict if entry is not None}
+
+
 @dataclass
 class Commonplace:
     """
     Simplified and opinionated abstraction around a git repo with a
     configuration and search index.
+
+    Use it as a context manager, or call `close`, to release the search
+    index and git handles. A repository can be shared between threads:
+    notes can be read and searched concurrently, while changes (staging,
+    committing and syncing) are made one at a time. The git handles are
+    shared, so any use of them, including reads such as resolving refs and
+    reading blobs, holds the repository's lock.
     """
 
     git: Repository
+    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+    _index: "SQLiteSearchIndex | None" = field(default=None, init=False, repr=False, compare=False)
 
     @staticmethod
     def open(root: Path) -> "Commonplace":
@@ -78,9 +259,21 @@ class Commonplace:
         assert not git.head_is_unborn, "Repository has no commits yet"
         return Commonplace(git=git)
 
-    def close(self):
-        """Close this repo. Does nothing."""
-        ...
+    def close(self) -> None:
+        """Close the search index, if open, and release git's file handles,
+        once other threads have finished with the repository. The search index
+        is reopened if used again."""
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            self.git.free()
+
+    def __enter__(self) -> "Commonplace":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     @cached_property
     def root(self) -> Path:
@@ -99,24 +292,87 @@ class Commonplace:
         """Get the cache directory."""
         return self.root / ".commonplace" / "cache"
 
-    def store_blob(self, source_path: Path) -> RepoPath:
+    def store_blob(self, source: Path | IO[bytes], name: str | None = None) -> RepoPath:
         """Store a file in .commonplace/blobs/ addressed by its SHA-256 hash.
 
-        Returns the existing path if the blob already exists (idempotent).
+        The source may be a path or a readable binary stream (e.g. a zip
+        member). Streams are hashed while being written to a temporary file,
+        which is then atomically renamed into place, so the data is only read
+        once; streams that fit in one read are hashed before anything is
+        written. Returns the existing path if the blob already exists
+        (idempotent).
+
+        Args:
+            source: Path to a file, or a binary stream
+            name: File name to store the blob under (default: the source file's name)
         """
         self._ensure_gitattributes()
 
-        digest = _hash_file(source_path)
-        rel_path = Path(".commonplace") / "blobs" / digest / source_path.name
-        abs_path = self.root / rel_path
+        if isinstance(source, Path):
+            name = name or source.name
+            # Hashing first lets us skip the copy entirely for known blobs
+            digest = _hash_file(source)
+            rel_path = self._blob_path(digest, name)
+            if not (self.root / rel_path).exists():
+                # The file may have changed since it was hashed, so store it
+                # under the digest of what was actually copied
+                with open(source, "rb") as fp:
+                    rel_path = self._write_blob(fp, name)
+            return self.make_repo_path(rel_path)
+
+        if name is None:
+            raise ValueError("A name is required to store a blob from a stream")
+        return self.make_repo_path(self._write_blob(source, name))
 
-        if not abs_path.exists():
-            abs_path.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(source_path, abs_path)
-            self.git.index.add(rel_path.as_posix())
+    @staticmethod
+    def _blob_path(digest: str, name: str) -> Path:
+        return Path(".commonplace") / "blobs" / digest / name
 
-        return self.make_repo_path(rel_path)
+    def _write_blob(self, stream: IO[bytes], name: str, buf_size: int = 1024 * 1024) -> Path:
+        """
+        Hash a stream while spooling it to disk, then move it into the blob
+        store unless a blob with the same digest is already there. Stages the
+        blob and returns its repo-relative path.
+        """
+        # Small streams (e.g. offloaded payloads, which are often stored again)
+        # are hashed first, so that known blobs aren't written at all
+        chunk = stream.read(buf_size)
+        if len(chunk) < buf_size:
+            if more := stream.read(1):
+                chunk += more  # Just a short read
+            else:
+                rel_path = self._blob_path(hashlib.sha256(chunk).hexdigest(), name)
+                if (self.root / rel_path).exists():
+                    return rel_path
+
+        # Spool into the (ignored) cache so an interrupted write never leaves
+        # debris in the tracked blob directory. It's on the same filesystem, so
+        # the final rename is atomic.
+        self.cache.mkdir(parents=True, exist_ok=True)
+        h = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.cache, prefix="blob-", delete=False) as tmp:
+            try:
+                while chunk:
+                    h.update(chunk)
+                    tmp.write(chunk)
+                    chunk = stream.read(buf_size)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+
+        rel_path = self._blob_path(h.hexdigest(), name)
+        abs_path = self.root / rel_path
+        if abs_path.exists():
+            os.unlink(tmp.name)
+        else:
+            abs_path.parent.mkdir(parents=True, exist_ok=True)
+            os.chmod(tmp.name, 0o644)  # Temporary files are private by default
+            os.replace(tmp.name, abs_path)
+            with self._lock:
+                self.git.index.add(rel_path.as_posix())
+        return rel_path
 
+    @_synchronized
     def doctor(self) -> list[str]:
         """Check and fix repository scaffolding. Returns list of actions taken."""
         actions: list[str] = []
@@ -142,6 +398,7 @@ class Commonplace:
 
         return actions
 
+    @_synchronized
     def _ensure_gitattributes(self) -> None:
         """Create .gitattributes with LFS config if it doesn't exist yet."""
         gitattributes_path = self.root / ".gitattributes"
@@ -149,13 +406,16 @@ class Commonplace:
             gitattributes_path.write_text(_INIT_GIT_ATTRIBUTES)
             self.git.index.add(".gitattributes")
 
-    @cached_property
-    def index(self):
-        """Get the search index."""
-        from commonplace._search._sqlite import SQLiteSearchIndex
+    @property
+    def index(self) -> "SQLiteSearchIndex":
+        """Get the search index, opening it on first use."""
+        if self._index is None:
+            from commonplace._search._sqlite import SQLiteSearchIndex
 
-        index_path = self.cache / "index.db"
-        return SQLiteSearchIndex(index_path)
+            with self._lock:
+                if self._index is None:
+                    self._index = SQLiteSearchIndex(self.cache / "index.db")
+        return self._index
 
     @staticmethod
     def init(root: Path):
@@ -224,32 +484,36 @@ class Commonplace:
         if path.is_absolute():
             path = path.relative_to(self.git.workdir, walk_up=False)
 
-        head_ref = str(self.git.head.target)
+        with self._lock:
+            head_ref = str(self.git.head.target)
 
-        # Check if file exists and get its status
-        try:
-            flags = self.git.status_file(path.as_posix())
-        except KeyError:
-            # File doesn't exist yet (new file being created)
-            return RepoPath(path=path, ref=head_ref)
+            # Check if file exists and get its status
+            try:
+                flags = self.git.status_file(path.as_posix())
+            except KeyError:
+                # File doesn't exist yet (new file being created)
+                return RepoPath(path=path, ref=head_ref)
 
         if flags != FileStatus.CURRENT:
             # File is modified/staged/new - not committed yet
             return RepoPath(path=path, ref=head_ref)
 
         # File is clean - find last commit that modified it (cached)
-        path_map = self._build_path_commit_map(self.git.workdir)
+        path_map = self._build_path_commit_map(self.git.workdir, head_ref)
         ref = path_map.get(path.as_posix(), head_ref)
         return RepoPath(path=path, ref=ref)
 
     @staticmethod
     @lru_cache(maxsize=1)
-    def _build_path_commit_map(repo_dir: str) -> dict[str, str]:
+    def _build_path_commit_map(repo_dir: str, head_ref: str) -> dict[str, str]:
         """
         Build a map of all file paths to their last modifying commit.
 
-        Walks the commit history once and builds the entire mapping.
-        Cached by (repo_dir, head_ref) so we only walk once per HEAD state.
+        The map is persisted in the cache, tagged with the HEAD it reflects.
+        When HEAD has moved on, only the new commits are diffed. If history
+        was rewritten (so the old HEAD is no longer an ancestor) the whole
+        history is walked again. Cached in memory by (repo_dir, head_ref).
+        Only one thread builds a map at a time.
 
         Args:
             repo_dir: Repository path
@@ -258,53 +522,28 @@ class Commonplace:
         Returns:
             Dict mapping file paths to commit SHAs
         """
-        # Reopen repository (cheap operation, just loads metadata)
+        # Reopen repository (cheap operation, just loads metadata), so that
+        # the walk doesn't share git handles with other threads
         git = Repository(repo_dir)
-        path_to_commit: dict[str, str] = {}
-
         if git.head_is_unborn:
+            return {}
+
+        cache_path = Path(repo_dir) / ".commonplace" / "cache" / "path-commits.json"
+        with _PATH_COMMIT_MAP_LOCK:
+            cached = _load_path_commit_map(cache_path)
+            if cached is not None and cached[0] == head_ref:
+                return cached[1]
+
+            path_to_commit = None
+            if cached is not None:
+                path_to_commit = _update_path_commit_map(git, *cached, head_ref)
+            if path_to_commit is None:
+                logger.debug("Building path to commit map from the full history")
+                path_to_commit = _full_path_commit_map(git, head_ref)
+
+            _save_path_commit_map(cache_path, head_ref, path_to_commit)
             return path_to_commit
 
-        def walk_tree(tree, prefix=""):
-            """Recursively walk tree and yield all file paths."""
-            for entry in tree:
-                path = f"{prefix}{entry.name}" if prefix else entry.name
-                if entry.type_str == "tree":
-                    # Recurse into subdirectory
-                    yield from walk_tree(git[entry.id], f"{path}/")
-                else:
-                    yield path
-
-        # Get all files at HEAD - this is what we need to find commits for
-        last_commit = git[git.head.target]
-        assert isinstance(last_commit, Commit)
-        remaining_files = set(walk_tree(last_commit.tree))
-
-        for commit in git.walk(git.head.target):
-            if not remaining_files:
-                # Found commits for all files, can stop early
-                break
-
-            if not commit.parents:
-                # Initial commit - record all remaining files
-                for path in remaining_files:
-                    path_to_commit[path] = str(commit.id)
-                break
-
-            # Get diff to find what files changed in this commit
-            parent = commit.parents[0]
-            diff = git.diff(parent, commit)
-            assert isinstance(diff, Diff)
-
-            # Record each changed file and remove from remaining set
-            for delta in diff.deltas:
-                path = delta.new_file.path
-                if path in remaining_files:
-                    path_to_commit[path] = str(commit.id)
-                    remaining_files.remove(path)
-
-        return path_to_commit
-
     def source(self, repo_path: RepoPath) -> str:
         """The source of this collection of notes/chats."""
         parts = repo_path.path.parts
@@ -316,46 +555,167 @@ class Commonplace:
 
     def notes(self) -> Iterator[Note]:
         """Get an iterator over all notes at current HEAD."""
-        for repo_path in self.note_paths():
-            yield self.get_note(repo_path)
-
-    def note_paths(self) -> Iterator[RepoPath]:
-        """Get an iterator over all note paths at current HEAD."""
-        for root, _, files in os.walk(self.git.workdir):
-            for f in files:
-                abs_path = Path(root) / f
-                if self.git.path_is_ignored(abs_path.as_posix()):
-                    continue
-                if abs_path.suffix != ".md":
-                    continue
-                yield self.make_repo_path(abs_path)
+        yield from self.get_notes(self.note_paths())
+
+    def note_paths(self, committed_only: bool = False) -> Iterator[RepoPath]:
+        """Get an iterator over all note paths at current HEAD.
+
+        Notes are listed from the git index, plus any untracked (but not
+        ignored) files, using a single status call to find those with
+        uncommitted changes rather than checking each file in turn.
+
+        Args:
+            committed_only: List notes as committed at HEAD, ignoring
+                uncommitted changes. Notes with changes that would share the
+                committed note's ref are skipped.
+        """
+        with self._lock:
+            head_ref = str(self.git.head.target)
+            status = self.git.status(untracked_files="all")
+            paths = {entry.path for entry in self.git.index}
+        path_map = self._build_path_commit_map(self.git.workdir, head_ref)
+        paths.update(path for path, flags in status.items() if flags & FileStatus.WT_NEW)
+
+        for path in sorted(paths):
+            if not path.endswith(".md"):
+                continue
+            flags = status.get(path, FileStatus.CURRENT)
+            if committed_only:
+                ref = path_map.get(path)
+                if ref is not None and (flags == FileStatus.CURRENT or ref != head_ref):
+                    yield RepoPath(path=Path(path), ref=ref)
+                continue
+            if flags & FileStatus.WT_DELETED:
+                continue
+            # As for make_repo_path, files with uncommitted changes are at HEAD
+            ref = path_map.get(path, head_ref) if flags == FileStatus.CURRENT else head_ref
+            yield RepoPath(path=Path(path), ref=ref)
+
+    @_synchronized
+    def notes_digest(self) -> str:
+        """
+        A digest of HEAD and the notes added or removed since, whether staged
+        or only in the worktree. It changes whenever the set of notes listed by
+        note_paths() does, and is much cheaper to compute.
+
+        Nothing is written to the object database, so this is safe to call
+        from read-only paths, and works while there are conflicts.
+        """
+        h = hashlib.sha256(b"" if self.git.head_is_unborn else self.git.head.peel(Commit).id.raw)
+        for path, flags in sorted(self.git.status(untracked_files="all").items()):
+            if path.endswith(".md") and flags & _ADDED_OR_REMOVED:
+                h.update(f"\0{path}\0{flags & _ADDED_OR_REMOVED}".encode())
+        return h.hexdigest()
+
+    @_synchronized
+    def resolve_ref(self, ref: str, path: Pathlike) -> str:
+        """
+        Resolve a ref (e.g. an abbreviated commit id) to a commit that has a file.
+
+        Args:
+            ref: The ref to resolve
+            path: Repo-relative path of a file that must exist at the commit
+
+        Returns:
+            The commit id
+
+        Raises:
+            KeyError: If the ref doesn't exist, or the file doesn't at that commit
+            ValueError: If the ref is invalid or ambiguous
+        """
+        commit = self.git.revparse_single(ref).peel(Commit)
+        commit.tree[Path(path).as_posix()]
+        return str(commit.id)
 
     def get_note(self, repo_path: RepoPath) -> Note:
         """
         Fetch a note at a specific repository location.
 
+        The content is read from the object database at the path's ref, so
+        notes from older commits are shown as they were. Notes with
+        uncommitted changes (which are at HEAD) are read from the worktree.
+
         Args:
             repo_path: The repository path to fetch
 
         Returns:
             Note object with content
         """
-        logger.debug(f"Fetching note at {repo_path}")
-        abs_path = self.root / repo_path.path
+        return next(self.get_notes([repo_path]))
 
-        with open(abs_path) as fd:
-            content = fd.read()
-        return Note(repo_path=repo_path, content=content)
+    def get_notes(self, repo_paths: Iterable[RepoPath]) -> Iterator[Note]:
+        """
+        Fetch several notes, as for `get_note`, but checking for uncommitted
+        changes at most once for the whole batch.
+
+        Args:
+            repo_paths: The repository paths to fetch
+
+        Yields:
+            Note objects with content, in order
+        """
+        with self._lock:
+            head_ref = None if self.git.head_is_unborn else str(self.git.head.target)
+        dirty: set[str] | None = None
+        trees: dict[str, Tree] = {}
+
+        for repo_path in repo_paths:
+            logger.debug(f"Fetching note at {repo_path}")
+            path = repo_path.path.as_posix()
+
+            if repo_path.ref == head_ref:
+                if dirty is None:
+                    with self._lock:
+                        status = self.git.status(untracked_files="all")
+                    dirty = {p for p, flags in status.items() if flags != FileStatus.CURRENT}
+                if path in dirty:
+                    yield Note(repo_path=repo_path, content=(self.root / repo_path.path).read_text())
+                    continue
+
+            try:
+                with self._lock:
+                    if repo_path.ref not in trees:
+                        trees[repo_path.ref] = cast(Tree, self.git.revparse_single(repo_path.ref).peel(Tree))
+                    oid = trees[repo_path.ref][path].id
+            except (KeyError, ValueError):
+                # Not committed at that ref (e.g. a note that has just been saved)
+                yield Note(repo_path=repo_path, content=(self.root / repo_path.path).read_text())
+                continue
+            yield Note(repo_path=repo_path, content=self._read_blob(oid))
+
+    @cached_property
+    def _read_blob(self) -> Callable[[Oid], str]:
+        """Read a text blob from the object database, with an LRU cache by blob id."""
+
+        @lru_cache(maxsize=1024)
+        def read(oid: Oid) -> str:
+            with self._lock:
+                blob = self.git[oid]
+                assert isinstance(blob, Blob)
+                data = blob.data
+            # Translate newlines as reading the file in text mode would
+            return data.decode().replace("\r\n", "\n").replace("\r", "\n")
+
+        return read
 
     def save(self, note: Note) -> None:
         """Save a note to working directory and stage. Beware! This will overwrite
         existing content."""
-        abs_path = self.root / note.repo_path.path
+        with self.open_note(note.repo_path) as fd:
+            fd.write(note.content)
+
+    @contextmanager
+    def open_note(self, repo_path: RepoPath) -> Iterator[TextIO]:
+        """Open a note in the working directory for writing, staging it once
+        written. Beware! This will overwrite existing content."""
+        abs_path = self.root / repo_path.path
         abs_path.parent.mkdir(parents=True, exist_ok=True)
         with open(abs_path, "w") as fd:
-            fd.write(note.content)
-        self.git.index.add(note.repo_path.path.as_posix())
+            yield fd
+        with self._lock:
+            self.git.index.add(repo_path.path.as_posix())
 
+    @_synchronized
     def commit(self, message: str, auto_index: bool | None = None) -> None:
         """Commit staged changes to the repository.
 
@@ -366,6 +726,7 @@ class Commonplace:
         # Check if there are actually changes to commit
         tree = self.git.index.write_tree()
 
+        head_tree: Tree | None = None
         if self.git.head_is_unborn:
             # No commits yet - commit if index has any entries
             has_changes = len(self.git.index) > 0
@@ -373,8 +734,8 @@ class Commonplace:
             # Compare index tree with HEAD tree to detect changes
             head_commit = self.git.head.peel(ObjectType.COMMIT)
             assert isinstance(head_commit, Commit)
-            head_tree = head_commit.tree.id
-            has_changes = tree != head_tree
+            head_tree = head_commit.tree
+            has_changes = tree != head_tree.id
 
         if not has_changes:
             logger.info("No changes to commit")
@@ -396,12 +757,17 @@ class Commonplace:
 
         # Auto-index if enabled
         should_index = auto_index if auto_index is not None else self.config.auto_index
-        if should_index:
+        if should_index and self.config.index_in_background:
+            new_tree = self.git[tree]
+            assert isinstance(new_tree, Tree)
+            self._index_paths(self._changed_notes(head_tree, new_tree))
+        elif should_index:
             from commonplace._search._commands import index
 
             logger.info("Auto-indexing committed notes")
             index(self, rebuild=False)
 
+    @_synchronized
     def has_remote(self, remote_name: str = "origin") -> bool:
         """
         Check if a remote exists.
@@ -418,88 +784,170 @@ class Commonplace:
         except KeyError:
             return False
 
+    @_synchronized
     def sync(
         self,
         remote_name: str = "origin",
         branch: str | None = None,
         strategy: str = "rebase",
         auto_commit: bool = True,
+        auto_index: bool | None = None,
     ) -> None:
         """
-        Synchronize repository with remote using git commands.
+        Synchronize repository with remote.
 
         Steps:
         1. Check for remote
         2. Add and commit all changes (if auto_commit=True)
-        3. Pull from remote (rebase or merge)
+        3. Fetch from remote, then fast-forward, rebase or merge
         4. Push to remote
+        5. Index the notes changed by the sync (if auto_index=True)
+
+        Everything is done with pygit2, except that fetching and pushing fall
+        back to the git command (which knows about credential helpers) if a
+        network remote can't be reached natively.
 
         Args:
             remote_name: Name of remote (default: "origin")
-            branch: Branch name (default: current branch)
+            branch: Remote branch name (default: current branch)
             strategy: "rebase" or "merge" (default: "rebase")
             auto_commit: Auto-commit uncommitted changes (default: True)
+            auto_index: Whether to index changed notes afterwards (default: from config)
 
         Raises:
             ValueError: If sync operation fails
         """
-        import subprocess
         from datetime import datetime, timezone
 
         # 1. Check for remote (helpful error message)
         if not self.has_remote(remote_name):
             raise ValueError(f"Remote '{remote_name}' not found. Add remote first.")
-
-        # Get current branch if not specified
-        if branch is None:
-            try:
-                result = self._git("rev-parse", "--abbrev-ref", "HEAD")
-                branch = result.strip()
-            except subprocess.CalledProcessError:
-                raise ValueError("Could not determine current branch.")
-
+        if strategy not in ("rebase", "merge"):
+            raise ValueError(f"Unknown sync strategy '{strategy}'. Use 'rebase' or 'merge'.")
+        if self.git.head_is_unborn or self.git.head_is_detached:
+            raise ValueError("Could not determine current branch.")
+
+        local_branch = self.git.head.shorthand
+        branch = branch or local_branch
+        before = self.git.head.target
         logger.info(f"Syncing branch '{branch}' with '{remote_name}'")
 
         # 2. Auto-commit if there are changes
-        if auto_commit:
-            try:
-                # Check if there are changes
-                result = self._git("status", "--porcelain")
-                if result.strip():
-                    logger.info("Adding and committing changes...")
-                    self._git("add", "-A")
-                    timestamp = datetime.now(timezone.utc).isoformat()
-                    self._git(
-                        "commit",
-                        "-m",
-                        f"Auto-commit before sync at {timestamp}",
-                    )
-            except subprocess.CalledProcessError as e:
-                raise ValueError(f"Failed to commit changes. {e.stderr}") from e
+        status = {path: flags for path, flags in self.git.status().items() if flags != FileStatus.IGNORED}
+        if auto_commit and status:
+            logger.info("Adding and committing changes...")
+            self.git.index.add_all()
+            self.git.index.write()
+            timestamp = datetime.now(timezone.utc).isoformat()
+            self.commit(f"Auto-commit before sync at {timestamp}", auto_index=False)
+        elif any(flags != FileStatus.WT_NEW for flags in status.values()):
+            raise ValueError(f"You have uncommitted changes, so cannot pull with {strategy}. Commit them first.")
 
         # 3. Pull from remote (skip if remote branch doesn't exist yet)
         logger.info(f"Pulling from {remote_name}/{branch}...")
-        pull_args = ["pull", remote_name, branch]
-        if strategy == "rebase":
-            pull_args.append("--rebase")
-        try:
-            self._git(*pull_args)
-        except subprocess.CalledProcessError as e:
-            # If remote branch doesn't exist, this is a first push - skip pull
-            if "couldn't find remote ref" in (e.stderr or ""):
-                logger.info(f"Remote branch {remote_name}/{branch} doesn't exist yet (first push)")
-            else:
-                stderr = e.stderr.strip() if e.stderr else ""
-                raise ValueError(f"Failed to pull from {remote_name}/{branch}. {stderr}") from e
+        self._transfer(remote_name, "fetch", f"+refs/heads/{branch}:refs/remotes/{remote_name}/{branch}")
+        upstream = self.git.references.get(f"refs/remotes/{remote_name}/{branch}")
+        if upstream is None:
+            logger.info(f"Remote branch {remote_name}/{branch} doesn't exist yet (first push)")
+        else:
+            self._integrate(upstream.target, strategy)
 
         # 4. Push to remote
         logger.info(f"Pushing to {remote_name}/{branch}...")
+        self._transfer(remote_name, "push", f"refs/heads/{local_branch}:refs/heads/{branch}")
+        logger.info(f"Successfully synced with {remote_name}/{branch}")
+
+        # 5. Index whatever the sync changed, whether committed locally or pulled
+        after = self.git.head.target
+        should_index = auto_index if auto_index is not None else self.config.auto_index
+        if should_index and after != before:
+            old_tree, new_tree = (self.git[oid].peel(Tree) for oid in (before, after))
+            self._index_paths(self._changed_notes(old_tree, new_tree))
+
+    def _integrate(self, upstream: Oid, strategy: str) -> None:
+        """Bring the current branch up to date with upstream, updating the working directory."""
+        head = self.git.head.target
+        if head == upstream or self.git.descendant_of(head, upstream):
+            logger.info("Already up to date")
+            return
+
+        author = Signature(_BOT_USERNAME, _BOT_EMAIL)
+        if self.git.descendant_of(upstream, head):
+            logger.info("Fast-forwarding")
+            target = upstream
+        elif strategy == "merge":
+            if self.git.merge_base(head, upstream) is None:
+                raise ValueError("Refusing to merge unrelated histories.")
+            merged = self.git.merge_commits(head, upstream)
+            if merged.conflicts is not None:
+                raise ValueError(f"Merge conflicts in: {', '.join(sorted(_conflicted_paths(merged)))}")
+            tree = merged.write_tree(self.git)
+            target = self.git.create_commit(None, author, author, f"Merge {upstream} (sync)", tree, [head, upstream])
+        else:
+            # Replay local commits on top of upstream, like git rebase (which also drops merges)
+            walker = self.git.walk(head, SortMode.TOPOLOGICAL | SortMode.REVERSE)
+            walker.hide(upstream)
+            target = upstream
+            for commit in walker:
+                base = commit.parents[0].tree if commit.parents else self.git[self.git.TreeBuilder().write()]
+                onto = self.git[target].peel(Tree)
+                replayed = self.git.merge_trees(base, onto, commit.tree)
+                if replayed.conflicts is not None:
+                    raise ValueError(
+                        f"Conflicts rebasing '{commit.message.strip()}' in: "
+                        f"{', '.join(sorted(_conflicted_paths(replayed)))}"
+                    )
+                tree = replayed.write_tree(self.git)
+                target = self.git.create_commit(None, commit.author, author, commit.message, tree, [target])
+            logger.info(f"Rebased local commits onto {upstream}")
+
+        self.git.checkout_tree(self.git[target], strategy=CheckoutStrategy.SAFE)
+        self.git.head.set_target(target)
+
+    def _transfer(self, remote_name: str, direction: str, refspec: str) -> None:
+        """Fetch or push a refspec, falling back to the git command for network remotes."""
+        remote = self.git.remotes[remote_name]
+        try:
+            if direction == "fetch":
+                remote.fetch([refspec], callbacks=_RemoteCallbacks())
+            else:
+                remote.push([refspec], callbacks=_RemoteCallbacks())
+            return
+        except GitError as e:
+            error = e
+            if _is_local_url(remote.url or ""):
+                raise ValueError(f"Failed to {direction} {refspec} ({remote_name}). {e}") from e
+
+        import subprocess
+
+        logger.debug(f"Native {direction} failed ({error}); using git instead")
         try:
-            self._git("push", remote_name, branch)
-            logger.info(f"Successfully synced with {remote_name}/{branch}")
+            self._git(direction, remote_name, refspec.lstrip("+"))
         except subprocess.CalledProcessError as e:
             stderr = e.stderr.strip() if e.stderr else ""
-            raise ValueError(f"Failed to push to {remote_name}/{branch}. {stderr}") from e
+            # The remote branch doesn't exist on first push
+            if direction == "fetch" and "couldn't find remote ref" in stderr:
+                return
+            raise ValueError(f"Failed to {direction} {refspec} ({remote_name}). {stderr}") from e
+
+    @staticmethod
+    def _changed_notes(old_tree: Tree | None, new_tree: Tree) -> list[str]:
+        """Get the paths of notes added, modified or deleted between two trees."""
+        diff = old_tree.diff_to_tree(new_tree) if old_tree is not None else new_tree.diff_to_tree(swap=True)
+        return [delta.new_file.path for delta in diff.deltas if delta.new_file.path.endswith(".md")]
+
+    def _index_paths(self, paths: list[str]) -> None:
+        """Index changed notes, in the background if so configured."""
+        if self.config.index_in_background:
+            from commonplace._search._queue import IndexQueue, spawn_worker
+
+            if IndexQueue(self).push(paths):
+                spawn_worker(self)
+        elif paths:
+            from commonplace._search._commands import index
+
+            logger.info(f"Indexing {len(paths)} changed notes")
+            index(self, paths=paths)
 
     def _git(self, *args: str) -> str:
         """
@@ -0,0 +1,85 @@
+"""Helpers for searching from asyncio without blocking the event loop."""
+
+import asyncio
+
+import numpy as np
+from numpy.typing import NDArray
+
+from commonplace._logging import logger
+from commonplace._search._types import Embedder
+
+
+class QueryBatcher:
+    """
+    Embeds queries for an event loop, combining those that arrive within a
+    short window into one call to the embedder, which runs in the loop's
+    default executor.
+
+    A query whose caller is cancelled before its batch is embedded is
+    dropped from the batch. Once embedding has started it can't be
+    interrupted, but the results for cancelled callers are discarded.
+    """
+
+    def __init__(self, embedder: Embedder, window: float = 0.005, max_batch: int = 64):
+        """
+        Args:
+            embedder: The embedder to use
+            window: Seconds to wait for more queries after the first arrives
+            max_batch: Most queries to embed at once; a full batch is embedded without waiting
+        """
+        self.embedder = embedder
+        self.window = window
+        self.max_batch = max_batch
+        self.loop = asyncio.get_running_loop()
+        self._pending: list[tuple[str, asyncio.Future[NDArray[np.float32]]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(self, query: str) -> NDArray[np.float32]:
+        """
+        Embed a query, together with any others that arrive at about the same time.
+
+        Args:
+            query: The query text to embed
+
+        Returns:
+            The query's embedding vector
+        """
+        future: asyncio.Future[NDArray[np.float32]] = self.loop.create_future()
+        self._pending.append((query, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self.loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [(query, future) for query, future in self._pending if not future.cancelled()]
+        self._pending = []
+        if batch:
+            # Keep a reference, since the loop only holds weak references to tasks
+            task = self.loop.create_task(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _embed_batch(self, batch: list[tuple[str, asyncio.Future[NDArray[np.float32]]]]) -> None:
+        logger.debug(f"Embedding a batch of {len(batch)} queries")
+        try:
+            embeddings = await self.loop.run_in_executor(
+                None, self.embedder.embed_queries, [query for query, _ in batch]
+            )
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
@@ -1,18 +1,29 @@
 """Semantic search components for commonplace."""
 
+import asyncio
+from pathlib import Path
+from typing import Callable, Generator, Iterable, TypeVar
+
 from commonplace._logging import logger
+from commonplace._memprofile import stage
+from commonplace._metrics import record_index_commit
 from commonplace._progress import track
 from commonplace._repo import Commonplace
 from commonplace._search._chunker import MarkdownChunker
+from commonplace._search._types import Chunk
 from commonplace._search._types import SearchHit as SearchHit
 from commonplace._search._types import SearchMethod as SearchMethod
+from commonplace._types import Pathlike
 from commonplace._utils import batched
 
+T = TypeVar("T")
+
 
 def index(
     repo: Commonplace,
     rebuild: bool = False,
     batch_size: int = 64,
+    paths: Iterable[Pathlike] | None = None,
 ) -> None:
     """
     Build or rebuild the search index for semantic search.
@@ -22,7 +33,61 @@ def index(
         store: The search index to populate
         rebuild: If True, clear existing index before rebuilding
         batch_size: Number of chunks to embed in each batch (default: 64)
+        paths: Only index these (repo-relative) notes, if they still exist (default: all notes)
+    """
+    for chunk_batch in _chunk_batches(repo, rebuild, batch_size, paths):
+        repo.index.add_chunks(chunk_batch)
+    _index_complete(repo)
+
+
+async def aindex(
+    repo: Commonplace,
+    rebuild: bool = False,
+    batch_size: int = 64,
+    paths: Iterable[Pathlike] | None = None,
+) -> None:
+    """
+    Build or rebuild the search index without blocking the event loop, by
+    reading, chunking and embedding notes in the loop's default executor.
+
+    If cancelled, indexing stops once the batch being embedded has been
+    added, keeping what has been indexed so far.
+
+    Args:
+        repo: The commonplace repository
+        rebuild: If True, clear existing index before rebuilding
+        batch_size: Number of chunks to embed in each batch (default: 64)
+        paths: Only index these (repo-relative) notes, if they still exist (default: all notes)
+    """
+    batches = _chunk_batches(repo, rebuild, batch_size, paths)
+    try:
+        while chunk_batch := await _run_to_completion(next, batches, None):
+            await _run_to_completion(repo.index.add_chunks, chunk_batch)
+    finally:
+        batches.close()
+    _index_complete(repo)
+
+
+async def _run_to_completion(func: Callable[..., T], *args) -> T:
+    """
+    Run a blocking function in the default executor. If cancelled, wait for
+    it to finish before raising, so that nothing carries on in the background.
     """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await future
+        raise
+
+
+def _chunk_batches(
+    repo: Commonplace,
+    rebuild: bool,
+    batch_size: int,
+    paths: Iterable[Pathlike] | None,
+) -> Generator[list[Chunk], None, None]:
+    """Work out which notes need indexing, and stream their chunks in batches."""
     chunker = MarkdownChunker()
 
     if rebuild:
@@ -30,7 +95,10 @@ def index(
         repo.index.clear()
 
     # Collect notes to index
-    to_index = set(repo.note_paths())
+    if paths is None:
+        to_index = set(repo.note_paths())
+    else:
+        to_index = {repo.make_repo_path(p) for p in paths if Path(p).suffix == ".md" and (repo.root / p).is_file()}
     if not rebuild:
         to_index.difference_update(repo.index.get_indexed_paths())
 
@@ -38,13 +106,44 @@ def index(
 
     # Stream chunks from all notes and batch them for efficient embedding
     def chunk_stream():
-        for path in track(to_index, "Indexing notes"):
-            note = repo.get_note(path)
-            yield from chunker.chunk(note)
+        for note in repo.get_notes(track(to_index, "Indexing notes")):
+            with stage("chunk"):
+                chunks = list(chunker.chunk(note))
+            yield from chunks
 
-    # Process chunks in batches
-    for chunk_batch in batched(chunk_stream(), batch_size):
-        repo.index.add_chunks(chunk_batch)
+    yield from batched(chunk_stream(), batch_size)
 
+
+def _index_complete(repo: Commonplace) -> None:
+    if not repo.git.head_is_unborn:
+        record_index_commit(str(repo.git.head.target))
     logger.info("Indexing complete")
-    logger.info("Indexing complete")
+
+
+def export_index(repo: Commonplace, path: Path) -> None:
+    """
+    Export a snapshot of the index, so that other machines with the same
+    commits can import it rather than embedding every note themselves. Only
+    notes as committed are included, since uncommitted changes are local.
+
+    Args:
+        repo: The commonplace repository
+        path: Where to write the snapshot
+    """
+    count = repo.index.export_snapshot(path, repo.note_paths(committed_only=True))
+    logger.info(f"Exported {count} chunks to '{path}'")
+
+
+def import_index(repo: Commonplace, path: Path, reindex: bool = True) -> None:
+    """
+    Import a snapshot of the index exported by another machine.
+
+    Args:
+        repo: The commonplace repository
+        path: The snapshot to import
+        reindex: If True, then index the notes the snapshot didn't cover
+    """
+    count = repo.index.import_snapshot(path)
+    logger.info(f"Imported {count} chunks from '{path}'")
+    if reindex:
+        index(repo)
@@ -1,5 +1,6 @@
 """Embedding implementations for generating vector representations of text."""
 
+import threading
 from functools import cached_property, lru_cache
 
 import numpy as np
@@ -15,10 +16,13 @@ _ALIASES = {
 }
 
 
-@lru_cache(maxsize=8)
+_embedders_lock = threading.Lock()
+
+
 def get_embedder(model: str = "default") -> Embedder:
     """
     Factory function to get an embedder instance based on a model identifier.
+    Instances are shared, and safe to use from multiple threads.
 
     Args:
         model: Model identifier string. Examples:
@@ -28,6 +32,13 @@ def get_embedder(model: str = "default") -> Embedder:
     Returns:
         An embedder instance
     """
+    # So that threads asking for the same model at once share one instance
+    with _embedders_lock:
+        return _get_embedder(model)
+
+
+@lru_cache(maxsize=8)
+def _get_embedder(model: str) -> Embedder:
     if model in _ALIASES:
         logger.debug(f"Resolved embedder '{model}' to '{_ALIASES[model]}'")
         model = _ALIASES[model]
@@ -48,13 +59,34 @@ def get_embedder(model: str = "default") -> Embedder:
         raise RuntimeError(f"Could not initialize embedder '{model}' : {e}") from e
 
 
+class _load_once(cached_property):
+    """A cached_property that is computed only once, even if several threads want it at the same time."""
+
+    def __init__(self, func):
+        super().__init__(func)
+        self.lock = threading.Lock()
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if self.attrname in instance.__dict__:
+            return instance.__dict__[self.attrname]
+        with self.lock:
+            return super().__get__(instance, owner)
+
+
 class FastEmbedEmbedder:
-    """Embedder using fastembed"""
+    """
+    Embedder using fastembed.
+
+    Inference runs in parallel when called from multiple threads, since
+    ONNX Runtime sessions are thread-safe.
+    """
 
     def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
         self._model_name = model_name
 
-    @cached_property
+    @_load_once
     def model(self):
         """Lazily load the sentence transformer model."""
         logger.info(f"Loading fastembed model '{self._model_name}'...")
@@ -82,13 +114,20 @@ class FastEmbedEmbedder:
         embeddings = self.model.embed(texts)
         return np.stack([e for e in embeddings])
 
+    def embed_queries(self, texts: list[str]) -> NDArray[np.float32]:
+        """Generate embeddings for multiple search queries."""
+        embeddings = self.model.embed(["query: " + text for text in texts])
+        return np.stack([e for e in embeddings])
+
 
 class SentenceTransformersEmbedder:
     """
     Embedder using sentence-transformers models.
 
     Downloads models to a configurable cache directory and generates
-    embeddings locally without network access.
+    embeddings locally without network access. Inference is serialised
+    when called from multiple threads, since PyTorch models aren't
+    guaranteed to be thread-safe.
     """
 
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
@@ -100,8 +139,9 @@ class SentenceTransformersEmbedder:
         """
         self._model_name = model_name
         self._model_id = f"sentence-transformers:{model_name}"
+        self._inference_lock = threading.Lock()
 
-    @cached_property
+    @_load_once
     def model(self):
         """Lazily load the sentence transformer model."""
         logger.info(f"Loading sentence-transformers model '{self._model_name}'...")
@@ -116,7 +156,9 @@ class SentenceTransformersEmbedder:
 
     def embed_doc(self, text: str) -> NDArray[np.float32]:
         """Generate an embedding for a document chunk."""
-        embedding = self.model.encode(text, convert_to_numpy=True)
+        model = self.model
+        with self._inference_lock:
+            embedding = model.encode(text, convert_to_numpy=True)
         return embedding.astype(np.float32)
 
     def embed_query(self, text: str) -> NDArray[np.float32]:
@@ -125,16 +167,23 @@ class SentenceTransformersEmbedder:
 
     def embed_docs(self, texts: list[str]) -> NDArray[np.float32]:
         """Generate embeddings for multiple document chunks."""
-        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+        model = self.model
+        with self._inference_lock:
+            embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
         return embeddings.astype(np.float32)
 
+    def embed_queries(self, texts: list[str]) -> NDArray[np.float32]:
+        """Generate embeddings for multiple search queries."""
+        return self.embed_docs(texts)
+
 
 class LLMEmbedder:
     """
     Embedder using LLM's embedding models.
 
     Uses the llm library to generate embeddings via various providers
-    (OpenAI, Gemini, etc.) configured through llm's settings.
+    (OpenAI, Gemini, etc.) configured through llm's settings. Requests
+    from multiple threads are made in parallel.
     """
 
     def __init__(self, model_id: str = "3-small"):
@@ -168,3 +217,7 @@ class LLMEmbedder:
         """Generate embeddings for multiple document chunks."""
         embeddings = [self.model.embed(text) for text in texts]
         return np.array(embeddings, dtype=np.float32)
+
+    def embed_queries(self, texts: list[str]) -> NDArray[np.float32]:
+        """Generate embeddings for multiple search queries."""
+        return self.embed_docs(texts)
@@ -0,0 +1,97 @@
+"""Searching several commonplaces at once."""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import NDArray
+
+from commonplace._logging import logger
+from commonplace._repo import Commonplace
+from commonplace._search._types import SearchHit, SearchMethod
+
+
+@dataclass
+class FederatedHit:
+    """A search hit from one or more of several commonplaces."""
+
+    hit: SearchHit
+    roots: list[Path]
+    """The commonplaces the hit was found in, best match first"""
+    score: float
+    """Fused score over all the commonplaces (higher is better)"""
+    normalized_score: float
+    """The hit's best score within a commonplace, scaled so that the best there is 1 and the worst 0"""
+
+
+def federated_search(
+    repos: list[Commonplace],
+    query: str,
+    limit: int = 10,
+    method: SearchMethod = SearchMethod.HYBRID,
+    k: int = 60,
+) -> list[FederatedHit]:
+    """
+    Search several commonplaces in parallel, merging their results with
+    reciprocal rank fusion.
+
+    Scores from different indexes aren't always comparable, so hits are fused
+    by rank, with ties broken by each hit's score scaled within its own
+    commonplace, and then by its raw score. A passage found in several
+    commonplaces (e.g. a note shared by two of them) is listed once, and
+    ranks higher. The query is embedded once for all the commonplaces that
+    use the same embedding model.
+
+    Args:
+        repos: The commonplace repositories
+        query: The search query text
+        limit: Maximum number of results to return
+        method: Search method - semantic, keyword, or hybrid (default)
+        k: RRF constant (default 60, as for hybrid search)
+
+    Returns:
+        List of hits, ordered by fused score
+    """
+    embeddings: dict[str, NDArray[np.float32]] = {}
+    if method != SearchMethod.KEYWORD:
+        for repo in repos:
+            embedder = repo.index.embedder
+            if embedder.model_id not in embeddings:
+                embeddings[embedder.model_id] = embedder.embed_query(query)
+        logger.debug(f"Embedded the query for {len(embeddings)} models")
+
+    def search(repo: Commonplace) -> list[SearchHit]:
+        index = repo.index
+        return index.search(query, limit=limit, method=method, query_embedding=embeddings.get(index.embedder.model_id))
+
+    with ThreadPoolExecutor(max_workers=len(repos) or 1, thread_name_prefix="commonplace-federated") as pool:
+        results = list(pool.map(search, repos))
+
+    fused: dict[tuple, FederatedHit] = {}
+    for repo, hits in zip(repos, results):
+        for rank, (hit, normalized) in enumerate(zip(hits, _normalize([hit.score for hit in hits])), 1):
+            key = (hit.chunk.repo_path.path.as_posix(), hit.chunk.offset, hit.chunk.text)
+            if (merged := fused.get(key)) is None:
+                fused[key] = FederatedHit(
+                    hit=hit, roots=[repo.root], score=1.0 / (k + rank), normalized_score=normalized
+                )
+                continue
+            merged.score += 1.0 / (k + rank)
+            merged.roots.append(repo.root)
+            if normalized > merged.normalized_score:
+                merged.hit, merged.normalized_score = hit, normalized
+                merged.roots.insert(0, merged.roots.pop())
+
+    fused_hits = sorted(fused.values(), key=lambda hit: (hit.score, hit.normalized_score, hit.hit.score), reverse=True)
+    return fused_hits[:limit]
+
+
+def _normalize(scores: list[float]) -> list[float]:
+    """Scale scores so that the highest is 1 and the lowest 0 (or all 1, if they're the same)."""
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
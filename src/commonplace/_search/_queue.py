@@ -0,0 +1,119 @@
+"""Deferred indexing: a durable queue of changed notes, drained in the background."""
+
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from commonplace._logging import logger
+from commonplace._repo import Commonplace
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+class IndexQueue:
+    """
+    Notes waiting to be indexed, stored as a file of repo-relative paths in the
+    cache so that nothing is lost if the worker is interrupted.
+
+    Paths are appended by `push`. A worker claims the whole queue by renaming
+    it, so writers never block, and it is only deleted once indexed.
+    """
+
+    def __init__(self, repo: Commonplace):
+        self.repo = repo
+        self.path = repo.cache / "index-queue"
+        self._claimed = self.path.with_suffix(".claimed")
+        self._lock_path = self.path.with_suffix(".lock")
+
+    def push(self, paths: Iterable[str]) -> int:
+        """
+        Queue notes for indexing.
+
+        Args:
+            paths: Repo-relative (posix) paths of changed notes
+
+        Returns:
+            The number of paths queued
+        """
+        lines = "".join(f"{path}\n" for path in paths)
+        if not lines:
+            return 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as fp:
+            fp.write(lines)
+        return lines.count("\n")
+
+    def pending(self) -> set[str]:
+        """Get the paths queued, or being indexed, but not yet indexed."""
+        pending: set[str] = set()
+        for path in (self._claimed, self.path):
+            try:
+                pending.update(path.read_text().splitlines())
+            except FileNotFoundError:
+                pass
+        return pending
+
+    def drain(self) -> int:
+        """
+        Index queued notes until the queue is empty. Returns immediately if
+        another worker is already draining it.
+
+        Returns:
+            The number of queued paths processed
+        """
+        from commonplace._search._commands import index
+
+        processed = 0
+        while True:
+            with self._lock() as acquired:
+                if not acquired:
+                    logger.debug("Another worker is draining the index queue")
+                    return processed
+                # Finish anything an interrupted worker claimed, then whatever has arrived since
+                while self._claimed.exists() or self.path.exists():
+                    if not self._claimed.exists():
+                        os.replace(self.path, self._claimed)
+                    paths = set(self._claimed.read_text().splitlines())
+                    index(self.repo, paths=paths)
+                    self._claimed.unlink()
+                    processed += len(paths)
+            # Paths queued just before we released the lock would otherwise be stranded
+            if not self.path.exists():
+                return processed
+
+    @contextmanager
+    def _lock(self) -> Iterator[bool]:
+        if fcntl is None:
+            yield True
+            return
+        self._lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "w") as fp:
+            try:
+                fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+
+
+def spawn_worker(repo: Commonplace) -> None:
+    """Start a detached process to drain the index queue, logging to the cache."""
+    log_path = repo.cache / "index-worker.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "commonplace", f"--root={repo.root}", "index", "--queued"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    logger.info(f"Indexing in the background (see '{log_path}')")
@@ -1,6 +1,8 @@
 """Vector storage implementations for similarity search."""
 
+import asyncio
 import sqlite3
+import threading
 from pathlib import Path
 from typing import Iterable, Iterator
 
@@ -8,9 +10,15 @@ import numpy as np
 from numpy.typing import NDArray
 
 from commonplace._logging import logger
+from commonplace._memprofile import stage
+from commonplace._metrics import record, timed
+from commonplace._search._async import QueryBatcher
 from commonplace._search._types import Chunk, Embedder, IndexStat, SearchHit, SearchIndex, SearchMethod
 from commonplace._types import RepoPath
 
+# Bump when the snapshot schema changes incompatibly
+_SNAPSHOT_VERSION = 1
+
 
 class SQLiteSearchIndex(SearchIndex):
     """
@@ -18,6 +26,11 @@ class SQLiteSearchIndex(SearchIndex):
 
     Stores chunks and their embeddings in a SQLite database, performing
     in-memory similarity search using numpy.
+
+    The index can be shared between threads: each thread gets its own
+    connection, opened on first use, and the database is in write-ahead
+    logging mode so that searches don't wait for writes. Connections are
+    closed by `close`, or once their thread has finished.
     """
 
     def __init__(self, db_path: Path, embedder: Embedder | None = None):
@@ -28,9 +41,14 @@ class SQLiteSearchIndex(SearchIndex):
             db_path: Path to the SQLite database file
             embedder: Embedder instance to use for generating embeddings
         """
+        self._db_path = db_path
+        self._local = threading.local()
+        self._connections: list[tuple[threading.Thread, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+        self._closed = False
         try:
             db_path.parent.mkdir(parents=True, exist_ok=True)
-            self._conn = sqlite3.connect(str(db_path))
+            self._conn.execute("PRAGMA journal_mode = WAL")
             self._create_tables()
         except Exception as e:
             raise RuntimeError(f"Failed to initialize index at '{db_path}': {e}") from e
@@ -41,6 +59,38 @@ class SQLiteSearchIndex(SearchIndex):
             embedder = get_embedder()
 
         self._embedder = embedder
+        self._batcher: QueryBatcher | None = None
+        self._embeddings: tuple[tuple, tuple[list[Chunk], NDArray[np.float32]]] | None = None
+        self._embeddings_lock = threading.Lock()
+
+    @property
+    def embedder(self) -> Embedder:
+        """The embedder for chunks and queries."""
+        return self._embedder
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's connection to the database."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._connections_lock:
+            if self._closed:
+                raise RuntimeError(f"Index at '{self._db_path}' is closed")
+            # Connections are only used by their own thread, but may be closed by any
+            conn = sqlite3.connect(str(self._db_path), timeout=30, check_same_thread=False)
+            current = threading.current_thread()
+            live = []
+            for thread, other in self._connections:
+                if thread.is_alive():
+                    live.append((thread, other))
+                else:
+                    other.close()
+            self._connections = [*live, (current, conn)]
+        return conn
 
     def _create_tables(self) -> None:
         """Create the necessary database tables if they don't exist."""
@@ -100,6 +150,20 @@ class SQLiteSearchIndex(SearchIndex):
             """
         )
 
+        # A counter bumped whenever the index changes, so derived data can be cached
+        self._conn.execute("CREATE TABLE IF NOT EXISTS index_state (generation INTEGER NOT NULL)")
+        self._conn.execute("INSERT INTO index_state (generation) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM index_state)")
+
+        self._conn.commit()
+
+    @property
+    def generation(self) -> int:
+        """A number that changes whenever chunks are added or removed."""
+        (generation,) = self._conn.execute("SELECT generation FROM index_state").fetchone()
+        return generation
+
+    def _bump_generation(self) -> None:
+        self._conn.execute("UPDATE index_state SET generation = generation + 1")
         self._conn.commit()
 
     def add_chunk(self, chunk: Chunk) -> None:
@@ -109,8 +173,12 @@ class SQLiteSearchIndex(SearchIndex):
         Args:
             chunk: The chunk to store
         """
-        embedding = self._embedder.embed_doc(chunk.text)
-        self._add_with_embedding(chunk, embedding)
+        with timed("embed_seconds"), stage("embed"):
+            embedding = self._embedder.embed_doc(chunk.text)
+        with timed("sqlite_write_seconds"):
+            self._add_with_embedding(chunk, embedding)
+            self._bump_generation()
+        record("chunks_embedded")
 
     def add_chunks(self, chunks: list[Chunk]) -> None:
         """
@@ -127,11 +195,15 @@ class SQLiteSearchIndex(SearchIndex):
 
         # Batch embed all chunks
         texts = [chunk.text for chunk in chunks]
-        embeddings = self._embedder.embed_docs(texts)
+        with timed("embed_seconds"), stage("embed"):
+            embeddings = self._embedder.embed_docs(texts)
 
         # Add all chunks with their embeddings
-        for chunk, embedding in zip(chunks, embeddings):
-            self._add_with_embedding(chunk, embedding)
+        with timed("sqlite_write_seconds"):
+            for chunk, embedding in zip(chunks, embeddings):
+                self._add_with_embedding(chunk, embedding)
+            self._bump_generation()
+        record("chunks_embedded", len(chunks))
 
     def _add_with_embedding(self, chunk: Chunk, embedding: NDArray[np.float32]) -> None:
         """
@@ -159,7 +231,13 @@ class SQLiteSearchIndex(SearchIndex):
         )
         self._conn.commit()
 
-    def search(self, query: str, limit: int = 10, method: SearchMethod = SearchMethod.HYBRID) -> list[SearchHit]:
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        method: SearchMethod = SearchMethod.HYBRID,
+        query_embedding: NDArray[np.float32] | None = None,
+    ) -> list[SearchHit]:
         """
         Search for matching chunks using the specified method.
 
@@ -167,33 +245,82 @@ class SQLiteSearchIndex(SearchIndex):
             query: The search query text
             limit: Maximum number of results to return
             method: Search method - semantic, keyword, or hybrid (default)
+            query_embedding: The query's embedding, if already known (default: embed the query)
 
         Returns:
             List of search hits, ordered by relevance
         """
         logger.debug(f"Searching for {query} ({limit} hits using {method})")
+        record("searches")
+
+        with timed("search_seconds"):
+            if method == SearchMethod.SEMANTIC:
+                return self.search_semantic(query, limit=limit, query_embedding=query_embedding)
+            elif method == SearchMethod.KEYWORD:
+                return self.search_keyword(query, limit=limit)
+            elif method == SearchMethod.HYBRID:
+                return self.search_hybrid(query, limit=limit, query_embedding=query_embedding)
+            else:
+                raise ValueError(f"Unknown search method: {method}")
+
+    async def asearch(self, query: str, limit: int = 10, method: SearchMethod = SearchMethod.HYBRID) -> list[SearchHit]:
+        """
+        Search without blocking the event loop. The query is embedded along
+        with any others arriving at about the same time, and scored in the
+        loop's default executor. Cancelling the search discards its results.
 
-        if method == SearchMethod.SEMANTIC:
-            return self.search_semantic(query, limit=limit)
-        elif method == SearchMethod.KEYWORD:
-            return self.search_keyword(query, limit=limit)
-        elif method == SearchMethod.HYBRID:
-            return self.search_hybrid(query, limit=limit)
-        else:
-            raise ValueError(f"Unknown search method: {method}")
+        Args:
+            query: The search query text
+            limit: Maximum number of results to return
+            method: Search method - semantic, keyword, or hybrid (default)
 
-    def search_semantic(self, query: str, limit: int = 10) -> list[SearchHit]:
+        Returns:
+            List of search hits, ordered by relevance
+        """
+        query_embedding = None
+        if method != SearchMethod.KEYWORD:
+            query_embedding = await self._query_batcher().embed(query)
+        return await asyncio.to_thread(self.search, query, limit, method, query_embedding)
+
+    async def asearch_many(
+        self, queries: Iterable[str], limit: int = 10, method: SearchMethod = SearchMethod.HYBRID
+    ) -> list[list[SearchHit]]:
+        """
+        Run several searches concurrently without blocking the event loop,
+        embedding their queries together.
+
+        Args:
+            queries: The search query texts
+            limit: Maximum number of results to return for each query
+            method: Search method - semantic, keyword, or hybrid (default)
+
+        Returns:
+            List of search hits for each query, in the same order
+        """
+        return list(await asyncio.gather(*(self.asearch(query, limit, method) for query in queries)))
+
+    def _query_batcher(self) -> QueryBatcher:
+        """The batcher for the running event loop, replacing that of any earlier loop."""
+        if self._batcher is None or self._batcher.loop is not asyncio.get_running_loop():
+            self._batcher = QueryBatcher(self._embedder)
+        return self._batcher
+
+    def search_semantic(
+        self, query: str, limit: int = 10, query_embedding: NDArray[np.float32] | None = None
+    ) -> list[SearchHit]:
         """
         Search for similar chunks using semantic similarity.
 
         Args:
             query: The search query text
             limit: Maximum number of results to return
+            query_embedding: The query's embedding, if already known (default: embed the query)
 
         Returns:
             List of search hits, ordered by descending similarity
         """
-        query_embedding = self._embedder.embed_query(query)
+        if query_embedding is None:
+            query_embedding = self._embedder.embed_query(query)
         return self._search_by_embedding(query_embedding, limit)
 
     def _search_by_embedding(self, query_embedding: NDArray[np.float32], limit: int = 10) -> list[SearchHit]:
@@ -207,30 +334,11 @@ class SQLiteSearchIndex(SearchIndex):
         Returns:
             List of search hits, ordered by descending similarity
         """
-        cursor = self._conn.execute(
-            "SELECT id, path, ref, section, text, offset, embedding FROM chunks WHERE model_id = ?",
-            (self._embedder.model_id,),
-        )
-        rows = cursor.fetchall()
-
-        if not rows:
+        chunks, embeddings_matrix = self._load_embeddings()
+        if not chunks:
             return []
 
-        # Load all embeddings
-        embeddings = []
-        chunks = []
-        chunk_ids = []
-        for row in rows:
-            chunk_id, path, ref_str, section, text, offset, embedding_bytes = row
-            embedding = np.frombuffer(embedding_bytes, dtype=np.float32)
-            embeddings.append(embedding)
-
-            repo_path = RepoPath(path=Path(path), ref=ref_str)
-            chunks.append(Chunk(repo_path=repo_path, section=section, text=text, offset=offset))
-            chunk_ids.append(chunk_id)
-
         # Compute cosine similarities
-        embeddings_matrix = np.array(embeddings)
         similarities = self._cosine_similarity(query_embedding, embeddings_matrix)
 
         # Sort by similarity (descending) and take top k
@@ -243,6 +351,42 @@ class SQLiteSearchIndex(SearchIndex):
 
         return results
 
+    def _load_embeddings(self) -> tuple[list[Chunk], NDArray[np.float32]]:
+        """
+        Load the chunks for this index's model, and their embeddings as a
+        matrix. These are kept in memory for later searches, and only reloaded
+        once chunks have been added or removed.
+
+        Returns:
+            The chunks, and a matrix with a row for each chunk's embedding
+        """
+        # Ids only increase, so the highest changes whenever a chunk is added or replaced
+        version = self._conn.execute("SELECT generation, (SELECT MAX(id) FROM chunks) FROM index_state").fetchone()
+        with self._embeddings_lock:
+            if self._embeddings is not None and self._embeddings[0] == version:
+                return self._embeddings[1]
+
+            with stage("search load"):
+                cursor = self._conn.execute(
+                    "SELECT path, ref, section, text, offset, embedding FROM chunks WHERE model_id = ?",
+                    (self._embedder.model_id,),
+                )
+                chunks = []
+                embeddings = []
+                for path, ref_str, section, text, offset, embedding_bytes in cursor:
+                    repo_path = RepoPath(path=Path(path), ref=ref_str)
+                    chunks.append(Chunk(repo_path=repo_path, section=section, text=text, offset=offset))
+                    embeddings.append(np.frombuffer(embedding_bytes, dtype=np.float32))
+                embeddings_matrix = np.array(embeddings)
+
+            self._embeddings = (version, (chunks, embeddings_matrix))
+            return chunks, embeddings_matrix
+
+    def warm(self) -> None:
+        """Load the embedding model and the embeddings now, rather than on the first search."""
+        self._embedder.embed_query("")
+        self._load_embeddings()
+
     @staticmethod
     def _sanitize_fts5_query(query: str) -> str:
         """Strip FTS5 syntax from a natural language query, keeping just the words."""
@@ -293,6 +437,7 @@ class SQLiteSearchIndex(SearchIndex):
         query: str,
         limit: int = 10,
         k: int = 60,
+        query_embedding: NDArray[np.float32] | None = None,
     ) -> list[SearchHit]:
         """
         Search using a modified reciprocal rank fusion of keyword and semantic search.
@@ -301,6 +446,7 @@ class SQLiteSearchIndex(SearchIndex):
             query: The search query string
             limit: Maximum number of results to return
             k: RRF constant (default 60, as recommended in literature)
+            query_embedding: The query's embedding, if already known (default: embed the query)
 
         Returns:
             List of search hits, ordered by fused score
@@ -308,7 +454,7 @@ class SQLiteSearchIndex(SearchIndex):
 
         # Get results from both methods
         keyword_results = self.search_keyword(query, limit=limit)
-        semantic_results = self.search_semantic(query, limit=limit)
+        semantic_results = self.search_semantic(query, limit=limit, query_embedding=query_embedding)
 
         # Build lookup by chunk identity (path + offset uniquely identifies a chunk)
         def chunk_key(chunk: Chunk) -> tuple:
@@ -346,14 +492,144 @@ class SQLiteSearchIndex(SearchIndex):
         for path, ref in cursor.fetchall():
             yield (RepoPath(Path(path), ref))
 
+    def export_snapshot(self, snapshot_path: Path, repo_paths: Iterable[RepoPath]) -> int:
+        """
+        Write the chunks and embeddings of some notes, for every model, to a
+        standalone SQLite database that another index can import. Chunks are
+        keyed by (model_id, path, ref, offset), so are valid anywhere the same
+        commits are checked out.
+
+        Args:
+            snapshot_path: Where to write the snapshot (replacing any existing file)
+            repo_paths: The notes to include, if indexed
+
+        Returns:
+            The number of chunks exported
+        """
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.tmp")
+        tmp_path.unlink(missing_ok=True)
+        self._select_paths(repo_paths)
+
+        self._conn.execute("ATTACH DATABASE ? AS snapshot", (str(tmp_path),))
+        try:
+            self._conn.execute(f"PRAGMA snapshot.user_version = {_SNAPSHOT_VERSION}")
+            self._conn.execute(
+                """
+                CREATE TABLE snapshot.chunks (
+                    model_id TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    ref TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    embedding BLOB NOT NULL,
+                    PRIMARY KEY (model_id, path, ref, offset)
+                ) WITHOUT ROWID
+                """
+            )
+            cursor = self._conn.execute(
+                """
+                INSERT INTO snapshot.chunks (model_id, path, ref, section, text, offset, embedding)
+                SELECT c.model_id, c.path, c.ref, c.section, c.text, c.offset, c.embedding
+                FROM chunks c JOIN selected_paths USING (path, ref)
+                """
+            )
+            count = cursor.rowcount
+            self._conn.commit()
+        finally:
+            self._conn.execute("DETACH DATABASE snapshot")
+        tmp_path.replace(snapshot_path)
+        return count
+
+    def _select_paths(self, repo_paths: Iterable[RepoPath]) -> None:
+        """Fill the temporary selected_paths table, for joining against chunks."""
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS selected_paths (path TEXT NOT NULL, ref TEXT NOT NULL)")
+        self._conn.execute("DELETE FROM selected_paths")
+        self._conn.executemany(
+            "INSERT INTO selected_paths (path, ref) VALUES (?, ?)",
+            ((str(repo_path.path), repo_path.ref) for repo_path in repo_paths),
+        )
+        self._conn.commit()
+
+    def count_chunks(self, current: Iterable[RepoPath]) -> tuple[int, int]:
+        """
+        Count the chunks in the index, and how many are stale.
+
+        Args:
+            current: The notes as they are now
+
+        Returns:
+            The total number of chunks, and the number for notes not in current
+            (because they have since changed or been deleted)
+        """
+        self._select_paths(current)
+        (total, stale) = self._conn.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(s.path IS NULL), 0)
+            FROM chunks c LEFT JOIN selected_paths s USING (path, ref)
+            """
+        ).fetchone()
+        return total, stale
+
+    def import_snapshot(self, snapshot_path: Path) -> int:
+        """
+        Add the chunks and embeddings from a snapshot written by
+        export_snapshot, skipping any already in the index.
+
+        Args:
+            snapshot_path: The snapshot to read
+
+        Returns:
+            The number of chunks added
+
+        Raises:
+            ValueError: If the file is not a compatible snapshot
+        """
+        if not snapshot_path.is_file():
+            raise ValueError(f"Snapshot '{snapshot_path}' not found")
+
+        try:
+            self._conn.execute("ATTACH DATABASE ? AS snapshot", (str(snapshot_path),))
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"'{snapshot_path}' is not a valid index snapshot: {e}") from e
+        try:
+            (version,) = self._conn.execute("PRAGMA snapshot.user_version").fetchone()
+            if version != _SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {version} (expected {_SNAPSHOT_VERSION})")
+            cursor = self._conn.execute(
+                """
+                INSERT OR IGNORE INTO chunks (model_id, path, ref, section, text, offset, embedding)
+                SELECT model_id, path, ref, section, text, offset, embedding FROM snapshot.chunks
+                """
+            )
+            count = cursor.rowcount
+            self._conn.execute("UPDATE index_state SET generation = generation + 1")
+            self._conn.commit()
+        except sqlite3.DatabaseError as e:
+            self._conn.rollback()
+            raise ValueError(f"'{snapshot_path}' is not a valid index snapshot: {e}") from e
+        finally:
+            self._conn.execute("DETACH DATABASE snapshot")
+        return count
+
     def clear(self) -> None:
         """Remove all chunks from the store."""
         self._conn.execute("DELETE FROM chunks")
-        self._conn.commit()
+        self._bump_generation()
 
     def close(self) -> None:
-        """Close the database connection."""
-        self._conn.close()
+        """
+        Close every thread's database connection, so it must only be called
+        once other threads have finished with the index. The index can't be
+        used afterwards.
+        """
+        self._embeddings = None
+        with self._connections_lock:
+            self._closed = True
+            for _, conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
 
     @staticmethod
     def _cosine_similarity(query: NDArray[np.float32], embeddings: NDArray[np.float32]) -> NDArray[np.float32]:
@@ -383,3 +659,28 @@ class SQLiteSearchIndex(SearchIndex):
 
         for row in self._conn.execute("SELECT model_id, path, ref, COUNT(*) FROM chunks GROUP BY model_id, path, ref"):
             yield IndexStat(row[0], RepoPath(Path(row[1]), row[2]), num_chunks=row[3])
+
+    def chunks_by_source(self) -> dict[str, int]:
+        """
+        Count chunks by source, aggregating in SQL rather than per note.
+
+        Returns:
+            Dict mapping source (as given by Commonplace.source) to number of chunks
+        """
+        # Mirrors Commonplace.source: the top-level directory, or two levels for chats
+        cursor = self._conn.execute(
+            """
+            SELECT
+                CASE
+                    WHEN instr(path, '/') = 0 THEN 'misc'
+                    WHEN substr(path, 1, 6) = 'chats/' AND instr(substr(path, 7), '/') > 0
+                        THEN substr(path, 1, 5 + instr(substr(path, 7), '/'))
+                    WHEN substr(path, 1, 6) = 'chats/' THEN path
+                    ELSE substr(path, 1, instr(path, '/') - 1)
+                END AS source,
+                COUNT(*)
+            FROM chunks
+            GROUP BY source
+            """
+        )
+        return dict(cursor.fetchall())
@@ -66,7 +66,7 @@ class Chunker(Protocol):
 
 
 class Embedder(Protocol):
-    """Protocol for generating embeddings from text."""
+    """Protocol for generating embeddings from text. Implementations must be safe to call from multiple threads."""
 
     @property
     def model_id(self) -> str:
@@ -114,6 +114,18 @@ class Embedder(Protocol):
         """
         ...
 
+    def embed_queries(self, texts: list[str]) -> NDArray[np.float32]:
+        """
+        Generate embeddings for multiple search queries.
+
+        Args:
+            texts: List of query texts to embed
+
+        Returns:
+            Array of embedding vectors, shape (len(texts), embedding_dim)
+        """
+        ...
+
 
 @dataclass
 class IndexStat:
@@ -0,0 +1,293 @@
+"""
+A local HTTP JSON API for searching a commonplace, so that several tools can
+share one warm index rather than each loading the embedding model.
+
+Endpoints:
+    GET  /health              Whether the server is up
+    POST /search              {"query": ..., "limit": 10, "method": "hybrid"} -> {"hits": [...]}
+    POST /search/batch        {"queries": [...], "limit": 10, "method": "hybrid"} -> {"results": [[...], ...]}
+    GET  /notes/<path>?ref=   A note's content, at a commit (default: as last changed)
+    GET  /stats               Counts of notes and indexed chunks by source
+    GET  /metrics             Request counts and latencies by endpoint
+
+There is no authentication, so by default the server only listens on
+localhost. Access to a unix socket is limited to its owner.
+"""
+
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from commonplace._api import NotFoundError, RequestError, SearchAPI
+from commonplace._logging import logger
+from commonplace._repo import Commonplace
+from commonplace._search._types import SearchMethod
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1024 * 1024
+
+
+class LatencyStats:
+    """Request counts and latencies by endpoint, keeping recent latencies for percentiles."""
+
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, dict[str, Any]] = {}
+
+    def record(self, endpoint: str, seconds: float, error: bool) -> None:
+        """Record a request to an endpoint that took some time, and maybe failed."""
+        with self._lock:
+            stats = self._endpoints.setdefault(
+                endpoint, {"requests": 0, "errors": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=self._window)}
+            )
+            stats["requests"] += 1
+            stats["errors"] += error
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["recent"].append(seconds)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Get the counts and latencies (in milliseconds) by endpoint."""
+        with self._lock:
+            summary = {}
+            for endpoint, stats in sorted(self._endpoints.items()):
+                recent = sorted(stats["recent"])
+                summary[endpoint] = {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "mean_ms": 1000 * stats["total"] / stats["requests"],
+                    "p50_ms": 1000 * _percentile(recent, 0.5),
+                    "p95_ms": 1000 * _percentile(recent, 0.95),
+                    "p99_ms": 1000 * _percentile(recent, 0.99),
+                    "max_ms": 1000 * stats["max"],
+                }
+            return summary
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+class _WorkerPoolMixIn:
+    """Handle requests with a fixed pool of worker threads, whose connections to the index stay open."""
+
+    workers = 8
+    # Connections waiting to be accepted (the listen backlog), beyond which the
+    # OS refuses new ones. A connection is only accepted once a worker is free.
+    request_queue_size = 128
+
+    def process_request(self, request, client_address):
+        if not hasattr(self, "_pool"):
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="commonplace-serve")
+            self._idle_workers = threading.Semaphore(self.workers)
+        # Wait for a free worker, so that requests beyond those being handled
+        # wait in the backlog rather than piling up in the pool's queue
+        self._idle_workers.acquire()
+        self._pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)  # type: ignore[attr-defined]
+        except Exception:
+            self.handle_error(request, client_address)  # type: ignore[attr-defined]
+        finally:
+            self.shutdown_request(request)  # type: ignore[attr-defined]
+            self._idle_workers.release()
+
+    def server_close(self):
+        super().server_close()  # type: ignore[misc]
+        if hasattr(self, "_pool"):
+            self._pool.shutdown(wait=True)
+
+
+class _TCPServer(_WorkerPoolMixIn, HTTPServer):
+    pass
+
+
+class _UnixServer(_WorkerPoolMixIn, socketserver.UnixStreamServer):
+    def server_bind(self):
+        # Create the socket accessible only by its owner, rather than changing
+        # its mode after others could have connected
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+
+class SearchServer:
+    """
+    Serves the API for a repository, keeping its embedding model, database
+    connections and embeddings loaded between requests.
+    """
+
+    def __init__(
+        self,
+        repo: Commonplace,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        socket_path: Path | None = None,
+        workers: int = 8,
+    ):
+        """
+        Args:
+            repo: The commonplace repository
+            host: Address to listen on (ignored if socket_path is given)
+            port: Port to listen on, or 0 for any free port
+            socket_path: Unix socket to listen on instead of a TCP port
+            workers: Number of requests to handle at once
+        """
+        self.api = SearchAPI(repo)
+        self.latency = LatencyStats()
+        self.socket_path = socket_path
+
+        handler = _make_handler(self)
+        if socket_path is not None:
+            if socket_path.is_socket():
+                socket_path.unlink()  # Left behind by a server that didn't exit cleanly
+            self._server: socketserver.BaseServer = _UnixServer(str(socket_path), handler)
+            self.address = str(socket_path)
+        else:
+            self._server = _TCPServer((host, port), handler)
+            host, port = self._server.server_address[:2]  # type: ignore[assignment]
+            self.address = f"http://{host}:{port}"
+        self._server.workers = workers  # type: ignore[attr-defined]
+
+        self._routes: dict[tuple[str, str], Callable[[dict[str, Any], dict[str, list[str]]], Any]] = {
+            ("GET", "/health"): lambda body, params: {"status": "ok"},
+            ("POST", "/search"): lambda body, params: self.api.search(
+                body.get("query"), body.get("limit", 10), body.get("method", SearchMethod.HYBRID)
+            ),
+            ("POST", "/search/batch"): lambda body, params: self.api.search_batch(
+                body.get("queries"), body.get("limit", 10), body.get("method", SearchMethod.HYBRID)
+            ),
+            ("GET", "/stats"): lambda body, params: self.api.stats(),
+            ("GET", "/metrics"): lambda body, params: self.latency.summary(),
+        }
+
+    def serve_forever(self) -> None:
+        """Load the index, then handle requests until shut down or interrupted."""
+        logger.info("Loading the search index")
+        self.api.warm()
+        logger.info(f"Serving on {self.address} (Ctrl-C to stop)")
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopping server")
+        finally:
+            self.close()
+
+    def shutdown(self) -> None:
+        """Stop serving, from another thread."""
+        self._server.shutdown()
+
+    def close(self) -> None:
+        """Close the listening socket, waiting for requests being handled."""
+        self._server.server_close()
+        if self.socket_path is not None:
+            self.socket_path.unlink(missing_ok=True)
+
+    def handle(self, method: str, url: str, body: bytes) -> tuple[HTTPStatus, Any]:
+        """
+        Handle a request, recording its latency.
+
+        Returns:
+            The response status, and its JSON content
+        """
+        started = time.perf_counter()
+        parts = urlsplit(url)
+        path = unquote(parts.path)
+        endpoint = "/notes" if path.startswith("/notes/") else path
+        status, content = HTTPStatus.OK, None
+        try:
+            if endpoint == "/notes" and method == "GET":
+                content = self.api.note(path.removeprefix("/notes/"), parse_qs(parts.query).get("ref", [None])[-1])
+            elif (method, endpoint) in self._routes:
+                content = self._routes[method, endpoint](_parse_body(body), parse_qs(parts.query))
+            else:
+                endpoint = "unknown"
+                raise NotFoundError(f"No such endpoint: {method} {path}")
+        except RequestError as e:
+            status, content = e.status, {"error": str(e)}
+        except Exception as e:
+            logger.exception(f"Error handling {method} {path}: {e}")
+            status, content = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        self.latency.record(endpoint, time.perf_counter() - started, error=status != HTTPStatus.OK)
+        return status, content
+
+
+def _make_handler(server: SearchServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Close idle keep-alive connections, so they don't tie up workers
+        timeout = 10
+
+        def do_GET(self):
+            self._respond(*server.handle("GET", self.path, b""))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY:
+                self._respond(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request too large"})
+                self.close_connection = True
+                return
+            self._respond(*server.handle("POST", self.path, self.rfile.read(length)))
+
+        def _respond(self, status: HTTPStatus, content: Any) -> None:
+            data = json.dumps(content).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self) -> str:
+            # Unix socket clients have no address
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+def _parse_body(body: bytes) -> dict[str, Any]:
+    if not body:
+        return {}
+    try:
+        parsed = json.loads(body)
+    except ValueError as e:
+        raise RequestError(f"Invalid JSON: {e}") from None
+    if not isinstance(parsed, dict):
+        raise RequestError("Request body must be a JSON object")
+    return parsed
+
+
+def serve(
+    repo: Commonplace,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Path | None = None,
+    workers: int = 8,
+) -> None:
+    """
+    Serve the search API until interrupted.
+
+    Args:
+        repo: The commonplace repository
+        host: Address to listen on (ignored if socket_path is given)
+        port: Port to listen on
+        socket_path: Unix socket to listen on instead of a TCP port
+        workers: Number of requests to handle at once
+    """
+    SearchServer(repo, host=host, port=port, socket_path=socket_path, workers=workers).serve_forever()
@@ -1,13 +1,83 @@
 """Statistics and visualization for commonplace repository."""
 
-from collections import Counter
+import json
+import os
+import tempfile
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date
 
 from rich.console import Console
 from rich.table import Table
 
-from commonplace._heatmap import ActivityHeatmap, build_activity_data, render_all_time_heatmap
+from commonplace._heatmap import ActivityHeatmap, extract_date_from_path, render_all_time_heatmap
+from commonplace._logging import logger
 from commonplace._repo import Commonplace
 
+# Bump when the cached counts change meaning
+_CACHE_VERSION = 2
+
+
+@dataclass
+class SourceCounts:
+    """Counts of notes and indexed chunks by source, and note activity by source and date."""
+
+    key: list
+    notes: dict[str, int]
+    activity: dict[str, dict[str, int]]
+    chunks: dict[str, int]
+
+
+def count_by_source(repo: Commonplace) -> SourceCounts:
+    """
+    Count notes and indexed chunks by source.
+
+    The counts are cached, keyed by the notes in the repository (see
+    Commonplace.notes_digest) and the search index's generation, so they are
+    only recomputed when notes are added or removed, or the index changes.
+
+    Args:
+        repo: The commonplace repository
+
+    Returns:
+        The counts, by source
+    """
+    key = [_CACHE_VERSION, repo.notes_digest(), repo.index.generation]
+
+    cache_path = repo.cache / "stats.json"
+    try:
+        cached = SourceCounts(**json.loads(cache_path.read_bytes()))
+        if cached.key == key:
+            return cached
+    except (OSError, ValueError, TypeError) as e:
+        if not isinstance(e, FileNotFoundError):
+            logger.warning(f"Ignoring unreadable stats cache '{cache_path}': {e}")
+
+    notes: Counter[str] = Counter()
+    activity: defaultdict[str, Counter[str]] = defaultdict(Counter)
+    for repo_path in repo.note_paths():
+        source = repo.source(repo_path)
+        notes[source] += 1
+        if note_date := extract_date_from_path(repo_path.path):
+            activity[source][note_date.isoformat()] += 1
+
+    counts = SourceCounts(
+        key=key,
+        notes=dict(notes),
+        activity={source: dict(dates) for source, dates in activity.items()},
+        chunks=repo.index.chunks_by_source(),
+    )
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temporary file, as server threads may be counting at the same time
+    with tempfile.NamedTemporaryFile("w", dir=cache_path.parent, prefix="stats-", delete=False) as tmp:
+        try:
+            json.dump(asdict(counts), tmp)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+    os.replace(tmp.name, cache_path)
+    return counts
+
 
 def generate_stats(
     repo: Commonplace,
@@ -35,16 +105,18 @@ def generate_stats(
     def matches_any_source(source_str: str) -> bool:
         return sources is None or any(source_str == src or source_str.startswith(src + "/") for src in sources)
 
-    # Collect all note paths
-    all_note_paths = list(repo.note_paths())
+    counts = count_by_source(repo)
 
     # Filter by sources if specified
-    note_paths = [path for path in all_note_paths if matches_any_source(repo.source(path))]
-    if not note_paths and sources is not None:
+    repo_counts = Counter({source: n for source, n in counts.notes.items() if matches_any_source(source)})
+    if not repo_counts and sources is not None:
         raise ValueError(f"No notes found for sources: {', '.join(sources)}")
 
     # Build activity heatmap
-    activity = build_activity_data(note_paths)
+    activity: Counter[date] = Counter()
+    for source, dates in counts.activity.items():
+        if matches_any_source(source):
+            activity.update({date.fromisoformat(day): n for day, n in dates.items()})
     heatmap_output = ""
 
     if activity:
@@ -69,20 +141,7 @@ def generate_stats(
         heatmap_output = capture.get()
 
     # Build stats table
-    repo_counts: Counter[str] = Counter()
-    repo_counts.update(repo.source(path) for path in note_paths)
-
-    index_chunks_by_source: Counter[str] = Counter()
-    all_stats = list(repo.index.stats())
-
-    # Filter index stats by sources if specified
-    if sources:
-        filtered_stats = [stat for stat in all_stats if matches_any_source(repo.source(stat.repo_path))]
-    else:
-        filtered_stats = all_stats
-
-    for stat in filtered_stats:
-        index_chunks_by_source.update({repo.source(stat.repo_path): stat.num_chunks})
+    index_chunks_by_source = Counter({source: n for source, n in counts.chunks.items() if matches_any_source(source)})
 
     sources_list = sorted(
         set(repo_counts) | set(index_chunks_by_source),
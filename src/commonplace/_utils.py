@@ -58,6 +58,22 @@ def truncate(text: str, max_length: int = 200) -> str:
     return text
 
 
+def fenced(text: str, lang: str = "") -> str:
+    """
+    Quote text in a Markdown fenced code block.
+
+    Args:
+        text: The text to quote
+        lang: The info string, e.g. "json"
+
+    Returns:
+        The block, with a fence longer than any run of backticks in the text
+    """
+    longest = max((len(run) for run in re.findall("`+", text)), default=0)
+    fence = "`" * max(3, longest + 1)
+    return f"{fence}{lang}\n{text}\n{fence}"
+
+
 def slugify(text: str) -> str:
     """
     Convert text to a URL-friendly slug.
@@ -0,0 +1,94 @@
+"""Tests for the asyncio search and indexing API."""
+
+import asyncio
+
+import pytest
+
+from commonplace._search import _commands
+from commonplace._search._types import SearchMethod
+
+TOPICS = ["cats and kittens", "baking sourdough bread", "sailing small boats", "growing tomatoes"]
+
+
+@pytest.fixture
+def notes_repo(test_repo, make_note):
+    for i, topic in enumerate(TOPICS):
+        test_repo.save(make_note(f"note{i}.md", f"# Note {i}\n\nSome thoughts about {topic}.\n"))
+    test_repo.commit("Add notes", auto_index=False)
+    return test_repo
+
+
+@pytest.fixture
+def embedded_batches(notes_repo, monkeypatch):
+    """The batches of queries embedded together."""
+    index = notes_repo.index
+    batches = []
+    embed_queries = index._embedder.embed_queries
+
+    def record(texts):
+        batches.append(texts)
+        return embed_queries(texts)
+
+    monkeypatch.setattr(index._embedder, "embed_queries", record)
+    return batches
+
+
+@pytest.mark.parametrize("method", list(SearchMethod))
+def test_asearch_matches_search(notes_repo, method):
+    _commands.index(notes_repo)
+
+    hits = asyncio.run(notes_repo.index.asearch("bread", limit=3, method=method))
+
+    assert hits == notes_repo.index.search("bread", limit=3, method=method)
+
+
+def test_asearch_many_embeds_queries_together(notes_repo, embedded_batches):
+    _commands.index(notes_repo)
+
+    results = asyncio.run(notes_repo.index.asearch_many(TOPICS, limit=2))
+
+    assert embedded_batches == [TOPICS]
+    assert results == [notes_repo.index.search(topic, limit=2) for topic in TOPICS]
+
+
+def test_cancelled_search_is_not_embedded(notes_repo, embedded_batches):
+    async def main():
+        searches = [asyncio.create_task(notes_repo.index.asearch(topic)) for topic in TOPICS]
+        await asyncio.sleep(0)
+        searches[1].cancel()
+        return await asyncio.gather(*searches, return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert embedded_batches == [[TOPICS[0], *TOPICS[2:]]]
+
+
+def test_aindex(notes_repo):
+    asyncio.run(_commands.aindex(notes_repo))
+
+    assert set(notes_repo.index.get_indexed_paths()) == set(notes_repo.note_paths())
+
+
+def test_cancelled_aindex_keeps_batches_added(notes_repo, monkeypatch):
+    index = notes_repo.index
+    added = []
+    add_chunks = index.add_chunks
+
+    async def main():
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+
+        def add_and_cancel(chunks):
+            add_chunks(chunks)
+            added.append(chunks)
+            loop.call_soon_threadsafe(task.cancel)
+
+        monkeypatch.setattr(index, "add_chunks", add_and_cancel)
+        await _commands.aindex(notes_repo, batch_size=1)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(main())
+
+    assert len(added) == 1
+    assert list(index.get_indexed_paths()) == [added[0][0].repo_path]
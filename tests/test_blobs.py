@@ -61,6 +61,76 @@ def test_store_blob_different_content_different_hash(test_repo, tmp_path):
     assert p1.path.name == p2.path.name == "data.bin"
 
 
+def test_store_blob_changed_while_storing(test_repo, sample_file, monkeypatch):
+    """A file that changes after it's hashed is stored under the digest of what was copied."""
+    import commonplace._repo
+
+    def hash_then_change(path):
+        digest = _hash_file(path)
+        path.write_text("goodbye world")
+        return digest
+
+    monkeypatch.setattr(commonplace._repo, "_hash_file", hash_then_change)
+    repo_path = test_repo.store_blob(sample_file)
+
+    assert repo_path.path.parent.name == _hash_file(sample_file)
+    assert (test_repo.root / repo_path.path).read_text() == "goodbye world"
+
+
+def test_store_blob_from_stream(test_repo, sample_file):
+    """Streams are stored at the same content address as the equivalent file."""
+    with open(sample_file, "rb") as fp:
+        stream_path = test_repo.store_blob(fp, name="sample.txt")
+
+    file_path = test_repo.store_blob(sample_file)
+    assert stream_path.path == file_path.path
+    assert (test_repo.root / stream_path.path).read_text() == "hello world"
+
+
+def test_store_blob_from_stream_is_idempotent(test_repo, sample_file):
+    """Storing a known stream leaves no temporary files behind."""
+    for _ in range(2):
+        with open(sample_file, "rb") as fp:
+            test_repo.store_blob(fp, name="sample.txt")
+
+    blob_files = [p for p in (test_repo.root / ".commonplace" / "blobs").rglob("*") if p.is_file()]
+    assert [p.name for p in blob_files] == ["sample.txt"]
+    assert not list(test_repo.cache.glob("blob-*"))
+
+
+def test_store_blob_known_stream_is_not_spooled(test_repo, monkeypatch):
+    """Small streams that are already stored aren't written to disk again."""
+    import io
+    import tempfile
+
+    test_repo.store_blob(io.BytesIO(b"payload"), name="part.json")
+
+    spooled = []
+    named_temporary_file = tempfile.NamedTemporaryFile
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", lambda **kw: spooled.append(1) or named_temporary_file(**kw))
+    again = test_repo.store_blob(io.BytesIO(b"payload"), name="part.json")
+
+    assert not spooled
+    assert (test_repo.root / again.path).read_bytes() == b"payload"
+
+
+def test_store_blob_large_stream(test_repo, tmp_path):
+    """Streams larger than one read are spooled and stored whole."""
+    source = tmp_path / "large.bin"
+    source.write_bytes(bytes(range(256)) * 10_000)
+
+    with open(source, "rb") as fp:
+        repo_path = test_repo.store_blob(fp, name="large.bin")
+
+    assert (test_repo.root / repo_path.path).read_bytes() == source.read_bytes()
+    assert repo_path.path.parent.name == _hash_file(source)
+
+
+def test_store_blob_from_stream_requires_name(test_repo, sample_file):
+    with open(sample_file, "rb") as fp, pytest.raises(ValueError, match="name is required"):
+        test_repo.store_blob(fp)
+
+
 def test_store_blob_creates_gitattributes(test_repo, sample_file):
     """store_blob() ensures .gitattributes exists with LFS config."""
     gitattributes = test_repo.root / ".gitattributes"
@@ -0,0 +1,135 @@
+"""Tests for searching several commonplaces at once."""
+
+from contextlib import closing
+
+import pytest
+
+from commonplace._repo import Commonplace
+from commonplace._search import _commands
+from commonplace._search._federated import _normalize, federated_search
+from commonplace._search._types import SearchMethod
+
+
+@pytest.fixture
+def make_repo(tmp_path, make_note):
+    repos = []
+
+    def _make_repo(name, notes, embedder=None):
+        root = tmp_path / name
+        root.mkdir()
+        Commonplace.init(root)
+        repo = Commonplace.open(root)
+        repos.append(repo)
+        if embedder is not None:
+            repo.index._embedder = embedder
+        for path, content in notes.items():
+            repo.save(make_note(path, content))
+        repo.commit("Add notes")
+        _commands.index(repo)
+        return repo
+
+    yield _make_repo
+    for repo in repos:
+        repo.close()
+
+
+@pytest.fixture
+def work_and_home(make_repo):
+    work = make_repo("work", {"deploy.md": "# Deploys\n\nRolling back a broken deploy.\n"})
+    home = make_repo("home", {"bread.md": "# Bread\n\nBaking sourdough bread at home.\n"})
+    return work, home
+
+
+class CountingEmbedder:
+    """Wraps an embedder, counting the queries embedded, and optionally renaming its model."""
+
+    def __init__(self, embedder, model_id=None):
+        self.embedder = embedder
+        self.model_id = model_id or embedder.model_id
+        self.queries = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return self.embedder.embed_query(text)
+
+    def __getattr__(self, name):
+        return getattr(self.embedder, name)
+
+
+def test_federated_search(work_and_home):
+    work, home = work_and_home
+
+    results = federated_search([work, home], "sourdough bread", limit=5)
+
+    assert [(result.hit.chunk.repo_path.path.name, result.roots) for result in results] == [
+        ("bread.md", [home.root]),
+        ("deploy.md", [work.root]),
+    ]
+    # Each is the best in its commonplace, so the raw scores decide
+    assert results[0].score == results[1].score
+    assert results[0].normalized_score == results[1].normalized_score == 1.0
+
+
+@pytest.mark.parametrize("method", list(SearchMethod))
+def test_federated_search_matches_each_root(work_and_home, method):
+    work, home = work_and_home
+
+    results = federated_search([work, home], "deploy", limit=10, method=method)
+
+    found = {(result.roots[0], result.hit.chunk.repo_path.path.name) for result in results}
+    expected = {
+        (repo.root, hit.chunk.repo_path.path.name)
+        for repo in (work, home)
+        for hit in repo.index.search("deploy", method=method)
+    }
+    assert found == expected
+
+
+def test_shared_passages_are_merged(make_repo):
+    note = {"shared.md": "# Shared\n\nThe team's notes on sourdough.\n"}
+    work = make_repo("work", {**note, "deploy.md": "# Deploys\n\nRolling back.\n"})
+    home = make_repo("home", {**note, "bread.md": "# Bread\n\nBaking sourdough bread.\n"})
+
+    results = federated_search([work, home], "team sourdough notes", limit=10)
+
+    shared = [result for result in results if result.hit.chunk.repo_path.path.name == "shared.md"]
+    assert len(shared) == 1
+    assert set(shared[0].roots) == {work.root, home.root}
+    assert results[0] is shared[0]
+
+
+def test_query_embedded_once_per_model(make_repo, test_index):
+    base = test_index.embedder
+    same = CountingEmbedder(base)
+    other = CountingEmbedder(base, model_id="other-model")
+    repos = [
+        make_repo("a", {"a.md": "# A\n\nApples.\n"}, embedder=same),
+        make_repo("b", {"b.md": "# B\n\nBananas.\n"}, embedder=same),
+        make_repo("c", {"c.md": "# C\n\nCherries.\n"}, embedder=other),
+    ]
+
+    results = federated_search(repos, "fruit")
+
+    assert (same.queries, other.queries) == (1, 1)
+    assert {result.hit.chunk.repo_path.path.name for result in results} == {"a.md", "b.md", "c.md"}
+
+
+def test_normalize():
+    assert _normalize([]) == []
+    assert _normalize([0.5, 0.5]) == [1.0, 1.0]
+    assert _normalize([3.0, 2.0, 1.0]) == [1.0, 0.5, 0.0]
+
+
+def test_search_also(test_app, test_repo, make_note, tmp_path, capsys):
+    other = tmp_path / "other"
+    Commonplace.init(other)
+    with closing(Commonplace.open(other)) as repo:
+        repo.save(make_note("bread.md", "# Bread\n\nBaking sourdough bread.\n"))
+        repo.commit("Add note")
+        _commands.index(repo)
+
+    assert test_app(["search", "--also", str(other), "sourdough"]) == 0
+
+    output = capsys.readouterr().out
+    assert "bread.md" in output
+    assert f"Root: {other}" in output
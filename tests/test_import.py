@@ -1,3 +1,5 @@
+import json
+import os
 import shutil
 from dataclasses import dataclass
 from datetime import datetime
@@ -5,7 +7,7 @@ from pathlib import Path
 
 import pytest
 
-from commonplace._import._commands import import_
+from commonplace._import._commands import PROBE_HEAD_SIZE, autodetect_importer, import_, probe_file
 from commonplace._import._serializer import MarkdownSerializer
 from commonplace._import._types import EventLog, Message, Role
 
@@ -78,6 +80,78 @@ def test_serialize_log(snapshot):
     snapshot.assert_match(result, "log.md")
 
 
+def test_serialize_incremental_matches_whole(sample_export):
+    """Formatting events separately gives byte-identical output."""
+    importer = autodetect_importer(sample_export.path)
+    assert importer is not None
+    whole = MarkdownSerializer(human="Human", assistant="Assistant")
+    incremental = MarkdownSerializer(human="Human", assistant="Assistant", incremental=True)
+    for log in importer.import_(sample_export.path):
+        assert incremental.serialize(log) == whole.serialize(log)
+
+
+def test_serialize_incremental_reuses_formatting():
+    from commonplace._import._serializer import _format_cached
+
+    def message(i):
+        return Message(sender=Role.USER, content=f"Message {i} with *emphasis*", created=datetime(2024, 1, 1, 12, 0, i))
+
+    serializer = MarkdownSerializer(incremental=True)
+    log = EventLog(source="test", title="Growing", created=datetime(2024, 1, 1), events=[message(i) for i in range(3)])
+    serializer.serialize(log)
+
+    log.events = [message(i) for i in range(4)]
+    before = _format_cached.cache_info()
+    result = serializer.serialize(log)
+    after = _format_cached.cache_info()
+
+    assert after.misses - before.misses == 1
+    assert result == MarkdownSerializer().serialize(log)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "```python\nprint('never closed')",
+        "~~~~\n~~~\nstill open",
+        "<!--\nan unterminated comment",
+        "See [the docs][docs]\n\n[docs]: https://example.com",
+        "<pre>\nraw\n\ntext",
+    ],
+)
+def test_serialize_incremental_falls_back(content):
+    """Events whose Markdown could spill into their neighbours are formatted as part of the whole document."""
+    from commonplace._import._serializer import _is_self_contained
+
+    assert not _is_self_contained(content)
+
+    log = EventLog(
+        source="test",
+        title="Spills",
+        created=datetime(2024, 1, 1),
+        events=[
+            Message(sender=Role.USER, content=content, created=datetime(2024, 1, 1, 12, 0, 0)),
+            Message(sender=Role.ASSISTANT, content="* a [docs] list", created=datetime(2024, 1, 1, 12, 0, 1)),
+        ],
+    )
+    assert MarkdownSerializer(incremental=True).serialize(log) == MarkdownSerializer().serialize(log)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "```python\nprint('closed')\n````",
+        "<!--\nthinking\n```\n-->",
+        "<!-- Skipped content of type image -->",
+        "Inline ``` `code` ``` and <!-- comments --> are fine",
+    ],
+)
+def test_is_self_contained(content):
+    from commonplace._import._serializer import _is_self_contained
+
+    assert _is_self_contained(content)
+
+
 def test_import_preserves_user_metadata(test_repo, tmp_path_factory):
     """Test that re-importing preserves user-added metadata."""
     from commonplace._import._commands import import_
@@ -154,3 +228,530 @@ def test_import_cli_no_index_flag(test_app, index_spy, claude_export):
     result = test_app(["import", "--no-index", str(claude_export)])
     assert result == 0
     assert len(index_spy) == 0
+
+
+@pytest.fixture
+def export_dir(tmp_path_factory):
+    """A directory holding several exports, one of them broken."""
+    export_dir = tmp_path_factory.mktemp("exports")
+    _prepare_export(SAMPLE_EXPORTS_DIR / "claude.zip", export_dir)
+    shutil.copy(SAMPLE_EXPORTS_DIR / "claude-code.jsonl", export_dir / "session.jsonl")
+    (export_dir / "README.txt").write_text("Not an export")
+
+    broken = export_dir / "broken" / "claude"
+    broken.mkdir(parents=True)
+    (broken / "conversations.json").write_text("{not json")
+    (broken / "users.json").write_text("[]")
+    shutil.make_archive(str(broken), "zip", broken)
+    shutil.rmtree(broken)
+    return export_dir
+
+
+def test_import_directory_single_commit(test_repo, index_spy, export_dir):
+    """Importing a directory makes one commit and indexes once."""
+    head_before = test_repo.git.head.target
+    result = import_(export_dir, test_repo, user="Human", auto_index=True)
+
+    assert result is not None
+    assert sorted(p.name for p in result.imported) == ["claude.zip", "session.jsonl"]
+    assert [p.name for p in result.skipped] == ["README.txt"]
+    assert [p.name for p in result.failed] == ["claude.zip"]
+
+    head = test_repo.git.head.peel()
+    assert head.parents[0].id == head_before
+    assert "Import 2 files" in head.message
+    assert len(index_spy) == 1
+
+
+def test_import_directory_parallel_matches_serial(test_repo, export_dir, tmp_path):
+    """Parallel parsing produces the same notes as serial parsing."""
+    from commonplace._repo import Commonplace
+
+    import_(export_dir, test_repo, user="Human", auto_index=False)
+
+    parallel_root = tmp_path / "parallel"
+    parallel_root.mkdir()
+    Commonplace.init(parallel_root)
+    parallel_repo = Commonplace.open(parallel_root)
+    import_(export_dir, parallel_repo, user="Human", auto_index=False, workers=2)
+
+    serial_notes = {p.relative_to(test_repo.root): p.read_text() for p in (test_repo.root / "chats").rglob("*.md")}
+    parallel_notes = {p.relative_to(parallel_root): p.read_text() for p in (parallel_root / "chats").rglob("*.md")}
+    assert serial_notes
+    assert serial_notes == parallel_notes
+
+
+def test_parse_all_bounds_files_in_flight(monkeypatch, tmp_path):
+    """Parallel parsing only submits a few files ahead of those consumed."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from commonplace._import import _commands
+
+    submitted = []
+
+    class RecordingPool(ThreadPoolExecutor):
+        def __init__(self, max_workers, mp_context):
+            super().__init__(max_workers)
+
+        def submit(self, fn, *args):
+            submitted.append(args[0])
+            return super().submit(fn, *args)
+
+    monkeypatch.setattr(_commands, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(_commands, "_parse_safely", lambda path, cache: path)
+    paths = [tmp_path / f"{i}.json" for i in range(20)]
+
+    parsed = _commands._parse_all(paths, tmp_path, workers=2)
+    assert next(parsed) == paths[0]
+    assert len(submitted) == 4
+    assert list(parsed) == paths[1:]
+
+
+@pytest.mark.parametrize(
+    "name,source",
+    [
+        ("chatgpt.zip", "chatgpt"),
+        ("claude.zip", "claude"),
+        ("claude-code.jsonl", "claude-code"),
+        ("gemini.zip", "gemini"),
+    ],
+)
+def test_autodetect_importer(name, source, tmp_path):
+    """Each sample export is claimed by the right importer."""
+    path = _prepare_export(SAMPLE_EXPORTS_DIR / name, tmp_path)
+    importer = autodetect_importer(path)
+    assert importer is not None
+    assert importer.source == source
+
+
+def test_probe_file_rejects_unrelated_files(tmp_path):
+    """Files that are neither archives nor known text exports aren't read."""
+    path = tmp_path / "notes.txt"
+    path.write_text('{"type": "user", "sessionId": "abc"}\n')
+    assert probe_file(path) is None
+    assert autodetect_importer(path) is None
+
+
+def test_probe_file_reads_zip_names(tmp_path):
+    """Zip archives are recognised by magic bytes regardless of extension."""
+    archive = Path(shutil.make_archive(str(tmp_path / "export"), "zip", SAMPLE_EXPORTS_DIR / "claude.zip"))
+    renamed = archive.rename(tmp_path / "export.bin")
+
+    probe = probe_file(renamed)
+    assert probe is not None
+    assert probe.is_zip
+    assert probe.names == {"conversations.json", "users.json"}
+
+
+def test_probe_file_truncated_head(tmp_path):
+    """Claude Code sessions are still detected when the head is cut mid-line."""
+    path = tmp_path / "session.jsonl"
+    shutil.copy(SAMPLE_EXPORTS_DIR / "claude-code.jsonl", path)
+
+    probe = probe_file(path, head_size=2048)
+    assert probe is not None
+    assert not probe.complete
+    assert autodetect_importer(path) is not None
+
+
+def test_probe_file_oversized_first_record(tmp_path):
+    """Claude Code sessions are detected when the first record is larger than the head."""
+    path = tmp_path / "session.jsonl"
+    with open(path, "w") as fp:
+        for line in (SAMPLE_EXPORTS_DIR / "claude-code.jsonl").read_text().splitlines(keepends=True):
+            record = json.loads(line)
+            if record["type"] == "user":
+                record["padding"] = "x" * PROBE_HEAD_SIZE
+                fp.write(json.dumps(record) + "\n")
+                break
+
+    probe = probe_file(path)
+    assert probe is not None
+    assert not probe.complete
+    assert b"\n" not in probe.head
+    importer = autodetect_importer(path)
+    assert importer is not None
+    assert importer.source == "claude-code"
+
+
+def test_gemini_streaming_parse_in_parallel(tmp_path):
+    """Converting cells across worker processes matches the serial result."""
+    from commonplace._import._gemini import GeminiImporter
+
+    path = _prepare_export(SAMPLE_EXPORTS_DIR / "gemini.zip", tmp_path)
+
+    serial = GeminiImporter().import_(path)
+    parallel = GeminiImporter(workers=2).import_(path)
+
+    assert len(serial) > 0
+    assert [log.model_dump() for log in serial] == [log.model_dump() for log in parallel]
+
+
+def test_gemini_iter_content_cells_skips_captions():
+    """Only conversation cells are yielded, not the caption cells beside them."""
+    import io
+
+    from commonplace._import._gemini import _iter_content_cells
+
+    html = b"""<html><body>
+    <div class="outer-cell"><div class="mdl-grid">
+      <div class="header-cell"><p>Gemini Apps</p></div>
+      <div class="content-cell">Prompted Hi<br>8 Jun 2025, 13:37:50 BST<p>Hello</p></div>
+      <div class="content-cell mdl-typography--caption"><b>Products:</b> Gemini Apps</div>
+    </div></div>
+    </body></html>"""
+
+    cells = list(_iter_content_cells(io.BytesIO(html)))
+    assert len(cells) == 1
+    assert "Prompted Hi" in cells[0]
+    assert "Products" not in cells[0]
+
+
+@pytest.mark.parametrize(
+    "timestamp",
+    [
+        "18 Sept 2024, 00:12:50 BST",
+        "8 Jun 2025, 13:37:50 BST",
+        "1 Jan 2024, 09:00:00 GMT",
+        "30 September 2023, 23:59:59 BST",
+        "5 Mar 2024, 10:00:00 UTC",
+    ],
+)
+def test_gemini_timestamp_fast_path_matches_dateutil(timestamp):
+    """The fast path agrees with fuzzy dateutil parsing on Takeout formats."""
+    from datetime import timezone
+
+    from dateutil import parser
+    from dateutil.tz import gettz
+
+    from commonplace._import._gemini import _parse_takeout_timestamp
+
+    expected = parser.parse(timestamp, fuzzy=True, tzinfos={"BST": gettz("Europe/London")})
+    assert _parse_takeout_timestamp(timestamp) == expected.astimezone(timezone.utc)
+
+
+def test_gemini_timestamp_zone_abbreviations():
+    """Abbreviations are resolved to their UTC offsets."""
+    from datetime import datetime, timezone
+
+    from commonplace._import._gemini import _parse_takeout_timestamp
+
+    assert _parse_takeout_timestamp("4 Jul 2024, 12:00:00 PDT") == datetime(2024, 7, 4, 19, tzinfo=timezone.utc)
+    assert _parse_takeout_timestamp("4 Jan 2024, 12:00:00 CET") == datetime(2024, 1, 4, 11, tzinfo=timezone.utc)
+
+
+def test_gemini_timestamp_ambiguous_zone_falls_back():
+    """Ambiguous abbreviations are left to dateutil rather than guessed."""
+    from commonplace._import._gemini import _parse_takeout_timestamp
+
+    assert _parse_takeout_timestamp("4 Jan 2024, 12:00:00 CST") is None
+
+
+def test_gemini_timestamp_falls_back_to_dateutil():
+    """Unknown formats miss the fast path but still parse."""
+    from datetime import datetime, timezone
+
+    from commonplace._import._gemini import GeminiImporter, _parse_takeout_timestamp
+
+    timestamp = "2024-09-18T00:12:50Z"
+    assert _parse_takeout_timestamp(timestamp) is None
+    assert GeminiImporter()._parse_timestamp(timestamp) == datetime(2024, 9, 18, 0, 12, 50, tzinfo=timezone.utc)
+
+
+def test_gemini_timestamp_benchmark():
+    """Micro-benchmark: the fast path should comfortably beat fuzzy parsing."""
+    import timeit
+    from datetime import timezone
+
+    from dateutil import parser
+    from dateutil.tz import gettz
+
+    from commonplace._import._gemini import _parse_takeout_timestamp
+
+    timestamp = "18 Sept 2024, 00:12:50 BST"
+    tzinfos = {"BST": gettz("Europe/London")}
+    n = 2000
+
+    # Best of several runs, and a wide margin (the fast path is typically
+    # 20x quicker), so that a busy machine doesn't make this flaky
+    fast = min(timeit.repeat(lambda: _parse_takeout_timestamp(timestamp), number=n, repeat=5))
+    slow = min(
+        timeit.repeat(
+            lambda: parser.parse(timestamp, fuzzy=True, tzinfos=tzinfos).astimezone(timezone.utc), number=n, repeat=5
+        )
+    )
+    assert fast * 3 < slow
+
+
+def test_import_session_tallies_skipped_records(tmp_path, caplog):
+    """Bookkeeping records in a scaled-up session are tallied, not logged one by one."""
+    from commonplace._import._claude_code import ClaudeCodeImporter
+
+    session = tmp_path / "session.jsonl"
+    session.write_bytes((SAMPLE_EXPORTS_DIR / "claude-code.jsonl").read_bytes() * 100)
+
+    with caplog.at_level("DEBUG", logger="commonplace"):
+        ClaudeCodeImporter().import_(session)
+
+    skipped = [r.getMessage() for r in caplog.records if "Skipped non-message records" in r.getMessage()]
+    assert skipped == [f"Skipped non-message records in '{session}': 200 file-history-snapshot, 100 summary"]
+    assert not [r for r in caplog.records if r.levelname == "WARNING"]
+
+
+@pytest.fixture
+def session_lines():
+    return (SAMPLE_EXPORTS_DIR / "claude-code.jsonl").read_bytes().splitlines(keepends=True)
+
+
+def _session_note(repo):
+    from commonplace._utils import parse_frontmatter
+
+    (note_path,) = (repo.root / "chats" / "claude-code").rglob("*.md")
+    return parse_frontmatter(note_path.read_text())
+
+
+def test_import_session_tail(test_repo, session_lines, tmp_path):
+    """Re-importing a grown session parses only the new lines and stores only the new segment."""
+    from commonplace._import._claude_code import ClaudeCodeImporter
+    from commonplace._repo import Commonplace
+
+    session = tmp_path / "session.jsonl"
+    session.write_bytes(b"".join(session_lines[:10]))
+    import_(session, test_repo, user="Human", auto_index=False)
+
+    # Grow the session, and re-import
+    with open(session, "ab") as fp:
+        fp.writelines(session_lines[10:])
+
+    parsed = []
+    original = ClaudeCodeImporter._process_event
+
+    def spy(self, data, tool_calls):
+        parsed.append(data)
+        return original(self, data, tool_calls)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(ClaudeCodeImporter, "_process_event", spy)
+        import_(session, test_repo, user="Human", auto_index=False)
+    new_messages = [line for line in session_lines[10:] if json.loads(line)["type"] in ("user", "assistant")]
+    assert len(parsed) == len(new_messages)
+
+    metadata, body = _session_note(test_repo)
+    assert [Path(p).name for p in metadata["source_exports"]] == [
+        "session.jsonl",
+        f"session.{len(b''.join(session_lines[:10]))}-{session.stat().st_size}.jsonl",
+    ]
+
+    # The note matches a fresh import of the whole session
+    fresh_root = tmp_path / "fresh"
+    fresh_root.mkdir()
+    Commonplace.init(fresh_root)
+    fresh_repo = Commonplace.open(fresh_root)
+    import_(session, fresh_repo, user="Human", auto_index=False)
+    _, fresh_body = _session_note(fresh_repo)
+    assert body == fresh_body
+
+
+def test_import_session_unchanged_is_noop(test_repo, session_lines, tmp_path):
+    """Re-importing a session with no new lines makes no commit."""
+    session = tmp_path / "session.jsonl"
+    session.write_bytes(b"".join(session_lines))
+
+    import_(session, test_repo, user="Human", auto_index=False)
+    head = test_repo.git.head.target
+    import_(session, test_repo, user="Human", auto_index=False)
+    assert test_repo.git.head.target == head
+
+
+def test_import_session_restores_deleted_note(test_repo, session_lines, tmp_path):
+    """A session with no new lines is imported again if its note has been deleted."""
+    session = tmp_path / "session.jsonl"
+    session.write_bytes(b"".join(session_lines))
+    import_(session, test_repo, user="Human", auto_index=False)
+    (note_path,) = (test_repo.root / "chats" / "claude-code").rglob("*.md")
+    content = note_path.read_text()
+
+    note_path.unlink()
+    test_repo.git.index.remove(note_path.relative_to(test_repo.root).as_posix())
+    test_repo.commit("Delete note", auto_index=False)
+    import_(session, test_repo, user="Human", auto_index=False)
+
+    assert note_path.read_text() == content
+    metadata, _ = _session_note(test_repo)
+    assert [Path(p).name for p in metadata["source_exports"]] == ["session.jsonl"]
+
+
+def test_import_session_checkpoint_waits_for_commit(test_repo, session_lines, tmp_path, monkeypatch):
+    """A session is imported again if committing its notes failed."""
+    from commonplace._import._commands import _checkpoint_path
+
+    session = tmp_path / "session.jsonl"
+    session.write_bytes(b"".join(session_lines))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("Commit failed")
+
+    with monkeypatch.context() as mp:
+        mp.setattr(test_repo, "commit", fail)
+        with pytest.raises(RuntimeError):
+            import_(session, test_repo, user="Human", auto_index=False)
+    assert not _checkpoint_path(test_repo.cache, session).exists()
+
+    # Lose the staged notes, as if the process had exited
+    test_repo.git.index.read(force=True)
+    head = test_repo.git.head.target
+    import_(session, test_repo, user="Human", auto_index=False)
+
+    assert test_repo.git.head.target != head
+    assert _checkpoint_path(test_repo.cache, session).exists()
+    assert _session_note(test_repo)
+
+
+def test_import_session_rewritten(test_repo, session_lines, tmp_path):
+    """A session that no longer matches its checkpoint is read from the start."""
+    session = tmp_path / "session.jsonl"
+    session.write_bytes(b"".join(session_lines))
+    import_(session, test_repo, user="Human", auto_index=False)
+
+    session.write_bytes(b"".join(session_lines[:5]))
+    import_(session, test_repo, user="Human", auto_index=False)
+
+    metadata, _ = _session_note(test_repo)
+    assert [Path(p).name for p in metadata["source_exports"]] == ["session.jsonl"]
+
+
+def test_import_session_pending_tool_call(test_repo, tmp_path):
+    """A tool call awaiting its result is shown as pending, then replaced once the result arrives."""
+    from commonplace._import._claude_code import SessionCheckpoint
+    from commonplace._import._commands import _checkpoint_path
+    from commonplace._repo import Commonplace
+
+    session = _big_tool_session(tmp_path, "The file contents")
+    lines = session.read_bytes().splitlines(keepends=True)
+    session.write_bytes(b"".join(lines[:2]))
+    import_(session, test_repo, user="Human", auto_index=False)
+    _, body = _session_note(test_repo)
+    assert "PENDING" in body
+
+    session.write_bytes(b"".join(lines))
+    import_(session, test_repo, user="Human", auto_index=False)
+    _, body = _session_note(test_repo)
+    assert "PENDING" not in body
+    assert "The file contents" in body
+
+    # Only the unresolved tool calls are kept between imports
+    checkpoint = SessionCheckpoint.load(_checkpoint_path(test_repo.cache, session))
+    assert checkpoint and not checkpoint.tool_calls
+
+    fresh_root = tmp_path / "fresh"
+    fresh_root.mkdir()
+    Commonplace.init(fresh_root)
+    fresh_repo = Commonplace.open(fresh_root)
+    import_(session, fresh_repo, user="Human", auto_index=False)
+    _, fresh_body = _session_note(fresh_repo)
+    assert body == fresh_body
+
+
+def test_import_tail_leaves_partial_line(session_lines, tmp_path):
+    """A line that is still being written is left for the next import."""
+    from commonplace._import._claude_code import ClaudeCodeImporter
+
+    complete = b"".join(session_lines[:10])
+    session = tmp_path / "session.jsonl"
+    session.write_bytes(complete + session_lines[10][:20])
+
+    _, checkpoint = ClaudeCodeImporter().import_tail(session)
+    assert checkpoint.lines == 10
+    assert checkpoint.offset == len(complete)
+
+    session.write_bytes(b"".join(session_lines))
+    _, checkpoint = ClaudeCodeImporter().import_tail(session, checkpoint)
+    assert checkpoint.lines == len(session_lines)
+
+
+def _big_tool_session(tmp_path, output):
+    """Write a minimal Claude Code session with one tool call and its result."""
+    envelope = {"sessionId": "big-session", "cwd": "/tmp", "timestamp": "2025-10-01T19:55:52.996Z"}
+    records = [
+        {**envelope, "type": "user", "message": {"role": "user", "content": "Dump the file"}},
+        {
+            **envelope,
+            "type": "assistant",
+            "message": {"role": "assistant", "content": [{"type": "tool_use", "id": "toolu_1", "name": "Read"}]},
+        },
+        {
+            **envelope,
+            "type": "user",
+            "message": {
+                "role": "user",
+                "content": [{"type": "tool_result", "tool_use_id": "toolu_1", "content": output}],
+            },
+        },
+    ]
+    session = tmp_path / "session.jsonl"
+    session.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return session
+
+
+def test_offload_large_tool_output(test_repo, tmp_path):
+    """Tool outputs over the threshold are stored as blobs, leaving a link and preview."""
+    test_repo.config.blob_threshold = 1000
+    output = "".join(f"line {i}\n" for i in range(1000))
+    import_(_big_tool_session(tmp_path, output), test_repo, user="Human", auto_index=False)
+
+    (note,) = (test_repo.root / "chats").rglob("*.md")
+    content = note.read_text()
+    assert "line 0" in content
+    assert "line 999" not in content
+
+    (blob,) = (test_repo.root / ".commonplace" / "blobs").rglob("read-output.txt")
+    assert blob.read_text() == output
+    link = Path(os.path.relpath(blob, note.parent)).as_posix()
+    assert f"[read-output.txt]({link})" in content
+
+    # Payloads are never indexed, as they aren't notes
+    assert not [p for p in test_repo.note_paths() if ".commonplace" in p.path.parts]
+
+
+def test_offload_large_non_text_part(test_repo):
+    """Non-text parts marked by the importer (e.g. ChatGPT JSON) over the threshold are stored as blobs."""
+    from commonplace._import._commands import _store_logs
+    from commonplace._utils import fenced
+
+    test_repo.config.blob_threshold = 1000
+    payload = fenced(json.dumps({"note": "```", "image": "A" * 5000}, indent=2), "json")
+    small = fenced(json.dumps({"small": True}, indent=2), "json")
+    code = fenced("print('B')\n" * 500, "python")
+    log = EventLog(
+        source="chatgpt",
+        title="Attachments",
+        created=datetime(2024, 1, 1),
+        events=[
+            Message(
+                sender=Role.USER,
+                content=f"Look:\n{payload}\nand\n{small}\nand\n{code}",
+                payloads=[payload, small],
+                created=datetime(2024, 1, 1, 12),
+            )
+        ],
+    )
+    _store_logs([log], [], test_repo, user="Human", assistant="Assistant")
+
+    (note,) = (test_repo.root / "chats").rglob("*.md")
+    content = note.read_text()
+    assert "A" * 1000 not in content
+    assert '"small": true' in content
+    assert "print('B')\n" * 500 in content  # Not a payload, so kept
+    assert "Truncated json part:" in content
+    assert "````json\n{" in content  # The preview holds a fence, so needs a longer one
+    (blob,) = (test_repo.root / ".commonplace" / "blobs").rglob("part.json")
+    assert payload == fenced(blob.read_text(), "json")
+
+
+def test_offload_disabled(test_repo, tmp_path):
+    test_repo.config.blob_threshold = 0
+    output = "x" * 100_000
+    import_(_big_tool_session(tmp_path, output), test_repo, user="Human", auto_index=False)
+
+    (note,) = (test_repo.root / "chats").rglob("*.md")
+    assert output in note.read_text()
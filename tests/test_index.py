@@ -129,3 +129,106 @@ More content.
     _commands.index(test_repo)
     indexed_paths = set(test_repo.index.get_indexed_paths())
     assert len(indexed_paths) == 2
+
+
+def test_commit_queues_background_indexing(test_repo, make_note, monkeypatch):
+    """In background mode, commit queues changed notes and returns without indexing them."""
+    from commonplace._search import _queue
+    from commonplace._search._queue import IndexQueue
+
+    spawned = []
+    monkeypatch.setattr(_queue, "spawn_worker", spawned.append)
+    test_repo.config.index_in_background = True
+
+    test_repo.save(make_note(path="notes/queued.md", content="# Queued\n\nSome content.\n"))
+    test_repo.save(make_note(path="data.txt", content="Not a note"))
+    test_repo.commit("Add note", auto_index=True)
+
+    queue = IndexQueue(test_repo)
+    assert spawned == [test_repo]
+    assert queue.pending() == {"notes/queued.md"}
+    assert not list(test_repo.index.get_indexed_paths())
+
+    # What the background worker does
+    assert queue.drain() == 1
+    assert queue.pending() == set()
+    assert set(test_repo.index.get_indexed_paths()) == {test_repo.make_repo_path("notes/queued.md")}
+
+
+def test_drain_defers_to_running_worker(test_repo):
+    from commonplace._search._queue import IndexQueue
+
+    queue = IndexQueue(test_repo)
+    queue.push(["note.md"])
+    with IndexQueue(test_repo)._lock() as acquired:
+        assert acquired
+        assert queue.drain() == 0
+    assert queue.pending() == {"note.md"}
+
+
+def test_search_warns_about_queued_notes(test_repo, test_app, caplog):
+    from commonplace._search._queue import IndexQueue
+
+    IndexQueue(test_repo).push(["a.md", "b.md"])
+    test_app(["search", "anything"])
+    assert "2 changed notes are still being indexed" in caplog.text
+
+
+def test_index_snapshot_round_trip(tmp_path, test_repo, make_note, monkeypatch):
+    """A machine with the same commits imports a snapshot and only embeds what it doesn't cover."""
+    from contextlib import closing
+
+    from pygit2 import clone_repository
+
+    from commonplace._repo import Commonplace
+
+    test_repo.save(make_note(path="shared.md", content="# Shared\n\nEmbedded once.\n"))
+    test_repo.commit("Add shared note", auto_index=False)
+    test_repo.save(make_note(path="later.md", content="# Later\n\nAlso embedded once.\n"))
+    test_repo.commit("Add later note", auto_index=False)
+    _commands.index(test_repo)
+    # Uncommitted changes are local, so aren't exported
+    test_repo.save(make_note(path="shared.md", content="# Shared\n\nUncommitted edit.\n"))
+    _commands.index(test_repo)
+    snapshot = tmp_path / "index.snapshot"
+    _commands.export_index(test_repo, snapshot)
+
+    clone_repository(test_repo.root.as_posix(), (tmp_path / "other").as_posix())
+    with closing(Commonplace.open(tmp_path / "other")) as other:
+        other.save(make_note(path="local.md", content="# Local\n\nOnly here.\n"))
+        other.commit("Add local note", auto_index=False)
+        embedded: list[str] = []
+        embed_docs = other.index._embedder.embed_docs
+        monkeypatch.setattr(
+            other.index._embedder, "embed_docs", lambda texts: embedded.extend(texts) or embed_docs(texts)
+        )
+
+        _commands.import_index(other, snapshot)
+
+        assert set(other.index.get_indexed_paths()) == set(other.note_paths())
+        assert embedded and all("Only here" in text for text in embedded)
+        hits = other.index.search_keyword("uncommitted")
+        assert not hits
+
+
+def test_import_invalid_snapshot(tmp_path, test_repo):
+    import pytest
+
+    snapshot = tmp_path / "index.snapshot"
+    snapshot.write_text("Not a database")
+    with pytest.raises(ValueError, match="not a valid index snapshot"):
+        test_repo.index.import_snapshot(snapshot)
+    with pytest.raises(ValueError, match="not found"):
+        test_repo.index.import_snapshot(tmp_path / "missing.snapshot")
+
+
+def test_index_export_command(tmp_path, test_repo, test_app, make_note):
+    test_repo.save(make_note(path="note.md", content="# Note\n\nSome content.\n"))
+    test_repo.commit("Add note", auto_index=False)
+    _commands.index(test_repo)
+    snapshot = tmp_path / "index.snapshot"
+
+    assert test_app(["index", "export", str(snapshot)]) == 0
+    test_repo.index.clear()
+    assert test_app(["index", "import", str(snapshot), "--no-reindex"]) == 0
+    assert set(test_repo.index.get_indexed_paths()) == {test_repo.make_repo_path("note.md")}
@@ -0,0 +1,168 @@
+"""Tests for the MCP server."""
+
+import io
+import json
+import sys
+
+import pytest
+
+from commonplace import _mcp
+from commonplace._logging import logger
+from commonplace._mcp import MCPServer
+from commonplace._search import _commands
+
+TOPICS = ["cats and kittens", "baking sourdough bread", "sailing small boats"]
+
+
+@pytest.fixture
+def notes_repo(test_repo, make_note):
+    for i, topic in enumerate(TOPICS):
+        test_repo.save(make_note(f"note{i}.md", f"# Note {i}\n\nSome thoughts about {topic}.\n"))
+    test_repo.commit("Add notes")
+    _commands.index(test_repo)
+    return test_repo
+
+
+def converse(repo, *messages):
+    """Send messages to a server, returning its responses by id."""
+    input = io.StringIO("".join(json.dumps(message) + "\n" for message in messages))
+    output = io.StringIO()
+    MCPServer(repo, input, output).serve_forever()
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+    return {response["id"]: response for response in responses}
+
+
+def call(id, name, **arguments):
+    return {"jsonrpc": "2.0", "id": id, "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+
+
+def test_initialize_and_list_tools(notes_repo):
+    responses = converse(
+        notes_repo,
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {"protocolVersion": "2025-03-26"}},
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+        {"jsonrpc": "2.0", "id": 3, "method": "ping"},
+    )
+
+    assert responses[1]["result"]["protocolVersion"] == "2025-03-26"
+    assert responses[1]["result"]["capabilities"] == {"tools": {}}
+    assert [tool["name"] for tool in responses[2]["result"]["tools"]] == [
+        "search",
+        "search_batch",
+        "read_note",
+        "stats",
+    ]
+    assert responses[3]["result"] == {}
+    assert len(responses) == 3
+
+
+def test_tools(notes_repo):
+    head = str(notes_repo.git.head.target)
+
+    responses = converse(
+        notes_repo,
+        call(1, "search", query="bread", limit=1),
+        call(2, "search_batch", queries=TOPICS, limit=1, method="semantic"),
+        call(3, "read_note", path="note1.md", ref=head[:7]),
+        call(4, "stats"),
+    )
+    results = {id: json.loads(response["result"]["content"][0]["text"]) for id, response in responses.items()}
+
+    assert not any(response["result"]["isError"] for response in responses.values())
+    assert results[1]["hits"][0]["path"] == "note1.md"
+    assert [hits[0]["path"] for hits in results[2]["results"]] == ["note0.md", "note1.md", "note2.md"]
+    assert results[3] == {
+        "path": "note1.md",
+        "ref": head,
+        "content": "# Note 1\n\nSome thoughts about baking sourdough bread.\n",
+    }
+    assert results[4] == {"notes": {"misc": 3}, "chunks": {"misc": 3}}
+
+
+@pytest.mark.parametrize(
+    "message, error",
+    [
+        (call(1, "search"), "'query' must be a str"),
+        (call(1, "search", query="x", colour="red"), "Invalid arguments for search"),
+        (call(1, "read_note", path="missing.md"), "No such note"),
+    ],
+)
+def test_tool_errors(notes_repo, message, error):
+    result = converse(notes_repo, message)[1]["result"]
+
+    assert result["isError"]
+    assert error in result["content"][0]["text"]
+
+
+def test_protocol_errors(notes_repo):
+    input = io.StringIO(
+        "not json\n"
+        + json.dumps({"jsonrpc": "2.0", "id": 1, "method": "resources/list"})
+        + "\n"
+        + json.dumps(call(2, "telepathy"))
+        + "\n"
+    )
+    output = io.StringIO()
+    MCPServer(notes_repo, input, output).serve_forever()
+    responses = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [(response["id"], response["error"]["code"]) for response in responses] == [
+        (None, -32700),
+        (1, -32601),
+        (2, -32602),
+    ]
+
+
+def test_params_must_be_objects(notes_repo):
+    responses = converse(
+        notes_repo,
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": [1]},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/call", "params": {"name": "search", "arguments": ["bread"]}},
+        {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {"name": ["search"]}},
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": "oops"},
+        {"jsonrpc": "2.0", "id": 4, "method": "ping"},
+    )
+
+    assert {id: response["error"]["code"] for id, response in responses.items() if "error" in response} == {
+        1: -32602,
+        2: -32602,
+        3: -32602,
+    }
+    assert responses[4]["result"] == {}
+
+
+def test_unexpected_errors_are_reported(notes_repo, monkeypatch):
+    """A request that fails unexpectedly still gets a response, and later ones are handled."""
+
+    def fail(self, message):
+        if message.get("id") == 1:
+            raise RuntimeError("Boom")
+        return original(self, message)
+
+    original = MCPServer.handle
+    monkeypatch.setattr(MCPServer, "handle", fail)
+    responses = converse(notes_repo, call(1, "stats"), {"jsonrpc": "2.0", "id": 2, "method": "ping"})
+
+    assert responses[1]["error"]["code"] == -32603
+    assert "Boom" in responses[1]["error"]["message"]
+    assert responses[2]["result"] == {}
+
+
+def test_serve_keeps_stdout_for_protocol(notes_repo, monkeypatch):
+    stdin = io.TextIOWrapper(io.BytesIO((json.dumps(call(1, "stats")) + "\n").encode()))
+    stdout = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, "stdin", stdin)
+    monkeypatch.setattr(sys, "stdout", stdout)
+
+    def warm(self):
+        print("Loading...")
+        logger.warning("Logged while serving")
+
+    monkeypatch.setattr(MCPServer, "_warm", warm)
+
+    _mcp.serve(notes_repo)
+
+    lines = stdout.buffer.getvalue().decode().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["id"] == 1
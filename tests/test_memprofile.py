@@ -0,0 +1,97 @@
+"""Tests for memory profiling by pipeline stage."""
+
+from pathlib import Path
+
+from commonplace import _memprofile
+from commonplace._import._commands import import_
+from commonplace._search import _commands
+
+SAMPLE_SESSION = Path(__file__).parent / "resources" / "sample-exports" / "claude-code.jsonl"
+MiB = 1024 * 1024
+
+
+def test_stage_is_free_when_not_profiling():
+    with _memprofile.stage("anything"):
+        pass
+    assert _memprofile._profile is None
+
+
+def test_nested_stages_credit_their_peak_to_enclosing_stages():
+    with _memprofile.profile() as memory:
+        with _memprofile.stage("outer"):
+            with _memprofile.stage("inner"):
+                data = bytearray(4 * MiB)
+                del data
+            small = bytearray(1024)
+            del small
+
+    inner, outer = memory.stages["inner"], memory.stages["outer"]
+    assert inner.peak_bytes >= 4 * MiB
+    assert outer.peak_bytes >= inner.peak_bytes
+    assert memory.stages["total"].peak_bytes >= outer.peak_bytes
+    assert memory.peak_stage == "inner"
+    assert memory.top_sites
+
+
+def test_snapshots_taken_as_peak_doubles(monkeypatch):
+    """Growing stages don't each take a (slow) snapshot."""
+    import tracemalloc
+
+    snapshots = []
+    take_snapshot = tracemalloc.take_snapshot
+    monkeypatch.setattr(tracemalloc, "take_snapshot", lambda: snapshots.append(1) or take_snapshot())
+
+    held = []
+    with _memprofile.profile() as memory:
+        for _ in range(16):
+            with _memprofile.stage("grow"):
+                held.append(bytearray(MiB))
+
+    # One at the end, and one for each doubling of the peak (about 1, 2, 4, 8 and 16 MiB)
+    assert len(snapshots) <= 6
+    assert memory.stages["grow"].calls == 16
+    assert memory.top_sites and memory.peak_sites
+
+
+def test_peak_sites_include_allocations_freed_before_the_end():
+    with _memprofile.profile() as memory:
+        with _memprofile.stage("spike"):
+            spike = bytearray(8 * MiB)
+        del spike
+
+    assert memory.peak_sites[0][1] >= 8 * MiB
+    assert all(size < 8 * MiB for _, size, _ in memory.top_sites)
+
+
+def test_stages_in_threads():
+    """Each thread has its own stack of running stages."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def work(_):
+        with _memprofile.stage("outer"):
+            with _memprofile.stage("inner"):
+                pass
+
+    with _memprofile.profile() as memory:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(work, range(100)))
+
+    assert memory.stages["outer"].calls == memory.stages["inner"].calls == 100
+
+
+def test_profile_import_and_index(test_repo):
+    """Benchmark memory ceilings for importing and indexing a Claude Code session."""
+    with _memprofile.profile() as memory:
+        import_(SAMPLE_SESSION, test_repo, user="Human", auto_index=False)
+        _commands.index(test_repo)
+        test_repo.index.search_semantic("anything")
+
+    assert {"parse", "serialize", "chunk", "embed", "search load"} <= set(memory.stages)
+    for name, ceiling in [("parse", 64 * MiB), ("serialize", 32 * MiB), ("chunk", 16 * MiB), ("embed", 64 * MiB)]:
+        assert memory.stages[name].peak_bytes < ceiling, name
+
+
+def test_memprofile_option(test_repo, test_app, capsys):
+    assert test_app(["--memprofile", "search", "anything"]) == 0
+    err = capsys.readouterr().err
+    assert "Memory" in err and "search load" in err and "Top allocation sites" in err
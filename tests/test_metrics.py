@@ -0,0 +1,51 @@
+"""Tests for metrics export."""
+
+import json
+
+from commonplace import _metrics
+from commonplace._search import _commands
+
+
+def test_metrics_written_after_commands(test_repo, test_app, make_note, monkeypatch):
+    monkeypatch.setenv("COMMONPLACE_METRICS", "true")
+    test_repo.save(make_note(path="notes/a.md", content="# A\n\nSome content.\n"))
+    test_repo.commit("Add note", auto_index=False)
+
+    assert test_app(["index"]) == 0
+    assert test_app(["search", "content"]) == 0
+
+    metrics = json.loads((test_repo.cache / _metrics.JSON_NAME).read_text())
+    index, search = metrics["commands"]["index"], metrics["commands"]["search"]
+    assert index["success"] and index["chunks_embedded"] == 1 and index["embed_seconds"] > 0
+    assert index["sqlite_write_seconds"] > 0
+    assert search["searches"] == 1 and search["chunks_embedded"] == 0
+    assert metrics["index"]["chunks"] == 1
+    assert metrics["index"]["stale_chunks"] == 0
+    assert metrics["index"]["last_commit"]["commit"] == str(test_repo.git.head.target)
+
+    prometheus = (test_repo.cache / _metrics.PROMETHEUS_NAME).read_text()
+    assert 'commonplace_command_chunks_embedded{command="index"} 1.0' in prometheus
+    assert "# TYPE commonplace_index_stale_chunks gauge" in prometheus
+    assert f'commonplace_index_last_commit_timestamp{{commit="{test_repo.git.head.target}"}}' in prometheus
+
+
+def test_metrics_disabled_by_default(test_repo, test_app):
+    assert test_app(["search", "content"]) == 0
+    assert not (test_repo.cache / _metrics.JSON_NAME).exists()
+
+
+def test_metrics_count_stale_chunks(test_repo, make_note):
+    test_repo.save(make_note(path="notes/a.md", content="# A\n\nSome content.\n"))
+    test_repo.save(make_note(path="notes/b.md", content="# B\n\nMore content.\n"))
+    test_repo.commit("Add notes", auto_index=False)
+    _commands.index(test_repo)
+    test_repo.save(make_note(path="notes/a.md", content="# A\n\nChanged.\n"))
+    test_repo.commit("Change note", auto_index=False)
+
+    _metrics.reset()
+    metrics = _metrics.write_metrics(test_repo, "test", success=False, duration=1.0)
+
+    assert metrics["index"]["chunks"] == 2
+    assert metrics["index"]["stale_chunks"] == 1
+    assert metrics["index"]["last_commit"] is None
+    assert metrics["commands"]["test"]["last_success_timestamp"] is None
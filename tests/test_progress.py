@@ -24,3 +24,41 @@ def test_checkpoint_quiet():
     with checkpoint(quiet=True) as steps:
         result = list(it.islice(steps, 10))
     assert result == list(range(10))
+
+
+def test_track_streams():
+    """Items are passed through as they arrive, rather than collected first."""
+    produced = []
+
+    def generate():
+        for i in range(5):
+            produced.append(i)
+            yield i
+
+    for i in track(generate()):
+        assert produced[-1] == i
+
+
+def test_track_logs_when_not_a_terminal(monkeypatch, caplog):
+    from commonplace import _progress
+
+    clock = it.count(step=1.0)
+    monkeypatch.setattr(_progress, "_is_terminal", lambda: False)
+    monkeypatch.setattr(_progress.time, "monotonic", lambda: next(clock))
+
+    with caplog.at_level("INFO", logger="commonplace"):
+        assert list(track(range(100), "Counting", log_every=10.0)) == list(range(100))
+
+    lines = [record.getMessage() for record in caplog.records]
+    assert 1 < len(lines) < 100
+    assert lines[0].startswith("Counting: ") and "/100 (" in lines[0]
+    assert lines[-1].startswith("Counting: 100/100 (100%) in ")
+
+
+def test_track_short_task_not_logged(monkeypatch, caplog):
+    from commonplace import _progress
+
+    monkeypatch.setattr(_progress, "_is_terminal", lambda: False)
+    with caplog.at_level("INFO", logger="commonplace"):
+        assert list(track(iter(range(10)), "Quick")) == list(range(10))
+    assert not caplog.records
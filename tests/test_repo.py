@@ -240,3 +240,156 @@ def test_commit_no_changes_skips_indexing(test_repo, monkeypatch):
 
     # Verify index was NOT called (no changes means no commit means no index)
     assert len(index_called) == 0
+
+
+def test_note_paths(test_repo):
+    """Notes are listed from the index and status, with the same refs as make_repo_path."""
+
+    def write(name, content):
+        path = test_repo.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    for name in ["clean.md", "modified.md", "deleted.md", "sub/dir/nested.md", "data.txt"]:
+        test_repo.save(Note(repo_path=RepoPath(path=Path(name), ref=""), content=f"# {name}"))
+    test_repo.commit("Initial notes")
+    first_commit = str(test_repo.git.head.target)
+    test_repo.save(Note(repo_path=RepoPath(path=Path("later.md"), ref=""), content="# Later"))
+    test_repo.commit("Later note")
+
+    write("modified.md", "# Changed")
+    (test_repo.root / "deleted.md").unlink()
+    test_repo.save(Note(repo_path=RepoPath(path=Path("staged.md"), ref=""), content="# Staged"))
+    write("untracked.md", "# Untracked")
+    write(".commonplace/cache/ignored.md", "# Ignored")
+
+    paths = list(test_repo.note_paths())
+
+    assert [p.path.as_posix() for p in paths] == [
+        "clean.md",
+        "later.md",
+        "modified.md",
+        "staged.md",
+        "sub/dir/nested.md",
+        "untracked.md",
+    ]
+    assert paths == [test_repo.make_repo_path(p.path) for p in paths]
+    refs = {p.path.as_posix(): p.ref for p in paths}
+    assert refs["clean.md"] == first_commit
+    assert refs["modified.md"] == str(test_repo.git.head.target)
+
+
+def _save(repo, name, content):
+    repo.save(Note(repo_path=RepoPath(path=Path(name), ref=""), content=content))
+
+
+def _path_map(repo):
+    from commonplace._repo import Commonplace
+
+    return Commonplace._build_path_commit_map(repo.git.workdir, str(repo.git.head.target))
+
+
+def test_path_commit_map_is_updated_incrementally(test_repo, monkeypatch):
+    from commonplace import _repo
+    from commonplace._repo import _full_path_commit_map
+
+    _save(test_repo, "a.md", "# A")
+    _save(test_repo, "b.md", "# B")
+    test_repo.commit("First")
+    first = str(test_repo.git.head.target)
+    assert _path_map(test_repo)["b.md"] == first
+
+    (test_repo.root / "a.md").unlink()
+    test_repo.git.index.remove("a.md")
+    _save(test_repo, "b.md", "# B changed")
+    _save(test_repo, "c.md", "# C")
+    test_repo.commit("Second")
+    second = str(test_repo.git.head.target)
+
+    # Only the new commit is diffed, and the result matches a full rebuild
+    def fail(*args):
+        raise AssertionError("Rebuilt the map from scratch")
+
+    monkeypatch.setattr(_repo, "_full_path_commit_map", fail)
+    path_map = _path_map(test_repo)
+    assert path_map == _full_path_commit_map(test_repo.git, second)
+    assert "a.md" not in path_map
+    assert path_map["b.md"] == second
+    assert path_map["c.md"] == second
+
+
+def test_path_commit_map_is_persisted(test_repo, monkeypatch):
+    from commonplace import _repo
+    from commonplace._repo import Commonplace
+
+    _save(test_repo, "a.md", "# A")
+    test_repo.commit("First")
+    expected = _path_map(test_repo)
+    assert (test_repo.cache / "path-commits.json").exists()
+
+    # A new process starts with an empty in-memory cache
+    Commonplace._build_path_commit_map.cache_clear()
+    monkeypatch.setattr(_repo, "_update_path_commit_map", None)
+    monkeypatch.setattr(_repo, "_full_path_commit_map", None)
+    assert _path_map(test_repo) == expected
+
+
+def test_path_commit_map_rebuilt_after_rewrite(test_repo):
+    from pygit2.enums import ResetMode
+
+    from commonplace._repo import _full_path_commit_map
+
+    _save(test_repo, "a.md", "# A")
+    test_repo.commit("First")
+    first = test_repo.git.head.target
+    _save(test_repo, "b.md", "# B")
+    test_repo.commit("Second")
+    _path_map(test_repo)
+
+    # Rewrite history: replace the second commit with a different one
+    test_repo.git.reset(first, ResetMode.HARD)
+    _save(test_repo, "c.md", "# C")
+    test_repo.commit("Second, rewritten")
+    head = str(test_repo.git.head.target)
+
+    path_map = _path_map(test_repo)
+    assert path_map == _full_path_commit_map(test_repo.git, head)
+    assert "b.md" not in path_map
+    assert path_map["c.md"] == head
+
+
+def test_get_note_reads_from_ref(test_repo):
+    """Notes are read as they were at their ref, not from the worktree."""
+    _save(test_repo, "note.md", "# Original")
+    test_repo.commit("First")
+    old = test_repo.make_repo_path("note.md")
+
+    _save(test_repo, "note.md", "# Changed")
+    test_repo.commit("Second")
+    new = test_repo.make_repo_path("note.md")
+
+    assert test_repo.get_note(new).content == "# Changed"
+
+    # The worktree has moved on, but the old version is still available
+    (test_repo.root / "note.md").write_text("# Uncommitted")
+    assert test_repo.get_note(old).content == "# Original"
+
+    # Uncommitted changes are at HEAD, and come from the worktree
+    dirty = test_repo.make_repo_path("note.md")
+    assert dirty.ref == new.ref
+    assert test_repo.get_note(dirty).content == "# Uncommitted"
+
+
+def test_get_notes_in_bulk(test_repo):
+    for name in ["a.md", "b.md", "c.md"]:
+        _save(test_repo, name, "# Same content")
+    test_repo.commit("Notes")
+    _save(test_repo, "new.md", "# New")
+
+    paths = list(test_repo.note_paths())
+    notes = list(test_repo.get_notes(paths))
+
+    assert [note.repo_path for note in notes] == paths
+    assert [note.content for note in notes] == ["# Same content"] * 3 + ["# New"]
+    # Identical content is one blob, read once
+    assert test_repo._read_blob.cache_info().misses == 1
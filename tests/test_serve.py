@@ -0,0 +1,217 @@
+"""Tests for the HTTP search server."""
+
+import http.client
+import json
+import socket
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from commonplace._search import _commands
+from commonplace._serve import SearchServer
+
+TOPICS = ["cats and kittens", "baking sourdough bread", "sailing small boats"]
+
+
+@pytest.fixture
+def notes_repo(test_repo, make_note):
+    for i, topic in enumerate(TOPICS):
+        test_repo.save(make_note(f"chats/note{i}.md", f"# Note {i}\n\nSome thoughts about {topic}.\n"))
+    test_repo.commit("Add notes")
+    _commands.index(test_repo)
+    return test_repo
+
+
+def _run(server):
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def server(notes_repo):
+    server = SearchServer(notes_repo, port=0, workers=4)
+    thread = _run(server)
+    yield server
+    server.shutdown()
+    thread.join()
+
+
+def request(server, method, path, body=None):
+    host, port = server.address.removeprefix("http://").split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=10)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_search(server, notes_repo):
+    status, content = request(server, "POST", "/search", {"query": "bread", "limit": 2})
+
+    assert status == 200
+    expected = notes_repo.index.search("bread", limit=2)
+    assert [(hit["path"], hit["offset"], hit["score"]) for hit in content["hits"]] == [
+        (hit.chunk.repo_path.path.as_posix(), hit.chunk.offset, hit.score) for hit in expected
+    ]
+
+
+def test_search_batch(server, notes_repo):
+    status, content = request(server, "POST", "/search/batch", {"queries": TOPICS, "limit": 1, "method": "semantic"})
+
+    assert status == 200
+    assert [hits[0]["path"] for hits in content["results"]] == [f"chats/note{i}.md" for i in range(len(TOPICS))]
+
+
+@pytest.mark.parametrize(
+    "body, message",
+    [
+        ({}, "'query' must be a str"),
+        ({"query": "x", "limit": 0}, "'limit' must be a positive integer"),
+        ({"query": "x", "method": "telepathy"}, "'method' must be one of"),
+    ],
+)
+def test_bad_search(server, body, message):
+    status, content = request(server, "POST", "/search", body)
+
+    assert status == 400
+    assert message in content["error"]
+
+
+def test_note(server, notes_repo, make_note):
+    first = str(notes_repo.git.head.target)
+    notes_repo.save(make_note("chats/note0.md", "# Changed\n"))
+    notes_repo.commit("Change note", auto_index=False)
+
+    status, content = request(server, "GET", "/notes/chats/note0.md")
+    assert status == 200
+    assert content["content"] == "# Changed\n"
+
+    status, content = request(server, "GET", f"/notes/chats/note0.md?ref={first[:8]}")
+    assert status == 200
+    assert content["ref"] == first
+    assert "cats and kittens" in content["content"]
+
+    assert request(server, "GET", "/notes/chats/missing.md")[0] == 404
+    assert request(server, "GET", "/notes/chats/note0.md?ref=nonsense")[0] == 404
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "../secrets.md",
+        "chats/../../secrets.md",
+        "/etc/passwd",
+        ".git/config",
+        ".git/HEAD",
+        ".commonplace/cache/index.db",
+        ".commonplace/config.toml",
+        ".gitignore",
+        "chats",
+    ],
+)
+def test_note_rejects_non_notes(server, notes_repo, path):
+    (notes_repo.root.parent / "secrets.md").write_text("# Secret\n")
+    for url in (f"/notes/{path}", f"/notes/{path}?ref=HEAD"):
+        status, content = request(server, "GET", url)
+        assert status == 404, url
+        assert "No such note" in content["error"]
+
+
+def test_note_rejects_symlink_out_of_repo(server, notes_repo, tmp_path):
+    secret = tmp_path / "secret.md"
+    secret.write_text("# Secret\n")
+    (notes_repo.root / "chats" / "link.md").symlink_to(secret)
+
+    assert request(server, "GET", "/notes/chats/link.md")[0] == 404
+
+
+def test_note_normalizes_path(server):
+    status, content = request(server, "GET", "/notes/chats/../chats/note1.md")
+    assert status == 200
+    assert content["path"] == "chats/note1.md"
+
+
+def test_stats_and_metrics(server):
+    sources = {f"chats/note{i}.md": 1 for i in range(len(TOPICS))}
+    assert request(server, "GET", "/stats") == (200, {"notes": sources, "chunks": sources})
+    request(server, "GET", "/nowhere")
+
+    status, metrics = request(server, "GET", "/metrics")
+
+    assert status == 200
+    assert metrics["/stats"]["requests"] == 1
+    assert metrics["/stats"]["errors"] == 0
+    assert metrics["unknown"]["errors"] == 1
+    assert metrics["/stats"]["max_ms"] >= metrics["/stats"]["p50_ms"] > 0
+
+
+def test_concurrent_requests(server, notes_repo):
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        responses = list(pool.map(lambda i: request(server, "POST", "/search", {"query": TOPICS[i % 3]}), range(64)))
+
+    assert all(status == 200 and content["hits"] for status, content in responses)
+    assert request(server, "GET", "/metrics")[1]["/search"]["requests"] == 64
+
+
+def test_busy_workers_leave_connections_in_backlog(notes_repo, monkeypatch):
+    """Connections aren't accepted (and queued in memory) while every worker is busy."""
+    server = SearchServer(notes_repo, port=0, workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_stats():
+        started.set()
+        release.wait(10)
+        return {}
+
+    monkeypatch.setattr(server.api, "stats", slow_stats)
+    thread = _run(server)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            slow = pool.submit(request, server, "GET", "/stats")
+            assert started.wait(10)
+            health = pool.submit(request, server, "GET", "/health")
+            time.sleep(0.2)
+            assert not health.done()
+            assert server._server._pool._work_queue.empty()
+
+            release.set()
+            assert slow.result()[0] == 200
+            assert health.result() == (200, {"status": "ok"})
+    finally:
+        release.set()
+        server.shutdown()
+        thread.join()
+
+
+def test_unix_socket(notes_repo, tmp_path):
+    socket_path = tmp_path / "commonplace.sock"
+    server = SearchServer(notes_repo, socket_path=socket_path)
+    thread = _run(server)
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(str(socket_path))
+        conn = http.client.HTTPConnection("localhost")
+        conn.sock = sock
+        conn.request("GET", "/health")
+        assert json.loads(conn.getresponse().read()) == {"status": "ok"}
+        conn.close()
+        assert stat.S_IMODE(socket_path.stat().st_mode) == 0o600
+    finally:
+        server.shutdown()
+        thread.join()
+    assert not socket_path.exists()
+
+
+def test_concurrent_stats(server, notes_repo):
+    (notes_repo.cache / "stats.json").unlink(missing_ok=True)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: request(server, "GET", "/stats"), range(32)))
+
+    assert all(status == 200 for status, _ in responses)
+    assert [p.name for p in notes_repo.cache.glob("stats*")] == ["stats.json"]
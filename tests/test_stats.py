@@ -4,7 +4,7 @@ from pathlib import Path
 
 import pytest
 
-from commonplace._stats import generate_stats
+from commonplace._stats import count_by_source, generate_stats
 from commonplace._types import Note, RepoPath
 
 
@@ -150,3 +150,51 @@ def test_generate_stats_with_indexed_content(test_repo):
     assert table_output
     assert "Indexed chunks" in table_output
     # Should show some chunks indexed for the notes source
+
+
+def test_generate_stats_cached(test_repo, monkeypatch):
+    """Counts are cached until notes are added or removed, or the index changes."""
+    from commonplace._repo import Commonplace
+    from commonplace._search._types import Chunk
+
+    test_repo.save(Note(RepoPath(Path("journal/2024/01/2024-01-15.md"), ""), "# Journal\n\nContent"))
+    generate_stats(test_repo)
+
+    # Nothing has changed, so the notes aren't listed again
+    listed = []
+    note_paths = Commonplace.note_paths
+    monkeypatch.setattr(Commonplace, "note_paths", lambda self: listed.append(1) or note_paths(self))
+    generate_stats(test_repo)
+    assert not listed
+
+    test_repo.index.add_chunks([Chunk(test_repo.make_repo_path("journal/2024/01/2024-01-15.md"), "", "Content", 0)])
+    assert count_by_source(test_repo).chunks == {"journal": 1}
+    assert listed
+
+    test_repo.save(Note(RepoPath(Path("notes/general.md"), ""), "# Note\n\nContent"))
+    _, table_output = generate_stats(test_repo)
+    assert "notes" in table_output
+
+
+def test_count_by_source_sees_worktree_changes(test_repo):
+    """Notes added or deleted without staging invalidate the cached counts."""
+    test_repo.save(Note(RepoPath(Path("journal/2024/01/2024-01-15.md"), ""), "# Journal\n\nContent"))
+    test_repo.commit("Add journal", auto_index=False)
+    assert count_by_source(test_repo).notes == {"journal": 1}
+
+    (test_repo.root / "notes").mkdir()
+    (test_repo.root / "notes" / "general.md").write_text("# Note\n\nContent")
+    assert count_by_source(test_repo).notes == {"journal": 1, "notes": 1}
+
+    (test_repo.root / "journal" / "2024" / "01" / "2024-01-15.md").unlink()
+    assert count_by_source(test_repo).notes == {"notes": 1}
+
+
+def test_count_by_source_writes_no_objects(test_repo):
+    """Counting only reads the repository."""
+    test_repo.save(Note(RepoPath(Path("notes/general.md"), ""), "# Note\n\nContent"))
+    objects = {str(oid) for oid in test_repo.git.odb}
+
+    count_by_source(test_repo)
+
+    assert {str(oid) for oid in test_repo.git.odb} == objects
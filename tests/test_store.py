@@ -1,5 +1,7 @@
 """Tests for vector storage."""
 
+from collections import Counter
+
 import numpy as np
 import pytest
 
@@ -176,3 +178,22 @@ def test_add_chunks_empty_batch(test_index):
     # Store should still be empty
     paths = list(test_index.get_indexed_paths())
     assert len(paths) == 0
+
+
+def test_chunks_by_source(test_repo, test_index, make_chunk):
+    """Sources are aggregated in SQL exactly as Commonplace.source derives them."""
+    paths = ["top.md", "journal/2024/01/2024-01-15.md", "chats/claude/2024/x.md", "chats/loose.md", "notes/a/b.md"]
+    test_index.add_chunks([make_chunk(path=path, section="", text="Text", offset=i) for i, path in enumerate(paths)])
+    test_index.add_chunk(make_chunk(path="notes/c.md", section="", text="Text", offset=0))
+
+    expected = Counter(test_repo.source(test_repo.make_repo_path(path)) for path in [*paths, "notes/c.md"])
+    assert test_index.chunks_by_source() == expected
+
+
+def test_generation_changes_with_index(test_index, make_chunk):
+    generations = [test_index.generation]
+    test_index.add_chunks([make_chunk(path="a.md", section="", text="Text", offset=0)])
+    generations.append(test_index.generation)
+    test_index.clear()
+    generations.append(test_index.generation)
+    assert len(set(generations)) == 3
@@ -3,7 +3,7 @@
 from pathlib import Path
 
 import pytest
-from pygit2 import init_repository
+from pygit2 import clone_repository, init_repository
 
 from commonplace._repo import Commonplace
 from commonplace._types import Note, RepoPath
@@ -212,3 +212,96 @@ def test_sync_merge_strategy(tmp_path, remote_repo):
 
     # Should succeed without error
     repo.close()
+
+
+@pytest.fixture
+def clone(tmp_path, local_repo_with_remote):
+    """A second working copy of the remote, for making changes to pull."""
+    local_repo_with_remote.sync()
+    remote_url = local_repo_with_remote.git.remotes["origin"].url
+    clone_repository(remote_url, (tmp_path / "clone").as_posix(), checkout_branch="main")
+    repo = Commonplace.open(tmp_path / "clone")
+    yield repo
+    repo.close()
+
+
+def _add(repo, path, content, message="Add note"):
+    repo.save(Note(repo_path=RepoPath(path=Path(path), ref=""), content=content))
+    repo.commit(message, auto_index=False)
+
+
+def test_sync_does_not_use_git_command(local_repo_with_remote, clone, monkeypatch):
+    """Test that syncing with a local remote is done natively."""
+    _add(clone, "pulled.md", "# Pulled")
+    clone.sync(auto_index=False)
+
+    monkeypatch.setattr(Commonplace, "_git", lambda *args: pytest.fail("git command used"))
+    local_repo_with_remote.sync(auto_index=False)
+
+    assert (local_repo_with_remote.root / "pulled.md").read_text() == "# Pulled"
+    assert not local_repo_with_remote.git.status()
+
+
+def test_sync_rebases_local_commits(local_repo_with_remote, clone):
+    """Test that diverged local commits are replayed on top of the remote."""
+    _add(clone, "theirs.md", "# Theirs")
+    clone.sync(auto_index=False)
+    remote_head = clone.git.head.target
+    _add(local_repo_with_remote, "ours.md", "# Ours", message="Add our note")
+
+    local_repo_with_remote.sync(auto_index=False)
+
+    head = local_repo_with_remote.git.head.peel()
+    assert head.message == "Add our note"
+    assert head.parent_ids == [remote_head]
+    assert {"ours.md", "theirs.md"} <= {entry.name for entry in head.tree}
+    assert (local_repo_with_remote.root / "theirs.md").exists()
+    assert local_repo_with_remote.git.lookup_reference("refs/remotes/origin/main").target == head.id
+
+
+def test_sync_merges_local_commits(local_repo_with_remote, clone):
+    """Test that the merge strategy creates a merge commit."""
+    _add(clone, "theirs.md", "# Theirs")
+    clone.sync(auto_index=False)
+    remote_head = clone.git.head.target
+    _add(local_repo_with_remote, "ours.md", "# Ours")
+    local_head = local_repo_with_remote.git.head.target
+
+    local_repo_with_remote.sync(strategy="merge", auto_index=False)
+
+    head = local_repo_with_remote.git.head.peel()
+    assert head.parent_ids == [local_head, remote_head]
+    assert (local_repo_with_remote.root / "theirs.md").exists()
+
+
+@pytest.mark.parametrize("strategy", ["rebase", "merge"])
+def test_sync_conflict_fails(local_repo_with_remote, clone, strategy):
+    """Test that conflicting changes abort the sync, leaving the local branch alone."""
+    _add(clone, "initial.md", "# Theirs")
+    clone.sync(auto_index=False)
+    _add(local_repo_with_remote, "initial.md", "# Ours")
+    local_head = local_repo_with_remote.git.head.target
+
+    with pytest.raises(ValueError, match="initial.md"):
+        local_repo_with_remote.sync(strategy=strategy, auto_index=False)
+
+    assert local_repo_with_remote.git.head.target == local_head
+    assert (local_repo_with_remote.root / "initial.md").read_text() == "# Ours"
+
+
+def test_sync_indexes_changed_notes(local_repo_with_remote, clone, monkeypatch):
+    """Test that exactly the notes changed by the sync are indexed afterwards."""
+    from commonplace._search import _commands
+
+    indexed = []
+    monkeypatch.setattr(_commands, "index", lambda repo, paths: indexed.extend(paths))
+    _add(clone, "pulled.md", "# Pulled")
+    (clone.root / "other.txt").write_text("Not a note")
+    clone.git.index.add("other.txt")
+    clone.commit("Add other file", auto_index=False)
+    clone.sync(auto_index=False)
+    (local_repo_with_remote.root / "local.md").write_text("# Local")
+
+    local_repo_with_remote.sync(auto_index=True)
+
+    assert sorted(indexed) == ["local.md", "pulled.md"]
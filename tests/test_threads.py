@@ -0,0 +1,128 @@
+"""Tests for using a repository from several threads."""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from commonplace import Commonplace
+from commonplace._search import _commands
+from commonplace._search._embedder import _get_embedder, get_embedder
+
+TOPICS = ["cats and kittens", "baking sourdough bread", "sailing small boats", "growing tomatoes"]
+
+
+@pytest.fixture
+def indexed_repo(test_repo, make_note):
+    for i, topic in enumerate(TOPICS):
+        test_repo.save(make_note(f"note{i}.md", f"# Note {i}\n\nSome thoughts about {topic}.\n"))
+    test_repo.commit("Add notes")
+    _commands.index(test_repo)
+    return test_repo
+
+
+def test_concurrent_searches(indexed_repo):
+    """Many threads searching at once get the same results as searching serially."""
+    queries = TOPICS * 25
+    expected = {query: indexed_repo.index.search(query, limit=3) for query in TOPICS}
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda query: indexed_repo.index.search(query, limit=3), queries))
+
+    for query, hits in zip(queries, results):
+        assert hits == expected[query]
+
+
+def test_searches_during_writes(indexed_repo, make_note):
+    """Searches from many threads see a consistent index while another thread indexes."""
+
+    def write():
+        for i in range(20):
+            indexed_repo.save(make_note(f"more/{i}.md", f"# More {i}\n\nYet more about {TOPICS[i % 4]}.\n"))
+        indexed_repo.commit("Add more notes", auto_index=True)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        writer = pool.submit(write)
+        searches = [pool.submit(indexed_repo.index.search, query, 5) for query in TOPICS * 10]
+        writer.result()
+        assert all(search.result() for search in searches)
+
+    assert len(list(indexed_repo.index.get_indexed_paths())) == len(TOPICS) + 20
+
+
+def test_concurrent_note_reads(indexed_repo):
+    """Many threads reading notes from the object database get their content."""
+    paths = list(indexed_repo.note_paths(committed_only=True))
+    expected = [note.content for note in indexed_repo.get_notes(paths)]
+    indexed_repo._read_blob.cache_clear()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        contents = list(pool.map(lambda path: indexed_repo.get_note(path).content, paths * 25))
+
+    assert contents == expected * 25
+
+
+def test_concurrent_path_commit_maps(indexed_repo):
+    """Threads building the path to commit map at once leave a single, valid cache file."""
+    build = Commonplace._build_path_commit_map.__wrapped__  # Bypass the in-memory cache
+    cache_path = indexed_repo.cache / "path-commits.json"
+    cache_path.unlink(missing_ok=True)
+    head = str(indexed_repo.git.head.target)
+    barrier = threading.Barrier(8)
+
+    def race(_):
+        barrier.wait()
+        return build(indexed_repo.git.workdir, head)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        maps = list(pool.map(race, range(8)))
+
+    assert all(path_map == maps[0] for path_map in maps)
+    assert json.loads(cache_path.read_text()) == {"head": head, "paths": maps[0]}
+    assert [p.name for p in cache_path.parent.glob("path-commits*")] == ["path-commits.json"]
+
+
+def test_concurrent_get_embedder():
+    """Threads asking for the embedder at the same time share one instance."""
+    _get_embedder.cache_clear()
+    barrier = threading.Barrier(8)
+
+    def get():
+        barrier.wait()
+        return get_embedder()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        embedders = list(pool.map(lambda _: get(), range(8)))
+
+    assert all(embedder is embedders[0] for embedder in embedders)
+
+
+def test_context_manager_closes_index(tmp_path):
+    """Leaving the block closes the index, which reopens if used again."""
+    Commonplace.init(tmp_path)
+    with Commonplace.open(tmp_path) as repo:
+        index = repo.index
+        assert index.search("anything") == []
+
+    with pytest.raises(RuntimeError, match="closed"):
+        index.search("anything")
+    assert repo.index is not index
+    repo.close()
+    repo.close()
+
+
+def test_connections_closed_with_thread(test_index):
+    """A thread's connection is closed once the thread has finished."""
+    test_index.search("anything")
+
+    thread = threading.Thread(target=test_index.search, args=("anything",))
+    thread.start()
+    thread.join()
+    assert any(t is thread for t, _ in test_index._connections)
+
+    # Connections left by finished threads are closed when another thread connects
+    other = threading.Thread(target=test_index.search, args=("anything",))
+    other.start()
+    other.join()
+    assert not any(t is thread for t, _ in test_index._connections)
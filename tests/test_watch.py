@@ -0,0 +1,93 @@
+"""Tests for watching and continuously importing Claude Code sessions."""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from commonplace._import._watch import InotifyWatcher, PollingWatcher, watch
+
+SAMPLE_SESSION = Path(__file__).parent / "resources" / "sample-exports" / "claude-code.jsonl"
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_polling_watcher_detects_changes(tmp_path):
+    existing = tmp_path / "existing.jsonl"
+    existing.write_text("{}\n")
+    watcher = PollingWatcher(tmp_path, interval=0.05)
+
+    assert watcher.changes(timeout=0.1) == set()
+
+    (tmp_path / "project").mkdir()
+    created = tmp_path / "project" / "new.jsonl"
+    created.write_text("{}\n")
+    with open(existing, "a") as fp:
+        fp.write("{}\n")
+
+    assert watcher.changes(timeout=0.1) == {existing, created}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_detects_changes(tmp_path):
+    watcher = InotifyWatcher(tmp_path)
+    try:
+        assert watcher.changes(timeout=0.05) == set()
+
+        # Files in new subdirectories are picked up too
+        project = tmp_path / "project"
+        project.mkdir()
+        assert watcher.changes(timeout=1.0) == set()
+
+        session = project / "session.jsonl"
+        session.write_text("{}\n")
+        assert session in watcher.changes(timeout=1.0)
+    finally:
+        watcher.close()
+
+
+def test_watch_imports_growing_session(test_repo, tmp_path):
+    """Sessions are imported as they grow, with commits coalesced into batches."""
+    lines = SAMPLE_SESSION.read_bytes().splitlines(keepends=True)
+    projects = tmp_path / "projects" / "my-project"
+    projects.mkdir(parents=True)
+    session = projects / "session.jsonl"
+    session.write_bytes(b"".join(lines[:10]))
+
+    head_before = test_repo.git.head.target
+    stop = threading.Event()
+    watcher = PollingWatcher(projects.parent, interval=0.05)
+    thread = threading.Thread(
+        target=watch,
+        args=(projects.parent, test_repo),
+        kwargs=dict(user="Human", auto_index=False, debounce=0.1, batch_interval=3600, stop=stop, watcher=watcher),
+    )
+    thread.start()
+    try:
+        notes_dir = test_repo.root / "chats" / "claude-code"
+        assert _wait_for(lambda: any(notes_dir.rglob("*.md")))
+
+        with open(session, "ab") as fp:
+            fp.writelines(lines[10:])
+        checkpoints = test_repo.cache / "checkpoints"
+        assert _wait_for(
+            lambda: any(json.loads(p.read_bytes())["lines"] == len(lines) for p in checkpoints.glob("*.json"))
+        )
+    finally:
+        stop.set()
+        thread.join()
+
+    # Both imports were committed together when the watch stopped
+    head = test_repo.git.head.peel()
+    assert head.parents[0].id == head_before
+    assert "Import 1 sessions" in head.message